@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Analyzers - Qt-free person and barcode analysis for one camera frame
+
+Each analyzer takes a BGR frame and returns a small result record (plain
+dicts, lists and tuples). That keeps them usable from GUI threads, worker
+processes and headless services alike; drawing is done separately by
+whoever owns the frame. Results carry a ``timings`` dict (ms per stage) for
+pipeline_metrics.
+"""
+
+import os
+import sys
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'welcome_system'))
+
+from frame_pacing import MotionMeter, barcode_candidate
+from barcode_decoder import BarcodeDecoder, RoiBarcodeDecoder, DEFAULT_PROFILE
+from face_detector import create_face_detector
+import config as welcome_config
+
+
+class PersonAnalyzer:
+    """Face detection with the backend chosen in welcome_system/config.py"""
+    kind = 'person'
+
+    def __init__(self):
+        self.detector = create_face_detector(welcome_config)
+
+    def analyze(self, frame: np.ndarray) -> Dict:
+        start = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        converted = time.perf_counter()
+        faces = self.detector.detect(gray, frame)
+        detected = time.perf_counter()
+        return {
+            'faces': [tuple(face) for face in faces],
+            # Anything worth keeping the frame rate up for
+            'active': self.detector.moved or len(faces) > 0,
+            'timings': {
+                'convert': (converted - start) * 1000.0,
+                'detect': (detected - converted) * 1000.0,
+            },
+        }
+
+    def report(self) -> str:
+        return (f"{self.detector.name}: detector skipped on "
+                f"{self.detector.skip_rate:.0%} of {self.detector.frames} frames")
+
+    def close(self):
+        """Nothing to release; matches AnalyzerProcess.close()"""
+
+
+class BarcodeAnalyzer:
+    """Barcode decoding with region tracking and scan-rate hints"""
+    kind = 'barcode'
+
+    def __init__(self, profile: str = DEFAULT_PROFILE, full_sweep_every: int = 10):
+        self.engine = BarcodeDecoder(profile)
+        # Cards are usually held in one spot, so decode around the last hit
+        self.decoder = RoiBarcodeDecoder(self.engine.decode, full_sweep_every=full_sweep_every)
+        self.motion = MotionMeter()
+
+    def analyze(self, frame: np.ndarray) -> Dict:
+        start = time.perf_counter()
+        barcodes = self.decoder.decode(frame)
+        decoded = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        converted = time.perf_counter()
+        # Scan at full rate while a code is (even partly) in view
+        boost = bool(barcodes) or barcode_candidate(gray)
+        active = boost or self.motion.update(gray)
+        return {
+            'barcodes': [
+                {'data': b.data.decode('utf-8'), 'type': b.type, 'rect': tuple(b.rect)}
+                for b in barcodes
+            ],
+            'boost': boost,
+            'active': active,
+            'timings': {
+                'decode': (decoded - start) * 1000.0,
+                'convert': (converted - decoded) * 1000.0,
+                'motion': (time.perf_counter() - converted) * 1000.0,
+            },
+        }
+
+    def report(self) -> str:
+        return self.engine.report()
+
+    def close(self):
+        """Nothing to release; matches AnalyzerProcess.close()"""
+
+
+ANALYZERS = {
+    PersonAnalyzer.kind: PersonAnalyzer,
+    BarcodeAnalyzer.kind: BarcodeAnalyzer,
+}
+
+
+def create_analyzer(kind: str, **options):
+    """Build an analyzer by name ('person' or 'barcode')"""
+    return ANALYZERS[kind](**options)
+
+
+def draw_faces(frame: np.ndarray, faces: List):
+    """Draw face boxes onto a writable frame"""
+    for (x, y, w, h) in faces:
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+
+
+def draw_barcodes(frame: np.ndarray, barcodes: List[Dict]):
+    """Draw barcode boxes and labels onto a writable frame"""
+    for barcode in barcodes:
+        (x, y, w, h) = barcode['rect']
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        cv2.putText(frame, f"{barcode['type']}: {barcode['data']}",
+                    (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
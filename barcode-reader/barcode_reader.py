@@ -12,11 +12,22 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QLabel, QTextEdit, 
                              QFileDialog, QMessageBox, QGroupBox, QGridLayout)
 from PyQt5.QtCore import QTimer, Qt, QThread, pyqtSignal
-from PyQt5.QtGui import QImage, QPixmap, QFont
-from pyzbar import pyzbar
+from PyQt5.QtGui import QImage, QPixmap, QFont, QTextCursor
 from PIL import Image
 import os
 
+# Shared modules live in the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from camera_bus import acquire_camera_bus, release_camera_bus
+from frame_pacing import FramePacer, MotionMeter, barcode_candidate
+from barcode_decoder import BarcodeDecoder, RoiBarcodeDecoder, TiledBarcodeDecoder
+from scan_results import ScanResultStore
+
+# General-purpose reader: search every supported symbology
+DECODER_PROFILE = 'all'
+# Codes listed in the results panel; the full history is kept for export
+RESULTS_SHOWN = 200
+
 class BarcodeScannerThread(QThread):
     """Barcode scanning thread"""
     barcode_detected = pyqtSignal(str, str)  # Signal: barcode type, barcode content
@@ -26,30 +37,50 @@ class BarcodeScannerThread(QThread):
         super().__init__()
         self.running = False
         self.camera = None
+        self.frames_dropped = 0
+        # Full camera rate while a code is in view, idle down when static
+        self.pacer = FramePacer(target_fps=10.0, max_fps=30.0, idle_fps=2.0)
+        self.motion = MotionMeter()
+        self.engine = BarcodeDecoder(DECODER_PROFILE)
+        self.decoder = RoiBarcodeDecoder(self.engine.decode)
         
     def run(self):
         """Run scanning thread"""
-        self.camera = cv2.VideoCapture(0)
-        if not self.camera.isOpened():
+        bus = acquire_camera_bus(0)
+        if bus is None:
             self.barcode_detected.emit("Error", "Cannot open camera")
             return
+        self.camera = bus.subscribe()
             
         self.running = True
         while self.running:
+            # Always the newest frame; anything older is skipped
             ret, frame = self.camera.read()
             if not ret:
+                if not self.camera.active:
+                    self.barcode_detected.emit("Error", "Camera stopped delivering frames")
+                    break
                 continue
                 
-            # Process frame
-            self.process_frame(frame)
+            # Process frame (copy, as bus frames are shared read-only)
+            self.process_frame(frame.copy())
+            self.pacer.pace()
             
-        if self.camera:
-            self.camera.release()
+        self.frames_dropped = self.camera.frames_dropped
+        self.camera.close()
+        self.camera = None
+        release_camera_bus(bus)
     
     def process_frame(self, frame):
         """Process video frame"""
         # Detect barcodes
-        barcodes = pyzbar.decode(frame)
+        barcodes = self.decoder.decode(frame)
+        
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if barcodes or barcode_candidate(gray):
+            self.pacer.boost()
+        else:
+            self.pacer.report_activity(self.motion.update(gray))
         
         for barcode in barcodes:
             # Extract barcode data
@@ -86,7 +117,9 @@ class BarcodeReaderApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.scanner_thread = None
-        self.scan_results = []
+        self.scan_results = ScanResultStore(RESULTS_SHOWN)
+        # Large scans and card sheets are decoded tile by tile
+        self.decoder = TiledBarcodeDecoder(DECODER_PROFILE)
         self.init_ui()
         
     def init_ui(self):
@@ -154,12 +187,18 @@ class BarcodeReaderApp(QMainWindow):
         
         self.results_text = QTextEdit()
         self.results_text.setReadOnly(True)
+        # One line per code; the oldest lines drop off
+        self.results_text.document().setMaximumBlockCount(RESULTS_SHOWN)
         results_layout.addWidget(self.results_text)
         
         self.clear_results_btn = QPushButton("Clear Results")
         self.clear_results_btn.clicked.connect(self.clear_results)
         results_layout.addWidget(self.clear_results_btn)
         
+        self.export_results_btn = QPushButton("Export Results")
+        self.export_results_btn.clicked.connect(self.export_results)
+        results_layout.addWidget(self.export_results_btn)
+        
         layout.addWidget(results_group)
         
         return panel
@@ -196,14 +235,17 @@ class BarcodeReaderApp(QMainWindow):
         
     def stop_camera(self):
         """Stop camera scanning"""
+        dropped = 0
         if self.scanner_thread:
             self.scanner_thread.stop()
             self.scanner_thread.wait()
+            dropped = self.scanner_thread.frames_dropped
+            print("Decoder stats:\n" + self.scanner_thread.engine.report())
             
         self.start_camera_btn.setEnabled(True)
         self.stop_camera_btn.setEnabled(False)
         self.video_label.setText("Camera stopped")
-        self.statusBar().showMessage("Camera stopped")
+        self.statusBar().showMessage(f"Camera stopped ({dropped} stale frames skipped)")
         
     def load_image_file(self):
         """Load and process image file"""
@@ -227,7 +269,7 @@ class BarcodeReaderApp(QMainWindow):
                 return
                 
             # Detect barcodes
-            barcodes = pyzbar.decode(image)
+            barcodes = self.decoder.decode(image)
             
             if not barcodes:
                 self.statusBar().showMessage("No barcodes found in image")
@@ -278,21 +320,21 @@ class BarcodeReaderApp(QMainWindow):
         
     def add_scan_result(self, barcode_type, barcode_data):
         """Add scan result to list"""
-        # Check if already scanned
-        for result in self.scan_results:
-            if result['data'] == barcode_data:
-                return
-                
-        # Add new result
-        result = {
-            'type': barcode_type,
-            'data': barcode_data
-        }
-        self.scan_results.append(result)
+        # Repeat reads only bump the code's hit count
+        _, is_new = self.scan_results.add(barcode_data, barcode_type)
+        if not is_new:
+            return
         
-        # Update display
-        result_text = f"[{barcode_type}] {barcode_data}\n"
-        self.results_text.insertPlainText(result_text)
+        # One block per code, so the block limit counts codes; line breaks
+        # inside the data become line separators within the block
+        result_text = f"[{barcode_type}] {barcode_data}"
+        for newline in ('\r\n', '\r', '\n'):
+            result_text = result_text.replace(newline, '\u2028')
+        cursor = QTextCursor(self.results_text.document())
+        cursor.movePosition(QTextCursor.End)
+        if not self.results_text.document().isEmpty():
+            cursor.insertBlock()
+        cursor.insertText(result_text)
         
     def clear_results(self):
         """Clear all scan results"""
@@ -300,6 +342,22 @@ class BarcodeReaderApp(QMainWindow):
         self.results_text.clear()
         self.statusBar().showMessage("Results cleared")
         
+    def export_results(self):
+        """Save the full scan history (CSV or JSON Lines)"""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export Results",
+            "scan_results.csv",
+            "CSV Files (*.csv);;JSON Lines (*.jsonl)"
+        )
+        if not file_path:
+            return
+        try:
+            count = self.scan_results.export(file_path)
+            self.statusBar().showMessage(f"Exported {count} codes to {file_path}")
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Cannot export results: {str(e)}")
+        
     def closeEvent(self, event):
         """Handle window close event"""
         if self.scanner_thread and self.scanner_thread.running:
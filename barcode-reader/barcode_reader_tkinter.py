@@ -10,10 +10,22 @@ from tkinter import ttk, filedialog, messagebox, scrolledtext
 import cv2
 import numpy as np
 from PIL import Image, ImageTk
-from pyzbar import pyzbar
 import threading
 import datetime
+from collections import deque
 import os
+import sys
+
+# Shared modules live in the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from camera_bus import acquire_camera_bus, release_camera_bus
+from barcode_decoder import BarcodeDecoder, TiledBarcodeDecoder
+from scan_results import ScanResultStore
+
+# General-purpose reader: search every supported symbology
+DECODER_PROFILE = 'all'
+# Codes listed in the results panel; the full history is kept for export
+RESULTS_SHOWN = 200
 
 class BarcodeReaderApp:
     def __init__(self, root):
@@ -27,7 +39,15 @@ class BarcodeReaderApp:
         self.camera_thread = None
         
         # Results storage
-        self.scan_results = []
+        self.scan_results = ScanResultStore(RESULTS_SHOWN)
+        # Text tag of every listed code, oldest first
+        self.result_tags = deque()
+        self.result_serial = 0
+        
+        # Separate engines: camera and file decoding run on different threads
+        self.camera_decoder = BarcodeDecoder(DECODER_PROFILE)
+        # Large scans and card sheets are decoded tile by tile
+        self.file_decoder = TiledBarcodeDecoder(DECODER_PROFILE)
         
         self.setup_ui()
         
@@ -59,14 +79,18 @@ class BarcodeReaderApp:
         ttk.Button(control_frame, text="Clear Results", 
                   command=self.clear_results).grid(row=2, column=0, pady=5, sticky=tk.W+tk.E)
         
+        # Export results
+        ttk.Button(control_frame, text="Export Results", 
+                  command=self.export_results).grid(row=3, column=0, pady=5, sticky=tk.W+tk.E)
+        
         # Results display
         results_label = ttk.Label(control_frame, text="Scan Results:", 
                                  font=('Helvetica', 12, 'bold'))
-        results_label.grid(row=3, column=0, pady=(20, 5), sticky=tk.W)
+        results_label.grid(row=4, column=0, pady=(20, 5), sticky=tk.W)
         
         # Results text area
         self.results_text = scrolledtext.ScrolledText(control_frame, width=30, height=15)
-        self.results_text.grid(row=4, column=0, pady=5, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.results_text.grid(row=5, column=0, pady=5, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Right panel - Display
         display_frame = ttk.LabelFrame(main_frame, text="Camera/Image Display", padding="10")
@@ -88,7 +112,7 @@ class BarcodeReaderApp:
         main_frame.rowconfigure(1, weight=1)
         main_frame.columnconfigure(0, weight=1)
         main_frame.columnconfigure(1, weight=2)
-        control_frame.rowconfigure(4, weight=1)
+        control_frame.rowconfigure(5, weight=1)
         
     def toggle_camera(self):
         """Toggle camera on/off"""
@@ -100,8 +124,8 @@ class BarcodeReaderApp:
     def start_camera(self):
         """Start camera capture"""
         try:
-            self.camera = cv2.VideoCapture(0)
-            if not self.camera.isOpened():
+            self.camera = acquire_camera_bus(0)
+            if self.camera is None:
                 raise Exception("Cannot open camera")
                 
             self.camera_running = True
@@ -109,7 +133,8 @@ class BarcodeReaderApp:
             self.status_var.set("Camera running...")
             
             # Start camera thread
-            self.camera_thread = threading.Thread(target=self.process_camera)
+            self.camera_thread = threading.Thread(target=self.process_camera,
+                                                  args=(self.camera,))
             self.camera_thread.daemon = True
             self.camera_thread.start()
             
@@ -120,19 +145,27 @@ class BarcodeReaderApp:
     def stop_camera(self):
         """Stop camera capture"""
         self.camera_running = False
-        if self.camera:
-            self.camera.release()
+        self.camera = None
         self.camera_btn.config(text="Start Camera")
         self.status_var.set("Camera stopped")
         self.display_label.config(image='', text="Camera stopped")
         
-    def process_camera(self):
+    def process_camera(self, bus):
         """Process camera frames in separate thread"""
+        subscription = bus.subscribe()
         while self.camera_running:
-            ret, frame = self.camera.read()
+            # Always the newest frame; anything older is skipped
+            ret, frame = subscription.read()
+            if not ret and not subscription.active:
+                self.stop_camera()
+                self.status_var.set("Camera stopped delivering frames")
+                break
             if ret:
+                # Bus frames are shared read-only; draw on a private copy
+                frame = frame.copy()
+                
                 # Detect barcodes
-                barcodes = pyzbar.decode(frame)
+                barcodes = self.camera_decoder.decode(frame)
                 
                 # Draw barcodes on frame
                 for barcode in barcodes:
@@ -154,6 +187,9 @@ class BarcodeReaderApp:
                 
                 # Convert frame to display
                 self.display_frame(frame)
+        
+        subscription.close()
+        release_camera_bus(bus)
                 
     def display_frame(self, frame):
         """Display frame in GUI"""
@@ -196,7 +232,7 @@ class BarcodeReaderApp:
                 raise Exception("Cannot read image file")
             
             # Detect barcodes
-            barcodes = pyzbar.decode(image)
+            barcodes = self.file_decoder.decode(image)
             
             if barcodes:
                 self.status_var.set(f"Found {len(barcodes)} barcode(s)")
@@ -230,42 +266,61 @@ class BarcodeReaderApp:
             
     def add_scan_result(self, data, barcode_type):
         """Add scan result to list"""
-        # Check if already scanned
-        for result in self.scan_results:
-            if result['data'] == data:
-                return
-        
-        # Add new result
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        result = {
-            'timestamp': timestamp,
-            'type': barcode_type,
-            'data': data
-        }
-        self.scan_results.insert(0, result)
+        # Repeat reads only bump the code's hit count
+        result, is_new = self.scan_results.add(data, barcode_type)
+        if not is_new:
+            return
         
         # Update display
-        self.update_results_display()
+        self.update_results_display(result)
         
         # Show notification
         self.status_var.set(f"Detected {barcode_type} barcode: {data}")
         
-    def update_results_display(self):
-        """Update results text display"""
-        self.results_text.delete(1.0, tk.END)
+    def update_results_display(self, result):
+        """Show a new result at the top of the list"""
+        timestamp = datetime.datetime.fromtimestamp(result['first_seen']).strftime("%H:%M:%S")
+        line = f"[{timestamp}] {result['type']}\n"
+        line += f"Data: {result['data']}\n"
+        line += "-" * 40 + "\n"
+        # Tag the entry so it can be removed whatever the data's line count
+        self.result_serial += 1
+        tag = f"result{self.result_serial}"
+        self.results_text.insert('1.0', line, tag)
+        self.result_tags.append(tag)
         
-        for result in self.scan_results:
-            line = f"[{result['timestamp']}] {result['type']}\n"
-            line += f"Data: {result['data']}\n"
-            line += "-" * 40 + "\n"
-            self.results_text.insert(tk.END, line)
+        # Drop the oldest entry instead of re-rendering the list
+        if len(self.result_tags) > RESULTS_SHOWN:
+            oldest = self.result_tags.popleft()
+            ranges = self.results_text.tag_ranges(oldest)
+            if ranges:
+                self.results_text.delete(ranges[0], ranges[-1])
+            self.results_text.tag_delete(oldest)
             
     def clear_results(self):
         """Clear all scan results"""
-        self.scan_results = []
+        self.scan_results.clear()
         self.results_text.delete(1.0, tk.END)
+        for tag in self.result_tags:
+            self.results_text.tag_delete(tag)
+        self.result_tags.clear()
         self.status_var.set("Results cleared")
         
+    def export_results(self):
+        """Save the full scan history (CSV or JSON Lines)"""
+        filename = filedialog.asksaveasfilename(
+            title="Export Results",
+            initialfile="scan_results.csv",
+            filetypes=[("CSV files", "*.csv"), ("JSON Lines", "*.jsonl")]
+        )
+        if not filename:
+            return
+        try:
+            count = self.scan_results.export(filename)
+            self.status_var.set(f"Exported {count} codes to {filename}")
+        except OSError as e:
+            messagebox.showerror("Error", f"Cannot export results: {str(e)}")
+        
     def on_closing(self):
         """Handle window closing"""
         if self.camera_running:
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch Decode - Decode barcodes in whole directories of images
+
+Walks the given files and directories, decodes images in a process pool and
+streams one JSON object per image (JSON Lines). A cache keyed on file
+content and decode settings lets re-runs skip images that have not changed:
+
+    python3 batch_decode.py photos/ scans/ -o results.jsonl
+    python3 batch_decode.py photos/ --changed-only      # only new/changed files
+    python3 batch_decode.py scans/ --tiles              # large sheets, tile by tile
+
+Each line looks like:
+    {"path": ..., "sha256": ..., "barcodes": [{"data", "type", "rect"}],
+     "ms": 12.3, "cached": false}
+and carries "error" instead of "barcodes" when an image cannot be read or
+decoded. A worker process that dies (a crash in a native decoder, or the OOM
+killer) takes its pool down with it; the pool is then replaced and the files
+that were in flight are decoded again one at a time, so only the file that
+kills a worker is reported as failed.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, Optional
+
+import cv2
+import numpy as np
+
+# Shared modules live in the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from barcode_decoder import PROFILES, BarcodeDecoder, TiledBarcodeDecoder
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+DEFAULT_CACHE = '.batch_decode_cache.json'
+# Cache is written every this many decoded files, so an interrupted run keeps its work
+CACHE_SAVE_EVERY = 500
+# Failed files listed in the end-of-run summary
+ERRORS_SHOWN = 20
+
+# Per-process decoder, created by the pool initializer
+_decoder: Optional[BarcodeDecoder] = None
+
+
+def _make_decoder(profile: str, tiles: bool):
+    if tiles:
+        # Tiles run one after another: the pool already keeps every CPU busy
+        return TiledBarcodeDecoder(profile, workers=1)
+    return BarcodeDecoder(profile)
+
+
+def _init_worker(profile: str, tiles: bool = False):
+    global _decoder
+    _decoder = _make_decoder(profile, tiles)
+
+
+def decode_settings(profile: str, tiles: bool = False) -> str:
+    """Everything besides the file that a decode result depends on"""
+    backends = ','.join(b.name for b in BarcodeDecoder(profile).backends)
+    tiling = 'whole image'
+    if tiles:
+        decoder = _make_decoder(profile, tiles)
+        tiling = (f"tiles {decoder.tile_size}/{decoder.overlap} above {decoder.min_size}, "
+                  f"overview {decoder.overview}")
+    return f"{profile}; {backends}; {tiling}"
+
+
+def decode_file(path: str, known_hash: Optional[str] = None) -> Dict:
+    """Hash and decode one image (runs in a worker process)
+
+    If the content hash equals ``known_hash`` the image is not decoded and
+    the result only carries the hash.
+    """
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+    except OSError as e:
+        return {'path': path, 'error': str(e)}
+    digest = hashlib.sha256(content).hexdigest()
+    if digest == known_hash:
+        return {'path': path, 'sha256': digest, 'unchanged': True}
+
+    image = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return {'path': path, 'sha256': digest, 'error': 'not a readable image'}
+    try:
+        barcodes = _decoder.decode(image)
+    except Exception as e:
+        return {'path': path, 'sha256': digest, 'error': f"decode failed: {e!r}"}
+    return {
+        'path': path,
+        'sha256': digest,
+        'barcodes': [
+            {'data': b.data.decode('utf-8', 'replace'), 'type': b.type, 'rect': list(b.rect)}
+            for b in barcodes
+        ],
+        'ms': round((time.perf_counter() - start) * 1000.0, 2),
+    }
+
+
+def find_images(paths: Iterable[str]) -> Iterator[str]:
+    """Image files under the given files/directories, in a stable order"""
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.join(root, name)
+
+
+class DecodeCache:
+    """Results by path, with the size/mtime/hash and settings they were computed for
+
+    Same size and mtime means unchanged without reading the file; otherwise
+    the worker hashes it, and an unchanged hash still avoids the decode.
+    Entries made with other decode settings (profile, backends, tiling) are
+    ignored and decoded again.
+    """
+
+    def __init__(self, path: Optional[str], settings: str = ''):
+        self.path = path
+        self.settings = settings
+        self.entries: Dict[str, Dict] = {}
+        self.dirty = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable cache {path}: {e}", file=sys.stderr)
+
+    @staticmethod
+    def _stamp(path: str):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def lookup(self, path: str):
+        """(cached entry if the file is untouched, known hash or None)"""
+        entry = self.entries.get(os.path.abspath(path))
+        if entry is None or entry.get('settings') != self.settings:
+            return None, None
+        try:
+            size, mtime = self._stamp(path)
+        except OSError:
+            return None, None
+        if entry['size'] == size and entry['mtime_ns'] == mtime:
+            return entry, entry['sha256']
+        return None, entry['sha256']
+
+    def store(self, path: str, result: Dict):
+        try:
+            size, mtime = self._stamp(path)
+        except OSError:
+            return
+        entry = {
+            'settings': self.settings, 'size': size, 'mtime_ns': mtime,
+            'sha256': result['sha256'], 'barcodes': result['barcodes'],
+        }
+        key = os.path.abspath(path)
+        if self.entries.get(key) == entry:
+            return
+        self.entries[key] = entry
+        self.dirty += 1
+        if self.dirty >= CACHE_SAVE_EVERY:
+            self.save()
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        temp = f"{self.path}.tmp"
+        with open(temp, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(temp, self.path)
+        self.dirty = 0
+
+
+def _crashed(future) -> bool:
+    """Whether a finished job was lost to a dead worker process"""
+    return isinstance(future.exception(), BrokenProcessPool)
+
+
+def _collect(future, path: str, entry: Optional[Dict]):
+    """(result, cache entry) for a finished job; an error in the job fails only its file"""
+    try:
+        return future.result(), entry
+    except Exception as e:
+        return {'path': path, 'error': f"worker failed: {e!r}"}, entry
+
+
+def run_batch(paths: Iterable[str], output, profile: str = 'all',
+              workers: Optional[int] = None, cache_path: Optional[str] = DEFAULT_CACHE,
+              changed_only: bool = False, tiles: bool = False) -> Dict:
+    """Decode everything under ``paths``, writing JSON Lines to ``output``
+
+    ``tiles`` decodes large images in overlapping tiles (TiledBarcodeDecoder).
+    """
+    cache = DecodeCache(cache_path, decode_settings(profile, tiles))
+    stats = {'files': 0, 'decoded': 0, 'with_codes': 0, 'cached': 0, 'failed': 0,
+             'errors': []}
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    def emit(result: Dict):
+        output.write(json.dumps(result) + "\n")
+
+    def finish(result: Dict, entry: Optional[Dict]):
+        stats['files'] += 1
+        if 'error' in result:
+            stats['failed'] += 1
+            stats['errors'].append((result['path'], result['error']))
+            emit(result)
+            return
+        if result.pop('unchanged', False):
+            # Same content as last time: reuse the old answer
+            result['barcodes'] = entry['barcodes']
+            result['cached'] = True
+            stats['cached'] += 1
+        else:
+            result['cached'] = False
+            stats['decoded'] += 1
+        cache.store(result['path'], result)
+        if result['barcodes']:
+            stats['with_codes'] += 1
+        if not (changed_only and result['cached']):
+            emit(result)
+
+    def new_pool():
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(profile, tiles))
+
+    pool = new_pool()
+    # future -> (path, known hash, cache entry)
+    pending = {}
+
+    def recover():
+        """Replace a broken pool and redo the files that were in flight
+
+        A dead worker fails every unfinished job in the pool, so each of them
+        is decoded again on its own: a second crash can only be that file's.
+        """
+        nonlocal pool
+        wait(pending)
+        suspects = []
+        for future, (path, known_hash, entry) in list(pending.items()):
+            del pending[future]
+            if _crashed(future):
+                suspects.append((path, known_hash, entry))
+            else:
+                finish(*_collect(future, path, entry))
+        pool.shutdown(wait=True)
+        pool = new_pool()
+        for path, known_hash, entry in suspects:
+            future = pool.submit(decode_file, path, known_hash)
+            wait([future])
+            if _crashed(future):
+                finish({'path': path, 'error': 'worker process died decoding this file'}, entry)
+                pool.shutdown(wait=True)
+                pool = new_pool()
+            else:
+                finish(*_collect(future, path, entry))
+
+    def drain(limit: int):
+        """Finish jobs until at most ``limit`` are in flight"""
+        while len(pending) > limit:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            if any(_crashed(future) for future in done):
+                recover()
+                continue
+            for future in done:
+                path, _, entry = pending.pop(future)
+                finish(*_collect(future, path, entry))
+
+    def submit(path: str, known_hash: Optional[str], entry: Optional[Dict]):
+        try:
+            future = pool.submit(decode_file, path, known_hash)
+        except BrokenProcessPool:
+            recover()
+            future = pool.submit(decode_file, path, known_hash)
+        pending[future] = (path, known_hash, entry)
+
+    # Bounded number of files in flight: memory stays flat for huge trees
+    try:
+        for path in find_images(paths):
+            entry, known_hash = cache.lookup(path)
+            if entry is not None:
+                finish({'path': path, 'sha256': entry['sha256'], 'unchanged': True}, entry)
+                continue
+            submit(path, known_hash,
+                   cache.entries.get(os.path.abspath(path)) if known_hash else None)
+            drain(workers * 4 - 1)
+        drain(0)
+    finally:
+        pool.shutdown(wait=True)
+
+    cache.save()
+    elapsed = time.perf_counter() - start
+    stats['seconds'] = round(elapsed, 2)
+    stats['files_per_second'] = round(stats['files'] / elapsed, 1) if elapsed > 0 else 0.0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode barcodes in directories of images")
+    parser.add_argument('paths', nargs='+', help="Image files or directories (recursive)")
+    parser.add_argument('-o', '--output', help="JSON Lines file (default: stdout)")
+    parser.add_argument('--profile', default='all', choices=sorted(PROFILES),
+                        help="Symbology profile (barcode_decoder)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--cache', default=DEFAULT_CACHE, help="Cache file for re-runs")
+    parser.add_argument('--no-cache', action='store_true', help="Decode everything again")
+    parser.add_argument('--changed-only', action='store_true',
+                        help="Only output files that were decoded in this run")
+    parser.add_argument('--tiles', action='store_true',
+                        help="Decode large images in overlapping tiles (scans, card sheets)")
+    args = parser.parse_args()
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        stats = run_batch(args.paths, output, args.profile, args.workers,
+                          None if args.no_cache else args.cache, args.changed_only,
+                          args.tiles)
+    finally:
+        if args.output:
+            output.close()
+
+    print(f"{stats['files']} files in {stats['seconds']} s ({stats['files_per_second']} files/s): "
+          f"{stats['decoded']} decoded, {stats['cached']} unchanged, "
+          f"{stats['with_codes']} with barcodes, {stats['failed']} failed", file=sys.stderr)
+    for path, error in stats['errors'][:ERRORS_SHOWN]:
+        print(f"  failed: {path}: {error}", file=sys.stderr)
+    if len(stats['errors']) > ERRORS_SHOWN:
+        print(f"  ... and {len(stats['errors']) - ERRORS_SHOWN} more", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Scan Results - Deduplicated scan history for the reader apps
+
+Every distinct code gets one record with its type, hit count and first/last
+seen times, found through a dict index instead of a scan of the list. The
+apps display only the most recent codes (a bounded ring); the complete
+history is kept in the index and can be exported to CSV or JSON Lines.
+"""
+
+import csv
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+EXPORT_FIELDS = ('data', 'type', 'count', 'first_seen', 'last_seen')
+
+
+class ScanResultStore:
+    """Scanned codes by content, with hit counts and timestamps
+
+    Safe to call from a camera thread and the UI thread at once.
+    """
+
+    def __init__(self, max_recent: int = 200):
+        self.index: Dict[str, Dict] = {}
+        # Most recent new codes, oldest first
+        self.recent = deque(maxlen=max_recent)
+        self.total_hits = 0
+        self.lock = threading.Lock()
+
+    def add(self, data: str, barcode_type: str,
+            when: Optional[float] = None) -> Tuple[Dict, bool]:
+        """Record a read; returns (record, True if the code is new)"""
+        when = time.time() if when is None else when
+        with self.lock:
+            self.total_hits += 1
+            record = self.index.get(data)
+            if record is not None:
+                record['count'] += 1
+                record['last_seen'] = when
+                return record, False
+            record = {'data': data, 'type': barcode_type, 'count': 1,
+                      'first_seen': when, 'last_seen': when}
+            self.index[data] = record
+            self.recent.append(record)
+            return record, True
+
+    def get(self, data: str) -> Optional[Dict]:
+        with self.lock:
+            return self.index.get(data)
+
+    def latest(self, limit: Optional[int] = None) -> List[Dict]:
+        """Most recent new codes, newest first"""
+        with self.lock:
+            records = list(reversed(self.recent))
+        return records[:limit] if limit is not None else records
+
+    def clear(self):
+        with self.lock:
+            self.index.clear()
+            self.recent.clear()
+            self.total_hits = 0
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def export(self, path: str) -> int:
+        """Write the full history (CSV for .csv, else JSON Lines); returns the row count"""
+        with self.lock:
+            records = list(self.index.values())
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            if path.lower().endswith('.csv'):
+                writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS)
+                writer.writeheader()
+                for record in records:
+                    writer.writerow(_exported(record))
+            else:
+                for record in records:
+                    f.write(json.dumps(_exported(record)) + "\n")
+        return len(records)
+
+
+def _exported(record: Dict) -> Dict:
+    row = dict(record)
+    for key in ('first_seen', 'last_seen'):
+        row[key] = datetime.fromtimestamp(row[key]).isoformat(timespec='seconds')
+    return row
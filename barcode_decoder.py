@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Barcode Decoder - Shared decoding engine for the scanners
+
+Decoding goes through interchangeable backends (pyzbar, OpenCV's QR and
+barcode detectors). A symbology profile restricts the search to the codes we
+actually issue, and the engine tries the cheapest backend first, falling back
+to the others only for symbologies it missed. Every backend keeps hit-rate
+and latency counters so sites can pick the fastest one for their cards.
+
+RoiBarcodeDecoder tracks a code across camera frames; TiledBarcodeDecoder
+handles large scans and printed sheets by decoding overlapping tiles.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    from pyzbar import pyzbar
+except ImportError:
+    # Optional: the OpenCV backends still work without zbar installed
+    pyzbar = None
+
+# Same field names as pyzbar's Decoded, so call sites can use either
+Rect = namedtuple('Rect', ['left', 'top', 'width', 'height'])
+Point = namedtuple('Point', ['x', 'y'])
+DecodedBarcode = namedtuple('DecodedBarcode', ['data', 'type', 'rect', 'polygon', 'backend'])
+
+# Symbology profiles (zbar naming); None means search everything
+PROFILES = {
+    # What generate_barcodes.py issues
+    'cards': ('CODE128', 'QRCODE'),
+    'retail': ('EAN13', 'EAN8', 'UPCA', 'UPCE', 'CODE128', 'CODE39'),
+    'all': None,
+}
+DEFAULT_PROFILE = 'cards'
+
+
+def _polygon_rect(points) -> Rect:
+    xs = [int(p[0]) for p in points]
+    ys = [int(p[1]) for p in points]
+    return Rect(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+
+
+class DecoderBackend:
+    """Base class for a decoding backend"""
+    name = 'base'
+    # Symbologies the backend can read; None means anything
+    symbologies: Optional[Tuple[str, ...]] = None
+
+    def __init__(self, symbologies: Optional[Iterable[str]] = None):
+        if symbologies is None:
+            self.wanted = self.symbologies
+        elif self.symbologies is None:
+            self.wanted = tuple(symbologies)
+        else:
+            self.wanted = tuple(s for s in symbologies if s in self.symbologies)
+        self.attempts = 0
+        self.hits = 0
+        self.total_time = 0.0
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    def useful(self) -> bool:
+        """Whether the backend can read anything in the requested profile"""
+        return self.wanted is None or len(self.wanted) > 0
+
+    def reads_other_than(self, found) -> bool:
+        """Whether the backend reads a symbology not in ``found``"""
+        return self.wanted is None or any(s not in found for s in self.wanted)
+
+    def _decode(self, image: np.ndarray) -> List[DecodedBarcode]:
+        raise NotImplementedError
+
+    def decode(self, image: np.ndarray) -> List[DecodedBarcode]:
+        """Decode and record hit rate and latency"""
+        start = time.perf_counter()
+        try:
+            results = self._decode(image)
+        except cv2.error:
+            results = []
+        if self.wanted is not None:
+            results = [r for r in results if r.type in self.wanted]
+        self.total_time += time.perf_counter() - start
+        self.attempts += 1
+        if results:
+            self.hits += 1
+        return results
+
+    @property
+    def mean_ms(self) -> float:
+        return 1000.0 * self.total_time / self.attempts if self.attempts else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.attempts if self.attempts else 0.0
+
+
+class PyzbarBackend(DecoderBackend):
+    """zbar via pyzbar; reads every 1D/2D format zbar supports"""
+    name = 'pyzbar'
+
+    def __init__(self, symbologies=None):
+        super().__init__(symbologies)
+        self.symbols = None
+        if self.wanted is not None:
+            self.wanted = tuple(s for s in self.wanted if s in pyzbar.ZBarSymbol.__members__)
+            self.symbols = [pyzbar.ZBarSymbol[s] for s in self.wanted]
+
+    @classmethod
+    def available(cls) -> bool:
+        return pyzbar is not None
+
+    def _decode(self, image):
+        barcodes = pyzbar.decode(image, symbols=self.symbols)
+        return [
+            DecodedBarcode(b.data, b.type, Rect(*b.rect),
+                           [Point(p.x, p.y) for p in b.polygon], self.name)
+            for b in barcodes
+        ]
+
+
+class OpenCVQRBackend(DecoderBackend):
+    """OpenCV's built-in QR code detector"""
+    name = 'opencv-qr'
+    symbologies = ('QRCODE',)
+
+    def __init__(self, symbologies=None):
+        super().__init__(symbologies)
+        self.detector = cv2.QRCodeDetector()
+
+    def _decode(self, image):
+        ok, texts, points, _ = self.detector.detectAndDecodeMulti(image)
+        if not ok or points is None:
+            return []
+        results = []
+        for text, quad in zip(texts, points):
+            if text:
+                polygon = [Point(int(x), int(y)) for x, y in quad]
+                results.append(DecodedBarcode(text.encode('utf-8'), 'QRCODE',
+                                              _polygon_rect(quad), polygon, self.name))
+        return results
+
+
+class OpenCVBarcodeBackend(DecoderBackend):
+    """OpenCV's 1D barcode detector (EAN/UPC family)"""
+    name = 'opencv-barcode'
+    symbologies = ('EAN13', 'EAN8', 'UPCA', 'UPCE')
+
+    def __init__(self, symbologies=None):
+        super().__init__(symbologies)
+        self.detector = cv2.barcode.BarcodeDetector()
+
+    @classmethod
+    def available(cls) -> bool:
+        return hasattr(cv2, 'barcode')
+
+    def _decode(self, image):
+        ok, texts, types, points = self.detector.detectAndDecodeWithType(image)
+        if not ok or points is None:
+            return []
+        results = []
+        for text, kind, quad in zip(texts, types, points):
+            if text:
+                polygon = [Point(int(x), int(y)) for x, y in quad]
+                # OpenCV says EAN_13, zbar says EAN13
+                results.append(DecodedBarcode(text.encode('utf-8'), kind.replace('_', ''),
+                                              _polygon_rect(quad), polygon, self.name))
+        return results
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (PyzbarBackend, OpenCVQRBackend, OpenCVBarcodeBackend)
+}
+
+
+class BarcodeDecoder:
+    """Decoding engine over several backends
+
+    ``cascade`` runs backends cheapest-first (by measured latency once each
+    has ``warmup`` samples; until then every backend runs on every frame)
+    and falls back on a miss: a later backend runs only if it reads a
+    symbology no earlier one found in the frame, so a hit for one
+    symbology never hides a code of another. ``parallel`` runs every
+    backend on a thread pool and waits for all of them, trading CPU for
+    latency on frames the first backend misses. Either way, codes of a
+    symbology an earlier backend already found are dropped.
+    """
+
+    def __init__(self, profile: str = DEFAULT_PROFILE,
+                 backends: Optional[Iterable[str]] = None,
+                 strategy: str = 'cascade', warmup: int = 5):
+        if strategy not in ('cascade', 'parallel'):
+            raise ValueError(f"Unknown decoding strategy '{strategy}'")
+        self.profile = profile
+        self.strategy = strategy
+        self.warmup = warmup
+        symbologies = PROFILES[profile]
+        names = list(backends) if backends else list(BACKENDS)
+        self.backends: List[DecoderBackend] = []
+        for name in names:
+            backend_cls = BACKENDS[name]
+            if not backend_cls.available():
+                continue
+            backend = backend_cls(symbologies)
+            if backend.useful():
+                self.backends.append(backend)
+        if not self.backends:
+            raise RuntimeError(f"No barcode decoder backend available for profile '{profile}'")
+        self.executor = None
+
+    def warmed_up(self) -> bool:
+        return all(b.attempts >= self.warmup for b in self.backends)
+
+    def ordered_backends(self) -> List[DecoderBackend]:
+        """Configured order until warmed up, then cheapest first"""
+        if not self.warmed_up():
+            return self.backends
+        return sorted(self.backends, key=lambda b: b.mean_ms)
+
+    def decode(self, image: np.ndarray) -> List[DecodedBarcode]:
+        if len(self.backends) == 1:
+            return self.backends[0].decode(image)
+        if self.strategy == 'parallel':
+            return self._parallel(image)
+        return self._cascade(image)
+
+    def _cascade(self, image: np.ndarray) -> List[DecodedBarcode]:
+        # Every backend runs while warming up, so each gets latency samples
+        warming = not self.warmed_up()
+        results: List[DecodedBarcode] = []
+        found = set()
+        for backend in self.ordered_backends():
+            if not warming and not backend.reads_other_than(found):
+                continue
+            results += [b for b in backend.decode(image) if b.type not in found]
+            found = {b.type for b in results}
+        return results
+
+    def _parallel(self, image: np.ndarray) -> List[DecodedBarcode]:
+        # zbar and OpenCV both release the GIL while decoding
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=len(self.backends))
+        futures = [self.executor.submit(b.decode, image) for b in self.backends]
+        # Wait for every backend: detectors are not safe to share between calls
+        results: List[DecodedBarcode] = []
+        for future in futures:
+            found = {b.type for b in results}
+            results += [b for b in future.result() if b.type not in found]
+        return results
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-backend attempts, hit rate and mean latency"""
+        return {
+            b.name: {
+                'attempts': b.attempts,
+                'hits': b.hits,
+                'hit_rate': round(b.hit_rate, 3),
+                'mean_ms': round(b.mean_ms, 2),
+            }
+            for b in self.backends
+        }
+
+    def report(self) -> str:
+        lines = []
+        for name, s in self.stats().items():
+            lines.append(f"{name}: {s['hits']}/{s['attempts']} hits "
+                         f"({s['hit_rate']:.0%}), {s['mean_ms']:.1f} ms avg")
+        return "\n".join(lines)
+
+
+def _offset(barcode, dx: int, dy: int):
+    """Shift a decoded barcode from ROI to full-frame coordinates"""
+    rect = barcode.rect._replace(left=barcode.rect.left + dx,
+                                 top=barcode.rect.top + dy)
+    polygon = [p._replace(x=p.x + dx, y=p.y + dy) for p in barcode.polygon]
+    return barcode._replace(rect=rect, polygon=polygon)
+
+
+def _bounding_rect(barcodes) -> Tuple[int, int, int, int]:
+    left = min(b.rect.left for b in barcodes)
+    top = min(b.rect.top for b in barcodes)
+    right = max(b.rect.left + b.rect.width for b in barcodes)
+    bottom = max(b.rect.top + b.rect.height for b in barcodes)
+    return left, top, right - left, bottom - top
+
+
+class RoiBarcodeDecoder:
+    """Decode around the last known barcode position first
+
+    Once a code has been found, the next frames are decoded in a padded
+    region around it. A full-frame sweep happens after a miss in the region,
+    and every ``full_sweep_every`` frames so new codes elsewhere still show up.
+    """
+
+    def __init__(self, decode=None, padding: float = 0.5, min_padding: int = 24,
+                 full_sweep_every: int = 10):
+        self.decode_fn = decode or BarcodeDecoder().decode
+        self.padding = padding
+        self.min_padding = min_padding
+        self.full_sweep_every = full_sweep_every
+        self.last_rect: Optional[Tuple[int, int, int, int]] = None
+        self.frames_since_sweep = 0
+        self.roi_hits = 0
+        self.roi_misses = 0
+        self.full_sweeps = 0
+
+    def reset(self):
+        """Forget the tracked region"""
+        self.last_rect = None
+        self.frames_since_sweep = 0
+
+    def roi_bounds(self, shape) -> Tuple[int, int, int, int]:
+        """Padded search window around the last hit, clipped to the frame"""
+        x, y, w, h = self.last_rect
+        pad = max(self.min_padding, int(self.padding * max(w, h)))
+        frame_h, frame_w = shape[:2]
+        return (max(0, x - pad), max(0, y - pad),
+                min(frame_w, x + w + pad), min(frame_h, y + h + pad))
+
+    def decode(self, frame: np.ndarray) -> List:
+        """Decode a frame, trying the tracked region before a full sweep"""
+        if self.last_rect is not None and self.frames_since_sweep < self.full_sweep_every:
+            x0, y0, x1, y1 = self.roi_bounds(frame.shape)
+            barcodes = self.decode_fn(frame[y0:y1, x0:x1])
+            self.frames_since_sweep += 1
+            if barcodes:
+                self.roi_hits += 1
+                barcodes = [_offset(b, x0, y0) for b in barcodes]
+                self.last_rect = _bounding_rect(barcodes)
+                return barcodes
+            self.roi_misses += 1
+
+        self.full_sweeps += 1
+        self.frames_since_sweep = 0
+        barcodes = self.decode_fn(frame)
+        self.last_rect = _bounding_rect(barcodes) if barcodes else None
+        return barcodes
+
+
+def _scale(barcode, factor: float):
+    """Map a decoded barcode from a resized image back to full size"""
+    rect = Rect(*(int(round(v * factor)) for v in barcode.rect))
+    polygon = [p._replace(x=int(round(p.x * factor)), y=int(round(p.y * factor)))
+               for p in barcode.polygon]
+    return barcode._replace(rect=rect, polygon=polygon)
+
+
+def _same_code(a, b, min_overlap: float = 0.5) -> bool:
+    """Same payload covering mostly the same area (one code seen by two tiles)"""
+    if a.data != b.data or a.type != b.type:
+        return False
+    width = min(a.rect.left + a.rect.width, b.rect.left + b.rect.width) - max(a.rect.left, b.rect.left)
+    height = min(a.rect.top + a.rect.height, b.rect.top + b.rect.height) - max(a.rect.top, b.rect.top)
+    if width < 0 or height < 0:
+        return False
+    smaller = min(a.rect.width * a.rect.height, b.rect.width * b.rect.height)
+    # Degenerate rects (zbar gives 1D codes a height of 0-1 px at times)
+    return smaller <= 0 or width * height >= min_overlap * smaller
+
+
+def _tile_starts(length: int, tile: int, step: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, step))
+    return starts + [length - tile]
+
+
+class TiledBarcodeDecoder:
+    """Large-image mode: decode overlapping tiles in parallel
+
+    Images whose longer side is above ``min_size`` are cut into
+    ``tile_size`` tiles overlapping by ``overlap`` pixels, so any code smaller
+    than the overlap is whole in at least one tile. Tiles are decoded on a
+    thread pool (one engine per thread), plus a downscaled ``overview`` pass
+    for codes larger than a tile. Hits are mapped back to full-image
+    coordinates and duplicates across seams are merged. Smaller images are
+    decoded in one go, like ``BarcodeDecoder``.
+    """
+
+    def __init__(self, profile: str = DEFAULT_PROFILE, backends: Optional[Iterable[str]] = None,
+                 tile_size: int = 1600, overlap: int = 400, min_size: int = 2400,
+                 overview: int = 1600, workers: Optional[int] = None):
+        if overlap >= tile_size:
+            raise ValueError("overlap must be smaller than tile_size")
+        self.profile = profile
+        self.backend_names = list(backends) if backends else None
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.min_size = min_size
+        self.overview = overview
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.local = threading.local()
+        self.executor = None
+        self.last_tiles = 0
+        # Fail early (no backend for the profile) rather than in a worker thread
+        self._engine()
+
+    def _engine(self) -> BarcodeDecoder:
+        """This thread's engine (backends keep per-call state and counters)"""
+        engine = getattr(self.local, 'engine', None)
+        if engine is None:
+            engine = self.local.engine = BarcodeDecoder(self.profile, self.backend_names)
+        return engine
+
+    def tiles(self, shape) -> List[Tuple[int, int, int, int]]:
+        """(x0, y0, x1, y1) of every tile for an image of this shape"""
+        height, width = shape[:2]
+        step = self.tile_size - self.overlap
+        return [(x, y, min(width, x + self.tile_size), min(height, y + self.tile_size))
+                for y in _tile_starts(height, self.tile_size, step)
+                for x in _tile_starts(width, self.tile_size, step)]
+
+    def _decode_tile(self, image: np.ndarray, bounds) -> List[DecodedBarcode]:
+        x0, y0, x1, y1 = bounds
+        return [_offset(b, x0, y0) for b in self._engine().decode(image[y0:y1, x0:x1])]
+
+    def _decode_overview(self, image: np.ndarray) -> List[DecodedBarcode]:
+        factor = max(image.shape[:2]) / self.overview
+        small = cv2.resize(image, None, fx=1 / factor, fy=1 / factor, interpolation=cv2.INTER_AREA)
+        return [_scale(b, factor) for b in self._engine().decode(small)]
+
+    def decode(self, image: np.ndarray) -> List[DecodedBarcode]:
+        if max(image.shape[:2]) <= self.min_size:
+            self.last_tiles = 1
+            return self._engine().decode(image)
+
+        tiles = self.tiles(image.shape)
+        self.last_tiles = len(tiles)
+        jobs = [(self._decode_tile, (image, bounds)) for bounds in tiles]
+        if self.overview and max(image.shape[:2]) > self.overview:
+            jobs.append((self._decode_overview, (image,)))
+        if self.workers > 1:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers)
+            # zbar and OpenCV both release the GIL while decoding
+            futures = [self.executor.submit(fn, *args) for fn, args in jobs]
+            found = [b for future in futures for b in future.result()]
+        else:
+            found = [b for fn, args in jobs for b in fn(*args)]
+        return self.merge(found)
+
+    @staticmethod
+    def merge(barcodes: List[DecodedBarcode]) -> List[DecodedBarcode]:
+        """Drop duplicates from overlapping tiles, keeping the largest view"""
+        merged: List[DecodedBarcode] = []
+        for barcode in sorted(barcodes, key=lambda b: b.rect.width * b.rect.height, reverse=True):
+            if not any(_same_code(barcode, kept) for kept in merged):
+                merged.append(barcode)
+        return sorted(merged, key=lambda b: (b.rect.top, b.rect.left))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+
+def main():
+    """Compare backends on a set of images: python barcode_decoder.py [--profile P] images..."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark barcode decoder backends")
+    parser.add_argument('images', nargs='+')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE, choices=sorted(PROFILES))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    images = [(path, cv2.imread(path)) for path in args.images]
+    for name in BACKENDS:
+        try:
+            decoder = BarcodeDecoder(args.profile, backends=[name])
+        except RuntimeError:
+            print(f"{name}: not available for profile '{args.profile}'")
+            continue
+        for path, image in images:
+            if image is None:
+                print(f"Cannot read {path}", file=sys.stderr)
+                continue
+            for _ in range(args.repeat):
+                decoder.decode(image)
+        print(decoder.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Barcode Scenes - Synthetic camera frames of our cards, and a decode matrix
+
+The CODE128 and QR codes issued by generate_barcodes.py are printed on a
+card, placed on a cluttered counter and degraded the way real scans are:
+small or far away, rotated, tilted, out of focus, under glare, heavily
+JPEG-compressed, in low light, or worn. The matrix harness decodes those
+scenes with each decoder setting at several capture resolutions and reports
+decode rate against milliseconds per frame, so a site can pick the cheapest
+setting that still reads its worst cards:
+
+    python3 barcode_scenes.py matrix --resolutions 1280,640,480 --min-rate 0.9
+    python3 barcode_scenes.py scenes -o scenes/      # write sample frames
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from barcode_decoder import BACKENDS, BarcodeDecoder
+
+# Degradation levels, mildest first; each scene varies one of them
+LEVELS = {
+    'scale': [0.5, 0.3, 0.2, 0.12],        # code width / frame width
+    'rotation': [0, 15, 45, 80],            # degrees
+    'perspective': [0.0, 0.1, 0.2, 0.3],    # corner displacement / code size
+    'blur': [0.0, 1.0, 2.0, 3.5],           # Gaussian sigma (px at 1280 wide)
+    'glare': [0.0, 0.4, 0.7, 0.9],          # peak highlight strength
+    'jpeg': [95, 50, 25, 10],               # JPEG quality
+    'low_light': [1.0, 0.5, 0.3, 0.15],     # exposure factor (noise rises as it drops)
+    'wear': [0.0, 0.3, 0.6, 0.9],           # fading and scratches
+}
+# Scene parameters when not being varied
+BASELINE = {'scale': 0.35, 'rotation': 0, 'perspective': 0.0, 'blur': 0.0,
+            'glare': 0.0, 'jpeg': 90, 'low_light': 1.0, 'wear': 0.0}
+
+SCENE_SIZE = (1280, 960)
+SYMBOLOGIES = ('CODE128', 'QRCODE')
+
+
+def render_code(symbology: str, data: str) -> np.ndarray:
+    """A code as printed on our cards, as a greyscale image"""
+    from generate_barcodes import render_barcode, render_qrcode
+    if symbology == 'CODE128':
+        image = render_barcode(data)
+    elif symbology == 'QRCODE':
+        image = render_qrcode(data)
+    else:
+        raise ValueError(f"Unsupported symbology '{symbology}'")
+    return cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2GRAY)
+
+
+def _background(size: Tuple[int, int], rng: np.random.Generator) -> np.ndarray:
+    """A counter top: lighting gradient, clutter and sensor-like texture"""
+    width, height = size
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    base = 90 + 60 * (0.6 * x + 0.4 * y)
+    frame = np.repeat(base[:, :, None], 3, axis=2) * rng.uniform(0.8, 1.1, 3)
+    for _ in range(8):
+        x0, y0 = int(rng.integers(0, width)), int(rng.integers(0, height))
+        x1, y1 = x0 + int(rng.integers(40, width // 3)), y0 + int(rng.integers(40, height // 3))
+        colour = tuple(float(c) for c in rng.integers(30, 220, 3))
+        cv2.rectangle(frame, (x0, y0), (x1, y1), colour, -1)
+    frame += rng.normal(0, 4, frame.shape)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def _card(code: np.ndarray, wear: float, rng: np.random.Generator) -> np.ndarray:
+    """The code on a white card with a margin; worn cards fade and scratch"""
+    h, w = code.shape
+    margin = max(h, w) // 8
+    card = np.full((h + 2 * margin, w + 2 * margin), 250, np.uint8)
+    card[margin:margin + h, margin:margin + w] = code
+    if wear > 0:
+        # Print fades towards grey, then scratches cut across it
+        card = (card.astype(np.float32) * (1 - 0.5 * wear) + 255 * 0.5 * wear).astype(np.uint8)
+        for _ in range(int(12 * wear)):
+            p0 = (int(rng.integers(0, card.shape[1])), int(rng.integers(0, card.shape[0])))
+            p1 = (int(rng.integers(0, card.shape[1])), int(rng.integers(0, card.shape[0])))
+            cv2.line(card, p0, p1, 235, int(rng.integers(1, 4)))
+    return card
+
+
+def compose_scene(code: np.ndarray, params: Dict, size: Tuple[int, int] = SCENE_SIZE,
+                  rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Place a card carrying ``code`` into a frame with the given degradations"""
+    rng = rng or np.random.default_rng()
+    p = dict(BASELINE, **params)
+    width, height = size
+    frame = _background(size, rng)
+    card = _card(code, p['wear'], rng)
+
+    # Target quad: scaled, rotated about a random centre, then corner-jittered
+    card_h, card_w = card.shape
+    target_w = p['scale'] * width * card_w / code.shape[1]
+    target_h = target_w * card_h / card_w
+    corners = np.array([[-target_w, -target_h], [target_w, -target_h],
+                        [target_w, target_h], [-target_w, target_h]], np.float32) / 2
+    angle = np.deg2rad(p['rotation'])
+    rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]],
+                        np.float32)
+    corners = corners @ rotation.T
+    corners += rng.uniform(-1, 1, corners.shape).astype(np.float32) * p['perspective'] * target_w
+    extent = np.abs(corners).max(axis=0)
+    cx = rng.uniform(extent[0], max(extent[0] + 1, width - extent[0]))
+    cy = rng.uniform(extent[1], max(extent[1] + 1, height - extent[1]))
+    quad = corners + np.array([cx, cy], np.float32)
+
+    source = np.array([[0, 0], [card_w, 0], [card_w, card_h], [0, card_h]], np.float32)
+    warp = cv2.getPerspectiveTransform(source, quad)
+    warped = cv2.warpPerspective(card, warp, size, flags=cv2.INTER_AREA)
+    mask = cv2.warpPerspective(np.full_like(card, 255), warp, size, flags=cv2.INTER_AREA)
+    alpha = (mask.astype(np.float32) / 255.0)[:, :, None]
+    frame = (frame * (1 - alpha) + warped[:, :, None] * alpha).astype(np.float32)
+
+    if p['glare'] > 0:
+        # Specular highlight somewhere on the card
+        gx, gy = quad.mean(axis=0) + rng.uniform(-0.3, 0.3, 2) * target_w
+        yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+        radius = 0.35 * target_w
+        spot = np.exp(-((xx - gx) ** 2 + (yy - gy) ** 2) / (2 * radius ** 2))
+        frame += (255 * p['glare'] * spot)[:, :, None]
+    if p['low_light'] < 1.0:
+        frame *= p['low_light']
+        # Gain noise grows as exposure drops
+        frame += rng.normal(0, 3 / p['low_light'], frame.shape)
+    frame = np.clip(frame, 0, 255).astype(np.uint8)
+    if p['blur'] > 0:
+        sigma = p['blur'] * width / 1280
+        frame = cv2.GaussianBlur(frame, (0, 0), sigma)
+    if p['jpeg'] < 100:
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(p['jpeg'])])
+        frame = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+    return frame
+
+
+def generate_scenes(symbologies=SYMBOLOGIES, data: str = '123456789', samples: int = 3,
+                    seed: int = 0) -> Iterator[Tuple[str, str, object, np.ndarray]]:
+    """(symbology, degradation, level, frame) for every level of every degradation"""
+    rng = np.random.default_rng(seed)
+    for symbology in symbologies:
+        code = render_code(symbology, data)
+        for degradation, levels in LEVELS.items():
+            for level in levels:
+                for _ in range(samples):
+                    frame = compose_scene(code, {degradation: level}, rng=rng)
+                    yield symbology, degradation, level, frame
+
+
+def decoder_settings() -> Dict[str, Callable[[], BarcodeDecoder]]:
+    """Decoder configurations to sweep: each available backend, as a cascade and in parallel"""
+    settings = {}
+    for name, backend in BACKENDS.items():
+        if backend.available():
+            settings[name] = lambda name=name: BarcodeDecoder('cards', backends=[name])
+    settings['cascade'] = lambda: BarcodeDecoder('cards')
+    settings['parallel'] = lambda: BarcodeDecoder('cards', strategy='parallel')
+    return settings
+
+
+def run_matrix(resolutions: List[int], settings: Optional[Dict] = None,
+               samples: int = 3, data: str = '123456789', seed: int = 0) -> List[Dict]:
+    """Decode rate and ms/frame for every setting at every capture width
+
+    Rows carry an overall rate, a rate per symbology and per degradation
+    level (e.g. ``blur=2.0``), and the mean and p95 decode time.
+    """
+    scenes = list(generate_scenes(SYMBOLOGIES, data, samples, seed))
+    settings = settings or decoder_settings()
+    rows = []
+    for name, factory in settings.items():
+        try:
+            decoder = factory()
+        except RuntimeError as e:
+            print(f"{name}: skipped ({e})")
+            continue
+        for width in resolutions:
+            hits: Dict[str, List[int]] = {}
+            timings = []
+            for symbology, degradation, level, frame in scenes:
+                h, w = frame.shape[:2]
+                if width != w:
+                    frame = cv2.resize(frame, (width, int(h * width / w)),
+                                       interpolation=cv2.INTER_AREA)
+                start = time.perf_counter()
+                barcodes = decoder.decode(frame)
+                timings.append((time.perf_counter() - start) * 1000.0)
+                ok = any(b.data.decode('utf-8', 'replace') == data for b in barcodes)
+                for key in ('all', symbology, f"{degradation}={level}"):
+                    hits.setdefault(key, []).append(ok)
+            rows.append({
+                'setting': name,
+                'width': width,
+                'decode_rate': round(float(np.mean(hits['all'])), 3),
+                'mean_ms': round(float(np.mean(timings)), 2),
+                'p95_ms': round(float(np.percentile(timings, 95)), 2),
+                'rates': {key: round(float(np.mean(v)), 3)
+                          for key, v in hits.items() if key != 'all'},
+            })
+    return rows
+
+
+def cheapest(rows: List[Dict], min_rate: float, key: Optional[str] = None) -> Optional[Dict]:
+    """Fastest row whose decode rate (overall, or for ``key``) meets ``min_rate``"""
+    good = [r for r in rows
+            if (r['rates'].get(key, 0.0) if key else r['decode_rate']) >= min_rate]
+    return min(good, key=lambda r: r['mean_ms']) if good else None
+
+
+def print_matrix(rows: List[Dict]):
+    columns = ['CODE128', 'QRCODE'] + [f"{d}={LEVELS[d][-1]}" for d in LEVELS]
+    print(f"{'setting':>16} {'width':>5} {'rate':>6} {'ms':>7} {'p95':>7}  "
+          + " ".join(f"{c:>14}" for c in columns))
+    for r in sorted(rows, key=lambda r: r['mean_ms']):
+        print(f"{r['setting']:>16} {r['width']:>5} {r['decode_rate']:>6.0%} "
+              f"{r['mean_ms']:>7.2f} {r['p95_ms']:>7.2f}  "
+              + " ".join(f"{r['rates'].get(c, 0.0):>14.0%}" for c in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic barcode scenes and decode matrix")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scenes = commands.add_parser('scenes', help="Write sample scenes as JPEG files")
+    scenes.add_argument('-o', '--output', default='barcode_scenes')
+    scenes.add_argument('--data', default='123456789')
+    scenes.add_argument('--samples', type=int, default=1)
+
+    matrix = commands.add_parser('matrix', help="Decode rate vs ms/frame per setting")
+    matrix.add_argument('--resolutions', default='1280,640,480',
+                        help="Capture widths to decode at")
+    matrix.add_argument('--samples', type=int, default=3, help="Scenes per degradation level")
+    matrix.add_argument('--data', default='123456789')
+    matrix.add_argument('--min-rate', type=float, default=0.9,
+                        help="Decode rate the recommended setting must reach")
+    matrix.add_argument('--json', help="Write the matrix to this file")
+    args = parser.parse_args()
+
+    if args.command == 'scenes':
+        os.makedirs(args.output, exist_ok=True)
+        count = 0
+        for symbology, degradation, level, frame in generate_scenes(
+                SYMBOLOGIES, args.data, args.samples):
+            name = f"{symbology.lower()}_{degradation}_{level}_{count:04d}.jpg"
+            cv2.imwrite(os.path.join(args.output, name), frame)
+            count += 1
+        print(f"Wrote {count} scenes to {os.path.abspath(args.output)}")
+        return
+
+    resolutions = [int(w) for w in args.resolutions.split(',')]
+    rows = run_matrix(resolutions, samples=args.samples, data=args.data)
+    print_matrix(rows)
+    best = cheapest(rows, args.min_rate)
+    if best:
+        print(f"\nCheapest setting with >= {args.min_rate:.0%} decoded: "
+              f"{best['setting']} at {best['width']} px ({best['mean_ms']} ms/frame)")
+    else:
+        print(f"\nNo setting reaches {args.min_rate:.0%}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'data': args.data, 'samples': args.samples, 'rows': rows}, f, indent=2)
+        print(f"Matrix written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
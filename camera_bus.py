@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Camera Bus - One capture thread per camera, shared by any number of consumers
+
+Frames are captured straight into a small ring of preallocated buffers.
+Subscribers receive read-only views of those buffers (no copies); the slot a
+subscriber is currently looking at is pinned so the capture thread never
+overwrites it underneath them.
+
+Capture runs independently of processing: a slow consumer always gets the
+newest frame when it asks for one, and stale frames are dropped (and counted)
+rather than queued up behind it.
+
+Sources are opened through frame_sources, so a bus can also be fed from a
+video file, an image folder or a synthetic stream.
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from frame_sources import open_frame_source, normalize_source
+
+# Back-off between failed reads (seconds), doubling up to the maximum
+READ_RETRY_DELAY = 0.05
+READ_RETRY_MAX_DELAY = 1.0
+# Consecutive failed reads after which the device counts as failed
+MAX_READ_FAILURES = 20
+# Wait for a reader to let go when every ring slot is pinned (seconds)
+PINNED_WAIT = 0.01
+
+
+class FrameSubscription:
+    """A consumer's view of a camera bus
+
+    ``read()`` mirrors ``cv2.VideoCapture.read()`` so existing camera loops
+    can switch over without restructuring. Each call returns the newest frame
+    the subscriber has not seen yet; anything captured in between is skipped
+    and counted in ``frames_dropped``.
+    """
+
+    def __init__(self, bus: 'CameraBus'):
+        self.bus = bus
+        self.last_seq = 0
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.pinned_slot = None
+        self.closed = False
+
+    def read(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray]]:
+        """Wait for a newer frame and return it as a read-only view"""
+        return self.bus._read(self, timeout)
+
+    @property
+    def active(self) -> bool:
+        """False once the subscription is closed or the bus has stopped or failed
+
+        ``read()`` also returns False on a plain timeout; loops should only
+        give up when this is False.
+        """
+        return not self.closed and self.bus.running
+
+    def close(self):
+        """Release the pinned slot and detach from the bus"""
+        self.bus._unsubscribe(self)
+
+
+class CameraBus:
+    """Single capture thread publishing frames into a shared ring buffer"""
+
+    def __init__(self, source=0, width: int = 640, height: int = 480,
+                 ring_size: int = 4):
+        self.source = source
+        self.width = width
+        self.height = height
+        # One slot is being written, every subscriber may pin one more
+        self.ring_size = max(2, ring_size)
+        self.camera = None
+        self.running = False
+        self.thread = None
+        self.subscriptions: List[FrameSubscription] = []
+        self.frames_captured = 0
+        # Frames thrown away because every ring slot was pinned
+        self.frames_discarded = 0
+        self.read_failures = 0
+        # Set when the device stopped delivering frames for good
+        self.failed = False
+        # Set when a recorded or synthetic source played to its end
+        self.ended = False
+
+        self._cond = threading.Condition()
+        self._slots: List[Optional[np.ndarray]] = [None] * self.ring_size
+        self._slot_seq = [0] * self.ring_size
+        self._slot_pins = [0] * self.ring_size
+        self._latest_slot = None
+        self._seq = 0
+        self._write_slot = 0
+
+    def start(self) -> bool:
+        """Open the camera and start the capture thread"""
+        if self.running:
+            return True
+        self.camera = open_frame_source(self.source)
+        if not self.camera.isOpened():
+            print(f"Cannot open camera {self.source}")
+            self.camera.release()
+            self.camera = None
+            return False
+        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        # Keep the driver queue short so we never grab a backlog of old frames
+        self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self.running = True
+        self.failed = False
+        self.ended = False
+        self.read_failures = 0
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """Stop capturing and release the camera"""
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+        self.thread = None
+        if self.camera:
+            self.camera.release()
+            self.camera = None
+
+    def subscribe(self) -> FrameSubscription:
+        """Register a new consumer"""
+        subscription = FrameSubscription(self)
+        with self._cond:
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: FrameSubscription):
+        with self._cond:
+            self._unpin(subscription)
+            subscription.closed = True
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+            self._cond.notify_all()
+
+    def _unpin(self, subscription: FrameSubscription):
+        if subscription.pinned_slot is not None:
+            self._slot_pins[subscription.pinned_slot] -= 1
+            subscription.pinned_slot = None
+            # The capture thread may be waiting for a free slot
+            self._cond.notify_all()
+
+    def _next_free_slot(self) -> Optional[int]:
+        """Pick the oldest slot nobody is holding"""
+        for offset in range(self.ring_size):
+            index = (self._write_slot + offset) % self.ring_size
+            if self._slot_pins[index] == 0 and index != self._latest_slot:
+                return index
+        return None
+
+    def _read_failed(self) -> bool:
+        """Back off after a failed read; True when the loop should stop"""
+        if not self.running:
+            return True
+        # Recorded and synthetic sources end; cameras just hiccup
+        if getattr(self.camera, 'finished', False):
+            self.ended = True
+            return True
+        self.read_failures += 1
+        if self.read_failures >= MAX_READ_FAILURES:
+            print(f"Camera {self.source} failed: {self.read_failures} reads in a row returned nothing")
+            self.failed = True
+            return True
+        delay = min(READ_RETRY_MAX_DELAY, READ_RETRY_DELAY * 2 ** (self.read_failures - 1))
+        with self._cond:
+            self._cond.wait_for(lambda: not self.running, timeout=delay)
+        return False
+
+    def _capture_loop(self):
+        scratch = None
+        while self.running:
+            with self._cond:
+                index = self._next_free_slot()
+                # Hide the slot from readers while the driver writes into it
+                if index is not None:
+                    self._slot_seq[index] = 0
+
+            if index is None:
+                # Every slot is pinned; keep the driver drained but drop the frame
+                ret, scratch = self.camera.read(scratch)
+                if not ret:
+                    if self._read_failed():
+                        break
+                    continue
+                self.read_failures = 0
+                self.frames_discarded += 1
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: not self.running or self._next_free_slot() is not None,
+                        timeout=PINNED_WAIT
+                    )
+                continue
+
+            ret, frame = self.camera.read(self._slots[index])
+            if not ret or frame is None:
+                if self._read_failed():
+                    break
+                continue
+            self.read_failures = 0
+
+            with self._cond:
+                self._seq += 1
+                self.frames_captured += 1
+                if frame is not self._slots[index]:
+                    # First frame or resolution change: keep the new buffer
+                    self._slots[index] = frame
+                self._slot_seq[index] = self._seq
+                self._latest_slot = index
+                self._write_slot = (index + 1) % self.ring_size
+                self._cond.notify_all()
+
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+
+    def _read(self, subscription: FrameSubscription,
+              timeout: float) -> Tuple[bool, Optional[np.ndarray]]:
+        with self._cond:
+            self._unpin(subscription)
+            ready = self._cond.wait_for(
+                lambda: (not self.running or subscription.closed
+                         or self._seq > subscription.last_seq),
+                timeout=timeout
+            )
+            if not ready or subscription.closed or self._latest_slot is None:
+                return False, None
+            if self._seq <= subscription.last_seq:
+                return False, None
+
+            index = self._latest_slot
+            self._slot_pins[index] += 1
+            subscription.pinned_slot = index
+            if subscription.last_seq:
+                subscription.frames_dropped += (
+                    self._slot_seq[index] - subscription.last_seq - 1
+                )
+            subscription.last_seq = self._slot_seq[index]
+            subscription.frames_read += 1
+            view = self._slots[index].view()
+            view.flags.writeable = False
+            return True, view
+
+
+# Buses shared between consumers of the same camera, keyed by source
+_buses: Dict[object, CameraBus] = {}
+_bus_refs: Dict[object, int] = {}
+_registry_lock = threading.Lock()
+
+
+def acquire_camera_bus(source=0, width: int = 640, height: int = 480,
+                       ring_size: int = 4) -> Optional[CameraBus]:
+    """Get the running bus for a camera, opening the device on first use"""
+    source = normalize_source(source)
+    with _registry_lock:
+        bus = _buses.get(source)
+        if bus is not None and not bus.running:
+            # Failed or finished; its remaining users release it on their own
+            del _buses[source]
+            del _bus_refs[source]
+            bus = None
+        if bus is None:
+            bus = CameraBus(source, width, height, ring_size)
+            if not bus.start():
+                return None
+            _buses[source] = bus
+            _bus_refs[source] = 0
+        _bus_refs[source] += 1
+        return bus
+
+
+def release_camera_bus(bus: CameraBus):
+    """Drop a reference; the camera is closed when the last user leaves"""
+    with _registry_lock:
+        if _buses.get(bus.source) is not bus:
+            return
+        _bus_refs[bus.source] -= 1
+        if _bus_refs[bus.source] > 0:
+            return
+        del _buses[bus.source]
+        del _bus_refs[bus.source]
+    bus.stop()
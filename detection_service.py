@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Detection Service - Headless person and barcode detection
+
+Runs the camera lanes from lane_manager.py without Qt or a display, resolves
+scanned cards to users, and publishes events over a small local HTTP server:
+
+    GET /events   Server-Sent Events stream (person, barcode, login, unknown_user,
+                  lookup_failed, rejected_card, login_confirmed, login_revoked)
+    GET /stats    Lane FPS/latency, scan and API statistics as JSON
+    GET /metrics  Per-stage timing histograms for every lane (pipeline_metrics)
+    GET /health   Liveness check
+
+Signed cards (signed_payload.py) are verified locally when BARCODE_SIGNING_KEY
+is set: the login is published at once and confirmed with the backend in the
+background, as in the Qt window.
+
+The Qt window can attach to a running service as a client instead of opening
+the cameras itself (see DETECTION_SERVICE_URL in integrated_system.py).
+"""
+
+import json
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from lane_manager import LaneManager, load_lanes, default_frame_budget
+from scan_session import BarcodeUserResolver, MISSING
+from order_api import OrderSystemAPI
+from signed_payload import PayloadError, is_signed, signing_key, verify_payload
+from pipeline_metrics import snapshot_all, install_dump_signal
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Same scan debounce and user caching as the Qt window
+SCAN_DEBOUNCE_WINDOW = 3.0
+USER_CACHE_TTL = 300.0
+UNKNOWN_USER_TTL = 15.0
+
+
+class EventHub:
+    """Fan-out of events to any number of subscriber queues
+
+    Each subscriber gets a bounded queue; a client that stops reading loses
+    its oldest events rather than holding up the detection lanes.
+    """
+
+    def __init__(self, backlog: int = 100, queue_size: int = 256):
+        self.queue_size = queue_size
+        self.recent: deque = deque(maxlen=backlog)
+        self.subscribers: List[queue.Queue] = []
+        self.lock = threading.Lock()
+        self.next_id = 1
+
+    def publish(self, event: Dict) -> Dict:
+        with self.lock:
+            event = dict(event, id=self.next_id)
+            self.next_id += 1
+            self.recent.append(event)
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            while True:
+                try:
+                    q.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+        return event
+
+    def subscribe(self, last_id: int = 0) -> queue.Queue:
+        """New subscriber queue, replaying recent events after ``last_id``"""
+        q = queue.Queue(maxsize=self.queue_size)
+        with self.lock:
+            for event in self.recent:
+                if event['id'] > last_id and not q.full():
+                    q.put_nowait(event)
+            self.subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self.lock:
+            if q in self.subscribers:
+                self.subscribers.remove(q)
+
+
+class DetectionService:
+    """Camera lanes, user resolution and the event endpoint in one process"""
+
+    def __init__(self, lanes: List[Dict], host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 api_url: str = "http://localhost:3001", **lane_options):
+        self.hub = EventHub()
+        self.lanes = LaneManager(lanes, **lane_options)
+        self.lanes.subscribe(self.on_lane_event)
+        self.order_api = OrderSystemAPI(api_url)
+        self.user_resolver = BarcodeUserResolver(
+            lambda data: self.order_api.check_user_by_barcode(data, raise_errors=True),
+            window=SCAN_DEBOUNCE_WINDOW, ttl=USER_CACHE_TTL, negative_ttl=UNKNOWN_USER_TTL
+        )
+        # Cards with signed payloads are checked locally when a key is set
+        self.signing_key = signing_key()
+        # Several scan lanes may report at once
+        self.scan_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.server.daemon_threads = True
+        self.server_thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def on_lane_event(self, event: Dict):
+        """Lane thread callback: publish, and start a user lookup for scans"""
+        if event['type'] != 'barcode':
+            self.hub.publish(event)
+            return
+        with self.scan_lock:
+            if not self.user_resolver.accept(event['data']):
+                return
+            user = self.user_resolver.cached(event['data'])
+        self.hub.publish(event)
+        if self.signing_key and is_signed(event['data']):
+            self.on_signed_card(event, user)
+            return
+        if user is not MISSING:
+            self.publish_login(event, user)
+            return
+        self.order_api.check_user_by_barcode_async(
+            event['data'], callback=lambda result, error: self.on_user_resolved(event, result, error)
+        )
+
+    def on_user_resolved(self, event: Dict, user: Optional[Dict],
+                         error: Optional[BaseException] = None):
+        if error is not None:
+            # Not cached, so the next scan of the card asks again
+            print(f"User lookup failed for {event['data']}: {error}")
+            self.publish_card_event(event, 'lookup_failed', error=str(error))
+            return
+        with self.scan_lock:
+            self.user_resolver.store(event['data'], user)
+        self.publish_login(event, user)
+
+    def on_signed_card(self, event: Dict, user):
+        """Signed card: verify locally and publish the login now, confirm it later"""
+        try:
+            signed = verify_payload(event['data'], self.signing_key)
+        except PayloadError as e:
+            self.publish_card_event(event, 'rejected_card', error=str(e))
+            return
+        if user is not MISSING:
+            self.publish_login(event, user)
+            return
+        self.publish_login(event, {'id': signed.user_id, 'type': signed.tier, 'confirmed': False})
+        # raise_errors: an unreachable backend must not look like an unknown user
+        self.order_api.submit(
+            self.order_api.check_user_by_barcode, signed.user_id, True,
+            callback=lambda result, error: self.on_signed_card_confirmed(event, signed,
+                                                                         result, error)
+        )
+
+    def on_signed_card_confirmed(self, event: Dict, signed, user: Optional[Dict],
+                                 error: Optional[BaseException]):
+        if error is not None:
+            # The signature is proof enough to carry on offline
+            print(f"Backend unreachable; continuing with verified card {signed.user_id}")
+            return
+        with self.scan_lock:
+            self.user_resolver.store(event['data'], user)
+        if user:
+            self.publish_card_event(event, 'login_confirmed', user_id=signed.user_id, user=user)
+        else:
+            # Valid signature, but the backend no longer knows the user (e.g. deleted)
+            self.publish_card_event(event, 'login_revoked', user_id=signed.user_id)
+
+    def publish_card_event(self, event: Dict, kind: str, **fields):
+        self.hub.publish(dict(fields, type=kind, lane=event['lane'], data=event['data'],
+                              time=time.time()))
+
+    def publish_login(self, event: Dict, user: Optional[Dict]):
+        self.hub.publish({
+            'type': 'login' if user else 'unknown_user',
+            'lane': event['lane'],
+            'data': event['data'],
+            'user': user,
+            'time': time.time(),
+        })
+
+    def stats(self) -> Dict:
+        return {
+            'lanes': self.lanes.stats(),
+            'scans': self.user_resolver.stats(),
+            'api': self.order_api.latency_stats(),
+            'clients': len(self.hub.subscribers),
+        }
+
+    def start(self):
+        self.lanes.start()
+        self.server_thread = threading.Thread(target=self.server.serve_forever,
+                                              name='detection-http', daemon=True)
+        self.server_thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.lanes.stop()
+        self.order_api.close()
+
+
+def _make_handler(service: DetectionService):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, body: Dict, status: int = 200):
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == '/health':
+                self.send_json({'status': 'ok'})
+            elif path == '/stats':
+                self.send_json(service.stats())
+            elif path == '/metrics':
+                self.send_json(snapshot_all())
+            elif path == '/events':
+                self.stream_events()
+            else:
+                self.send_json({'error': 'not found'}, 404)
+
+        def stream_events(self):
+            try:
+                last_id = int(self.headers.get('Last-Event-ID', 0))
+            except ValueError:
+                last_id = 0
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            events = service.hub.subscribe(last_id)
+            try:
+                while True:
+                    try:
+                        event = events.get(timeout=15.0)
+                        message = (f"id: {event['id']}\nevent: {event['type']}\n"
+                                   f"data: {json.dumps(event)}\n\n")
+                    except queue.Empty:
+                        # Comment line keeps proxies and dead-peer detection happy
+                        message = ": keepalive\n\n"
+                    self.wfile.write(message.encode('utf-8'))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                service.hub.unsubscribe(events)
+
+    return Handler
+
+
+class DetectionServiceClient:
+    """Follows a service's event stream on a background thread
+
+    ``on_event`` is called on that thread with each event dict. The client
+    reconnects after errors and resumes from the last event it saw.
+    """
+
+    def __init__(self, url: str, on_event: Callable[[Dict], None], retry_delay: float = 2.0):
+        self.url = url.rstrip('/')
+        self.on_event = on_event
+        self.retry_delay = retry_delay
+        self.last_id = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='detection-client', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop following; the thread exits at the next event or keepalive"""
+        self.running = False
+
+    def _run(self):
+        while self.running:
+            try:
+                headers = {'Last-Event-ID': str(self.last_id)} if self.last_id else {}
+                # The server sends a keepalive every 15 s, well inside the read timeout
+                with requests.get(f"{self.url}/events", headers=headers,
+                                  stream=True, timeout=(2.0, 60.0)) as response:
+                    self._follow(response)
+            except Exception as e:
+                if self.running:
+                    print(f"Detection service connection error: {e}")
+            if self.running:
+                time.sleep(self.retry_delay)
+
+    def _follow(self, response):
+        data = []
+        # Unbuffered: events are small and should arrive immediately
+        for line in response.iter_lines(chunk_size=1, decode_unicode=True):
+            if not self.running:
+                return
+            if line.startswith('data:'):
+                data.append(line[5:].strip())
+            elif line == '' and data:
+                event = json.loads('\n'.join(data))
+                data = []
+                self.last_id = event.get('id', self.last_id)
+                self.on_event(event)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Headless person and barcode detection service")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--lanes', help="JSON lane list (default: CAMERA_LANES in config)")
+    parser.add_argument('--max-fps', type=float, help="Total frame budget (default: config)")
+    parser.add_argument('--api-url', default="http://localhost:3001", help="Order system API")
+    parser.add_argument('--processes', action='store_true', help="Analyze in worker processes")
+    args = parser.parse_args()
+
+    service = DetectionService(
+        load_lanes(args.lanes), args.host, args.port, api_url=args.api_url,
+        max_total_fps=args.max_fps or default_frame_budget(),
+        analyzer_mode='processes' if args.processes else 'threads'
+    )
+    service.start()
+    install_dump_signal()
+    print(f"Detection service on {service.url} ({len(service.lanes.lanes)} lanes)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Face Detector - Shared person detection for the welcome and integrated systems
+
+A cheap frame-difference check on a thumbnail runs first; the face detector
+only runs when something in view has moved. Detection works on a
+reduced-resolution copy of the frame and boxes are scaled back afterwards.
+
+Two detector backends are available: OpenCV's Haar cascade and a CPU-only
+``cv2.dnn`` SSD face model. Either can run every frame, or every Nth frame
+with a cheap template-matching tracker in between.
+"""
+
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from frame_pacing import MotionMeter, downscale
+
+Box = Tuple[int, int, int, int]
+
+
+class HaarBackend:
+    """OpenCV's frontal-face Haar cascade"""
+    name = 'haar'
+    # Works on the greyscale frame
+    color = False
+
+    def __init__(self, scale_factor: float = 1.1, min_neighbors: int = 5,
+                 min_size: Tuple[int, int] = (30, 30)):
+        self.cascade = cv2.CascadeClassifier(
+            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        )
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def empty(self) -> bool:
+        return self.cascade.empty()
+
+    def detect(self, gray: np.ndarray, scale: float) -> List[Box]:
+        """Detect on an image that was shrunk by ``scale``"""
+        min_size = (max(1, int(self.min_size[0] / scale)),
+                    max(1, int(self.min_size[1] / scale)))
+        faces = self.cascade.detectMultiScale(
+            gray, scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors, minSize=min_size
+        )
+        return [tuple(int(v) for v in face) for face in faces]
+
+
+class DnnBackend:
+    """ResNet-10 SSD face model run on the CPU through cv2.dnn"""
+    name = 'dnn'
+    # Trained on BGR images; greyscale input costs accuracy
+    color = True
+
+    def __init__(self, prototxt: str, model: str, confidence: float = 0.6,
+                 input_size: int = 300):
+        self.net = None
+        if os.path.exists(prototxt) and os.path.exists(model):
+            self.net = cv2.dnn.readNetFromCaffe(prototxt, model)
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        else:
+            print(f"DNN face model not found ({model}), see welcome_system/README.md")
+        self.confidence = confidence
+        self.input_size = input_size
+
+    def empty(self) -> bool:
+        return self.net is None
+
+    def detect(self, image: np.ndarray, scale: float) -> List[Box]:
+        """Detect on a BGR image that was shrunk by ``scale``"""
+        h, w = image.shape[:2]
+        blob = cv2.dnn.blobFromImage(image, 1.0, (self.input_size, self.input_size),
+                                     (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()
+        faces = []
+        for i in range(detections.shape[2]):
+            if detections[0, 0, i, 2] < self.confidence:
+                continue
+            x0, y0, x1, y1 = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
+            x0, y0 = max(0, int(x0)), max(0, int(y0))
+            x1, y1 = min(w, int(x1)), min(h, int(y1))
+            if x1 > x0 and y1 > y0:
+                faces.append((x0, y0, x1 - x0, y1 - y0))
+        return faces
+
+
+class TemplateTracker:
+    """Follows boxes between detections by template matching nearby"""
+
+    def __init__(self, min_score: float = 0.5):
+        self.min_score = min_score
+        self.templates: List[Tuple[Box, np.ndarray]] = []
+
+    def reset(self, gray: np.ndarray, boxes: List[Box]):
+        self.templates = [(box, gray[box[1]:box[1] + box[3], box[0]:box[0] + box[2]].copy())
+                          for box in boxes if box[2] > 0 and box[3] > 0]
+
+    def track(self, gray: np.ndarray) -> List[Box]:
+        frame_h, frame_w = gray.shape[:2]
+        tracked = []
+        for (x, y, w, h), template in self.templates:
+            # Search a window half a box wider on every side
+            x0, y0 = max(0, x - w // 2), max(0, y - h // 2)
+            x1, y1 = min(frame_w, x + w + w // 2), min(frame_h, y + h + h // 2)
+            window = gray[y0:y1, x0:x1]
+            if window.shape[0] < h or window.shape[1] < w:
+                continue
+            scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (dx, dy) = cv2.minMaxLoc(scores)
+            if score >= self.min_score:
+                tracked.append((x0 + dx, y0 + dy, w, h))
+        return tracked
+
+
+class FaceDetector:
+    """Motion-gated, downscaled face detection over a pluggable backend"""
+
+    def __init__(self, scale_factor: float = 1.1, min_neighbors: int = 5,
+                 min_size: Tuple[int, int] = (30, 30), detect_width: int = 320,
+                 motion_threshold: Optional[float] = 4.0, hold_time: float = 1.0,
+                 backend=None, track_every: int = 1):
+        self.backend = backend or HaarBackend(scale_factor, min_neighbors, min_size)
+        self.detect_width = detect_width
+        # Keep detecting for a moment after motion stops so slow approaches
+        # still get a final look
+        self.hold_time = hold_time
+        self.motion = MotionMeter(threshold=motion_threshold) if motion_threshold else None
+        # Run the detector every Nth frame and track in between (1 = always detect)
+        self.track_every = max(1, track_every)
+        self.tracker = TemplateTracker()
+        self.frames_since_detect = 0
+        self.moved = False
+        self.last_motion_time = 0.0
+        self.last_faces: List[Box] = []
+        self.frames = 0
+        self.cascade_runs = 0
+
+    @property
+    def name(self) -> str:
+        if self.track_every > 1:
+            return f"{self.backend.name}+track/{self.track_every}"
+        return self.backend.name
+
+    def empty(self) -> bool:
+        """True if the detector model failed to load"""
+        return self.backend.empty()
+
+    def detect(self, gray: np.ndarray, frame: Optional[np.ndarray] = None) -> List[Box]:
+        """Find faces in a greyscale frame, in full-resolution coordinates
+
+        ``frame`` is the original colour frame, for backends that detect in
+        colour; the motion gate and tracker always use ``gray``.
+        """
+        self.frames += 1
+        if self.motion is not None:
+            now = time.monotonic()
+            self.moved = self.motion.update(gray)
+            if self.moved:
+                self.last_motion_time = now
+            elif now - self.last_motion_time > self.hold_time:
+                # Nothing changed, so whatever we saw last is still there
+                return self.last_faces
+        else:
+            self.moved = True
+
+        small = downscale(gray, self.detect_width)
+        scale = gray.shape[1] / small.shape[1]
+
+        if self.last_faces and self.frames_since_detect < self.track_every - 1:
+            self.frames_since_detect += 1
+            faces = self.tracker.track(small)
+        else:
+            self.cascade_runs += 1
+            self.frames_since_detect = 0
+            image = small
+            if self.backend.color:
+                image = (downscale(frame, self.detect_width) if frame is not None
+                         else cv2.cvtColor(small, cv2.COLOR_GRAY2BGR))
+            faces = self.backend.detect(image, scale)
+            self.tracker.reset(small, faces)
+
+        self.last_faces = [
+            tuple(int(round(v * scale)) for v in face) for face in faces
+        ]
+        return self.last_faces
+
+    @property
+    def skip_rate(self) -> float:
+        """Fraction of frames where the detector itself was skipped"""
+        return 1.0 - self.cascade_runs / self.frames if self.frames else 0.0
+
+
+def create_face_detector(config) -> FaceDetector:
+    """Build the detector selected in a config module (welcome_system/config.py)"""
+    kind = getattr(config, 'FACE_DETECTOR', 'haar')
+    if kind == 'dnn':
+        backend = DnnBackend(config.FACE_DNN_PROTOTXT, config.FACE_DNN_MODEL,
+                             config.FACE_DNN_CONFIDENCE)
+        if backend.empty():
+            print("Falling back to Haar face detection")
+            backend = None
+    elif kind == 'haar':
+        backend = None
+    else:
+        raise ValueError(f"Unknown face detector '{kind}'")
+    if backend is None:
+        backend = HaarBackend(config.FACE_SCALE_FACTOR, config.FACE_MIN_NEIGHBORS,
+                              config.FACE_MIN_SIZE)
+    return FaceDetector(
+        detect_width=getattr(config, 'DETECTION_WIDTH', 320),
+        motion_threshold=getattr(config, 'MOTION_THRESHOLD', 4.0),
+        hold_time=getattr(config, 'MOTION_HOLD_TIME', 1.0),
+        backend=backend,
+        track_every=getattr(config, 'FACE_TRACK_EVERY', 1)
+    )
+
+
+def _iou(a: Box, b: Box) -> float:
+    ax1, ay1, bx1, by1 = a[0] + a[2], a[1] + a[3], b[0] + b[2], b[1] + b[3]
+    iw = max(0, min(ax1, bx1) - max(a[0], b[0]))
+    ih = max(0, min(ay1, by1) - max(a[1], b[1]))
+    inter = iw * ih
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union else 0.0
+
+
+def benchmark_detectors(frames: Sequence[np.ndarray], detectors: Dict[str, FaceDetector],
+                        truth: Optional[Sequence[List[Box]]] = None,
+                        iou_threshold: float = 0.4) -> Dict[str, Dict[str, float]]:
+    """Per-frame latency, and recall against ``truth``, for each detector
+
+    ``truth`` holds the expected boxes per frame. Without it only latency is
+    measured and recall is None: no detector's output is a fair reference.
+    """
+    results = {}
+    for name, detector in detectors.items():
+        timings = []
+        outputs = []
+        for frame in frames:
+            if frame.ndim == 3:
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            else:
+                gray, frame = frame, None
+            start = time.perf_counter()
+            outputs.append(detector.detect(gray, frame))
+            timings.append((time.perf_counter() - start) * 1000.0)
+
+        recall = None
+        if truth is not None:
+            expected = matched = 0
+            for found, wanted in zip(outputs, truth):
+                expected += len(wanted)
+                matched += sum(1 for box in wanted
+                               if any(_iou(box, f) >= iou_threshold for f in found))
+            recall = round(matched / expected, 3) if expected else 1.0
+        results[name] = {
+            'frames': len(frames),
+            'mean_ms': round(float(np.mean(timings)), 2) if timings else 0.0,
+            'p95_ms': round(float(np.percentile(timings, 95)), 2) if timings else 0.0,
+            'recall': recall,
+        }
+    return results
+
+
+def _load_frames(paths: Sequence[str]) -> Tuple[List[str], List[np.ndarray]]:
+    names, frames = [], []
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, f) for f in os.listdir(path))
+        else:
+            files = [path]
+        for file in files:
+            image = cv2.imread(file)
+            if image is not None:
+                names.append(os.path.basename(file))
+                frames.append(image)
+                continue
+            capture = cv2.VideoCapture(file)
+            index = 0
+            while True:
+                ret, frame = capture.read()
+                if not ret:
+                    break
+                names.append(f"{os.path.basename(file)}#{index}")
+                frames.append(frame)
+                index += 1
+            capture.release()
+    return names, frames
+
+
+def main():
+    """Benchmark: python face_detector.py [--truth boxes.json] images/dirs/videos..."""
+    import argparse
+    import json
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'welcome_system'))
+    import config
+
+    parser = argparse.ArgumentParser(description="Compare face detector backends")
+    parser.add_argument('inputs', nargs='+')
+    parser.add_argument('--truth', help="JSON mapping frame name to [[x, y, w, h], ...]")
+    parser.add_argument('--track-every', type=int, default=5)
+    args = parser.parse_args()
+
+    names, frames = _load_frames(args.inputs)
+    if not frames:
+        print("No frames to benchmark")
+        return
+    truth = None
+    if args.truth:
+        with open(args.truth) as f:
+            boxes = json.load(f)
+        truth = [[tuple(b) for b in boxes.get(name, [])] for name in names]
+
+    haar = lambda: HaarBackend(config.FACE_SCALE_FACTOR, config.FACE_MIN_NEIGHBORS,
+                               config.FACE_MIN_SIZE)
+    # No motion gate: every frame is judged on its own
+    detectors = {
+        'haar': FaceDetector(backend=haar(), motion_threshold=None),
+        f'haar+track/{args.track_every}': FaceDetector(
+            backend=haar(), motion_threshold=None, track_every=args.track_every),
+    }
+    dnn = DnnBackend(config.FACE_DNN_PROTOTXT, config.FACE_DNN_MODEL,
+                     config.FACE_DNN_CONFIDENCE)
+    if not dnn.empty():
+        detectors['dnn'] = FaceDetector(backend=dnn, motion_threshold=None)
+        detectors[f'dnn+track/{args.track_every}'] = FaceDetector(
+            backend=dnn, motion_threshold=None, track_every=args.track_every)
+
+    results = benchmark_detectors(frames, detectors, truth)
+    for name, r in results.items():
+        recall = f"recall {r['recall']:.0%}" if r['recall'] is not None else "recall n/a"
+        print(f"{name:>16}: {r['mean_ms']:7.2f} ms avg, {r['p95_ms']:7.2f} ms p95, "
+              f"{recall} over {r['frames']} frames")
+    if truth is None:
+        print("Recall needs expected boxes: pass --truth boxes.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Frame Pacing - Adaptive rate control for camera analysers
+
+Each analyser gets a target frame rate. The pacer sleeps only for whatever is
+left of the frame interval after processing, runs at full rate while
+something interesting is happening, and idles down once the scene has been
+static for a while.
+"""
+
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+class FramePacer:
+    """Sleep scheduler with a per-analyser target FPS"""
+
+    def __init__(self, target_fps: float = 10.0, max_fps: float = 30.0,
+                 idle_fps: float = 2.0, idle_after: float = 5.0):
+        self.target_fps = target_fps
+        self.max_fps = max_fps
+        self.idle_fps = idle_fps
+        self.idle_after = idle_after
+        self.boost_until = 0.0
+        self.last_activity = time.monotonic()
+        self.frame_start = time.monotonic()
+
+    @property
+    def current_fps(self) -> float:
+        """Rate the pacer is currently aiming for"""
+        now = time.monotonic()
+        if now < self.boost_until:
+            return self.max_fps
+        if now - self.last_activity > self.idle_after:
+            return self.idle_fps
+        return self.target_fps
+
+    def boost(self, duration: float = 1.0):
+        """Run at full rate for the next ``duration`` seconds"""
+        now = time.monotonic()
+        self.boost_until = max(self.boost_until, now + duration)
+        self.last_activity = now
+
+    def report_activity(self, active: bool):
+        """Tell the pacer whether the latest frame had anything going on"""
+        if active:
+            self.last_activity = time.monotonic()
+
+    def pace(self):
+        """Sleep out the remainder of the current frame interval"""
+        interval = 1.0 / max(self.current_fps, 0.1)
+        remaining = interval - (time.monotonic() - self.frame_start)
+        if remaining > 0:
+            time.sleep(remaining)
+        self.frame_start = time.monotonic()
+
+
+class MotionMeter:
+    """Cheap scene-change measure on a downscaled greyscale frame"""
+
+    def __init__(self, width: int = 160, threshold: float = 4.0):
+        self.width = width
+        self.threshold = threshold
+        self.previous: Optional[np.ndarray] = None
+        self.level = 0.0
+
+    def update(self, gray: np.ndarray) -> bool:
+        """Compare against the previous frame; True when something moved"""
+        small = downscale(gray, self.width)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+        if self.previous is None or self.previous.shape != small.shape:
+            self.previous = small
+            self.level = 0.0
+            return True
+        self.level = float(cv2.absdiff(small, self.previous).mean())
+        self.previous = small
+        return self.level > self.threshold
+
+
+def downscale(gray: np.ndarray, width: int) -> np.ndarray:
+    """Resize to ``width`` pixels wide, keeping the aspect ratio"""
+    h, w = gray.shape[:2]
+    if w <= width:
+        return gray
+    height = max(1, int(h * width / w))
+    return cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def barcode_candidate(gray: np.ndarray, width: int = 160,
+                      min_area: float = 0.02) -> bool:
+    """Guess whether a (possibly unreadable) barcode is in view
+
+    Barcodes and QR codes show up as compact patches of dense, high-contrast
+    edges. This is far cheaper than a decode attempt, so it is used to decide
+    when scanning is worth running at full rate.
+    """
+    small = downscale(gray, width)
+    grad_x = cv2.Sobel(small, cv2.CV_16S, 1, 0, ksize=3)
+    grad_y = cv2.Sobel(small, cv2.CV_16S, 0, 1, ksize=3)
+    magnitude = cv2.addWeighted(cv2.convertScaleAbs(grad_x), 0.5,
+                                cv2.convertScaleAbs(grad_y), 0.5, 0)
+    _, edges = cv2.threshold(magnitude, 60, 255, cv2.THRESH_BINARY)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (7, 3))
+    closed = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
+    closed = cv2.erode(closed, None, iterations=2)
+    contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL,
+                                   cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return False
+    largest = max(cv2.contourArea(c) for c in contours)
+    return largest >= min_area * small.shape[0] * small.shape[1]
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Frame Sources - Cameras, video files, image folders and synthetic streams
+
+``open_frame_source()`` turns a source spec into an object with the
+``cv2.VideoCapture`` interface (``isOpened``, ``read``, ``set``, ``release``),
+so the camera bus and every pipeline built on it can run without cameras:
+
+    0, "1"                         camera device index
+    "rtsp://..." / "http://..."    network stream (passed to OpenCV as is)
+    "clip.mp4?loop=1"              video file
+    "frames/?fps=5"                directory of images, in name order
+    "synthetic:pattern?fps=30"     generated stream (pattern, qr, noise, blank)
+
+Options after ``?``: ``fps`` (playback rate), ``realtime=0`` (replay as fast
+as frames are read), ``loop=1`` (restart at the end), ``count`` (frames for
+synthetic streams), ``text`` (QR payload), ``size`` (e.g. 640x480).
+Files and folders play back in real time by default.
+"""
+
+import glob
+import os
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+SYNTHETIC_KINDS = ('pattern', 'qr', 'noise', 'blank')
+
+# Environment variable the tools read when no source is given explicitly
+CAMERA_SOURCE_ENV = 'CAMERA_SOURCE'
+
+
+def normalize_source(source):
+    """Device indexes given as strings ("0") become ints; anything else is kept"""
+    if isinstance(source, str) and source.strip().isdigit():
+        return int(source)
+    return source
+
+
+def parse_source(source) -> Tuple[str, object, Dict[str, str]]:
+    """Split a source spec into (kind, target, options)"""
+    source = normalize_source(source)
+    if isinstance(source, int):
+        return 'device', source, {}
+    if '://' in source:
+        return 'stream', source, {}
+    target, _, query = source.partition('?')
+    options = dict(parse_qsl(query))
+    if target.startswith('synthetic'):
+        kind = target.partition(':')[2] or 'pattern'
+        return 'synthetic', kind, options
+    if os.path.isdir(target):
+        return 'folder', target, options
+    return 'file', target, options
+
+
+class Playback:
+    """Paces reads to a frame rate, or not at all for max-speed replay"""
+
+    def __init__(self, fps: float, realtime: bool = True):
+        self.interval = 1.0 / fps if fps > 0 and realtime else 0.0
+        self.next_due = None
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_due is None or now - self.next_due > 1.0:
+            # First frame, or the reader fell far behind: don't burst to catch up
+            self.next_due = now
+        elif self.next_due > now:
+            time.sleep(self.next_due - now)
+        self.next_due += self.interval
+
+
+class FrameSource:
+    """Base for non-camera sources; ``finished`` is set once it runs dry"""
+
+    def __init__(self, fps: float, realtime: bool, loop: bool):
+        self.fps = fps
+        self.loop = loop
+        self.playback = Playback(fps, realtime)
+        self.frames_read = 0
+        self.finished = False
+
+    def isOpened(self) -> bool:
+        return not self.finished
+
+    def set(self, prop: int, value) -> bool:
+        """Capture properties (size, buffer) don't apply to recorded frames"""
+        return False
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        return 0.0
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        if self.finished:
+            return False, None
+        frame = self._next_frame()
+        if frame is None and self.loop and self.frames_read:
+            self._rewind()
+            frame = self._next_frame()
+        if frame is None:
+            self.finished = True
+            return False, None
+        self.playback.wait()
+        self.frames_read += 1
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            # Same contract as VideoCapture.read(image): fill the caller's buffer
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def release(self):
+        self.finished = True
+
+    def _next_frame(self) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def _rewind(self):
+        pass
+
+
+class VideoFileSource(FrameSource):
+    """A video file played at its own frame rate (or as fast as possible)"""
+
+    def __init__(self, path: str, fps: float = 0, realtime: bool = True, loop: bool = False):
+        self.capture = cv2.VideoCapture(path)
+        fps = fps or self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        super().__init__(fps, realtime, loop)
+        self.finished = not self.capture.isOpened()
+
+    def _next_frame(self):
+        ret, frame = self.capture.read()
+        return frame if ret else None
+
+    def _rewind(self):
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self):
+        super().release()
+        self.capture.release()
+
+
+class ImageFolderSource(FrameSource):
+    """Every image in a directory, in file name order"""
+
+    def __init__(self, path: str, fps: float = 10.0, realtime: bool = True, loop: bool = False):
+        super().__init__(fps, realtime, loop)
+        self.paths = sorted(p for p in glob.glob(os.path.join(path, '*'))
+                            if p.lower().endswith(IMAGE_EXTENSIONS))
+        self.index = 0
+        self.finished = not self.paths
+
+    def _next_frame(self):
+        while self.index < len(self.paths):
+            frame = cv2.imread(self.paths[self.index])
+            self.index += 1
+            if frame is not None:
+                return frame
+        return None
+
+    def _rewind(self):
+        self.index = 0
+
+
+class SyntheticSource(FrameSource):
+    """Generated frames for soak tests and benchmarks
+
+    - pattern: a bright box sliding over a textured background (motion)
+    - qr: a QR code with ``text`` drifting across the frame
+    - noise: sensor-like noise every frame
+    - blank: a static grey frame (idle scene)
+    """
+
+    def __init__(self, kind: str = 'pattern', fps: float = 30.0, realtime: bool = True,
+                 loop: bool = False, count: int = 0, size: Tuple[int, int] = (640, 480),
+                 text: str = 'USER001', seed: int = 0):
+        if kind not in SYNTHETIC_KINDS:
+            raise ValueError(f"Unknown synthetic stream '{kind}' (expected one of {SYNTHETIC_KINDS})")
+        super().__init__(fps, realtime, loop)
+        self.kind = kind
+        self.count = count
+        self.width, self.height = size
+        self.rng = np.random.default_rng(seed)
+        self.index = 0
+        yy, xx = np.mgrid[0:self.height, 0:self.width]
+        self.background = (((xx // 40 + yy // 40) % 2) * 40 + 80).astype(np.uint8)
+        self.background = cv2.cvtColor(self.background, cv2.COLOR_GRAY2BGR)
+        self.code = None
+        if kind == 'qr':
+            code = cv2.QRCodeEncoder.create().encode(text)
+            side = min(self.width, self.height) // 2
+            code = cv2.resize(code, (side, side), interpolation=cv2.INTER_NEAREST)
+            self.code = cv2.cvtColor(code, cv2.COLOR_GRAY2BGR)
+
+    def _next_frame(self):
+        if self.count and self.index >= self.count:
+            return None
+        t = self.index
+        self.index += 1
+        if self.kind == 'blank':
+            return np.full((self.height, self.width, 3), 128, np.uint8)
+        if self.kind == 'noise':
+            return self.rng.integers(0, 256, (self.height, self.width, 3), dtype=np.uint8)
+        frame = self.background.copy()
+        if self.kind == 'pattern':
+            side = self.height // 4
+            x = int((np.sin(t / 15.0) + 1) / 2 * (self.width - side))
+            y = (self.height - side) // 2
+            frame[y:y + side, x:x + side] = 255
+        else:
+            h, w = self.code.shape[:2]
+            x = int((np.sin(t / 30.0) + 1) / 2 * (self.width - w))
+            y = (self.height - h) // 2
+            frame[y:y + h, x:x + w] = self.code
+        return frame
+
+    def _rewind(self):
+        self.index = 0
+
+
+def open_frame_source(source, realtime: Optional[bool] = None):
+    """Open any supported source; ``realtime`` overrides the spec's option
+
+    Devices and network streams are returned as plain ``cv2.VideoCapture``.
+    """
+    kind, target, options = parse_source(source)
+    if kind in ('device', 'stream'):
+        return cv2.VideoCapture(target)
+
+    if realtime is None:
+        realtime = options.get('realtime', '1') not in ('0', 'false', 'no')
+    loop = options.get('loop', '0') in ('1', 'true', 'yes')
+    fps = float(options.get('fps', 0))
+
+    if kind == 'file':
+        return VideoFileSource(target, fps, realtime, loop)
+    if kind == 'folder':
+        return ImageFolderSource(target, fps or 10.0, realtime, loop)
+
+    size = (640, 480)
+    if 'size' in options:
+        width, _, height = options['size'].partition('x')
+        size = (int(width), int(height))
+    return SyntheticSource(target, fps or 30.0, realtime, loop,
+                           count=int(options.get('count', 0)), size=size,
+                           text=options.get('text', 'USER001'))
+
+
+def default_source(fallback=0):
+    """The CAMERA_SOURCE environment variable, or ``fallback``"""
+    return normalize_source(os.environ.get(CAMERA_SOURCE_ENV, fallback))
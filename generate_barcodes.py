@@ -2,41 +2,164 @@
 # -*- coding: utf-8 -*-
 """
 Barcode Generation Tool - Generate test barcodes for system demonstration
+
+Without arguments, writes the demo users' codes to test_barcodes/. For
+onboarding, cards for a whole user export are rendered in a process pool,
+checked by decoding them in memory, and only then written:
+
+    python3 generate_barcodes.py --users users.json -o cards
+    python3 generate_barcodes.py --users users.json -o cards.zip --sheets
+
+A manifest in the output directory records a hash of every user's card
+fields and the rendering options, so re-runs only render new or changed
+users and remove the files of users no longer in the export. Output can
+also be streamed into a zip archive, or packed onto A4 print sheets that
+are rendered in parallel.
 """
 
+import argparse
+import csv
+import functools
+import hashlib
+import io
+import json
 import os
 import sys
-from datetime import datetime
-from typing import List, Tuple
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Tuple
 
 # Try importing required dependencies
 try:
     from PIL import Image, ImageDraw, ImageFont
     from barcode import Code128
     from barcode.writer import ImageWriter
+    import numpy as np
     import qrcode
 except ImportError as e:
     print(f"Missing required dependency: {e}")
     print("Please run: pip install pillow python-barcode qrcode")
     sys.exit(1)
 
+# Rendering settings for the printed cards (also used by barcode_scenes.py)
+BARCODE_WRITER_OPTIONS = {
+    'module_width': 0.5,
+    'module_height': 15.0,
+    'font_size': 12,
+    'text_distance': 5.0,
+    'quiet_zone': 6.5
+}
+QR_BOX_SIZE = 10
+QR_BORDER = 4
+
+# Export fields that never end up on a printed card
+PRIVATE_FIELDS = ('password', 'passwordHash', 'salt', 'token')
+BULK_PROGRESS_EVERY = 100
+MANIFEST_NAME = '.cards_manifest.json'
+# Bump when the card layout changes, so every card is rendered again
+RENDER_VERSION = 1
+
+CARD_FONT = "/System/Library/Fonts/Helvetica.ttc"
+# Print sheets: A4 portrait at 300 dpi, cards in a cols x rows grid
+SHEET_SIZE = (2480, 3508)
+SHEET_DPI = 300
+SHEET_GRID = (3, 5)
+# Signed payloads make barcodes about 1100 px wide: two cards per row
+SIGNED_SHEET_GRID = (2, 5)
+SHEET_MARGIN = 60
+# Free space around a card inside its cell
+SHEET_PADDING = 10
+
+def render_barcode(data: str) -> Image.Image:
+    """CODE128 barcode as an image, without touching the disk"""
+    writer = ImageWriter()
+    writer.set_options(BARCODE_WRITER_OPTIONS)
+    # Same call chain as Code128.save, so images match the cards printed so far
+    return Code128(data, writer=writer).render()
+
+def render_qrcode(data: str) -> Image.Image:
+    """QR code as an image, without touching the disk"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=QR_BOX_SIZE,
+        border=QR_BORDER,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.make_image(fill_color="black", back_color="white").convert('RGB')
+
+@functools.lru_cache(maxsize=None)
+def card_fonts():
+    """Title and text fonts for the cards, loaded once per process"""
+    try:
+        return ImageFont.truetype(CARD_FONT, 24), ImageFont.truetype(CARD_FONT, 18)
+    except Exception:
+        # Use default font
+        return ImageFont.load_default(), ImageFont.load_default()
+
+def render_info_card(barcode_img: Image.Image, info: dict) -> Image.Image:
+    """Info card with the barcode and user details"""
+    # Create new canvas
+    card_width = max(400, barcode_img.width + 40)
+    card_height = barcode_img.height + 200
+    card = Image.new('RGB', (card_width, card_height), 'white')
+    
+    # Paste barcode
+    barcode_x = (card_width - barcode_img.width) // 2
+    card.paste(barcode_img, (barcode_x, 20))
+    
+    # Add text info
+    draw = ImageDraw.Draw(card)
+    title_font, text_font = card_fonts()
+    
+    # Add title
+    title = f"{info['type']} - {info['username']}"
+    draw.text((card_width//2, barcode_img.height + 40), title, 
+             fill='black', font=title_font, anchor='mm')
+    
+    # Add info
+    y_offset = barcode_img.height + 80
+    for key, value in info.items():
+        if key not in ['type', 'username', 'payload']:
+            text = f"{key}: {value}"
+            draw.text((20, y_offset), text, fill='black', font=text_font)
+            y_offset += 30
+    return card
+
+def to_png(image: Image.Image, dpi: Optional[int] = None) -> bytes:
+    """PNG file content for an image"""
+    buffer = io.BytesIO()
+    if dpi:
+        image.save(buffer, 'PNG', dpi=(dpi, dpi))
+    else:
+        image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def render_user_codes(info: dict) -> Dict[str, Image.Image]:
+    """A user's barcode, info card and QR code, by output file name"""
+    stem = _file_stem(info['username'])
+    barcode_img = render_barcode(code_data(info))
+    return {
+        f"{stem}_barcode.png": barcode_img,
+        f"{stem}_barcode_card.png": render_info_card(barcode_img, info),
+        f"{stem}_qrcode.png": render_qrcode(code_data(info)),
+    }
+
+def render_card_png(info: dict) -> bytes:
+    """PNG bytes of a user's info card, e.g. to serve it without writing a file"""
+    return to_png(render_info_card(render_barcode(code_data(info)), info))
+
+def _file_stem(username: str) -> str:
+    """Username made safe to use in a file name"""
+    return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in username)
+
 def generate_barcode(data: str, filename: str) -> bool:
     """Generate a 128-bit barcode"""
     try:
-        # Set custom barcode format
-        writer = ImageWriter()
-        writer.set_options({
-            'module_width': 0.5,
-            'module_height': 15.0,
-            'font_size': 12,
-            'text_distance': 5.0,
-            'quiet_zone': 6.5
-        })
-        
-        # Generate barcode
-        barcode = Code128(data, writer=writer)
-        barcode.save(filename)
-        
+        render_barcode(data).save(f"{filename}.png")
         print(f"✅ Barcode generated: {filename}.png")
         return True
     except Exception as e:
@@ -46,22 +169,7 @@ def generate_barcode(data: str, filename: str) -> bool:
 def generate_qrcode(data: str, filename: str) -> bool:
     """Generate QR code"""
     try:
-        # Create QR code object
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        
-        # Add data
-        qr.add_data(data)
-        qr.make(fit=True)
-        
-        # Create image
-        img = qr.make_image(fill_color="black", back_color="white")
-        img.save(f"{filename}.png")
-        
+        render_qrcode(data).save(f"{filename}.png")
         print(f"✅ QR code generated: {filename}.png")
         return True
     except Exception as e:
@@ -71,42 +179,7 @@ def generate_qrcode(data: str, filename: str) -> bool:
 def create_info_card(barcode_file: str, info: dict) -> bool:
     """Create an info card with barcode and user details"""
     try:
-        # Open barcode image
-        barcode_img = Image.open(barcode_file)
-        
-        # Create new canvas
-        card_width = max(400, barcode_img.width + 40)
-        card_height = barcode_img.height + 200
-        card = Image.new('RGB', (card_width, card_height), 'white')
-        
-        # Paste barcode
-        barcode_x = (card_width - barcode_img.width) // 2
-        card.paste(barcode_img, (barcode_x, 20))
-        
-        # Add text info
-        draw = ImageDraw.Draw(card)
-        
-        # Try loading fonts
-        try:
-            title_font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 24)
-            text_font = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 18)
-        except Exception:
-            # Use default font
-            title_font = ImageFont.load_default()
-            text_font = ImageFont.load_default()
-        
-        # Add title
-        title = f"{info['type']} - {info['username']}"
-        draw.text((card_width//2, barcode_img.height + 40), title, 
-                 fill='black', font=title_font, anchor='mm')
-        
-        # Add info
-        y_offset = barcode_img.height + 80
-        for key, value in info.items():
-            if key not in ['type', 'username']:
-                text = f"{key}: {value}"
-                draw.text((20, y_offset), text, fill='black', font=text_font)
-                y_offset += 30
+        card = render_info_card(Image.open(barcode_file), info)
         
         # Save card
         card_file = barcode_file.replace('.png', '_card.png')
@@ -154,18 +227,17 @@ def generate_test_barcodes():
         barcode_id = data['barcode_id']
         username = data['username']
         
-        # Generate barcode
-        barcode_file = os.path.join(output_dir, f"{username}_barcode")
-        if generate_barcode(barcode_id, barcode_file):
-            success_count += 1
-            
-            # Create info card
-            create_info_card(f"{barcode_file}.png", data)
-        
-        # Also generate QR code
-        qr_file = os.path.join(output_dir, f"{username}_qrcode")
-        if generate_qrcode(barcode_id, qr_file):
-            success_count += 1
+        # Barcode, info card and QR code are rendered in memory and written once
+        try:
+            images = render_user_codes(data)
+        except Exception as e:
+            print(f"❌ Failed to generate codes for {username} ({barcode_id}): {str(e)}")
+            continue
+        for name, image in images.items():
+            path = os.path.join(output_dir, name)
+            image.save(path)
+            print(f"✅ Generated: {path}")
+        success_count += 2
     
     print("=" * 50)
     print(f"✅ Generated {success_count} barcodes")
@@ -181,12 +253,11 @@ def verify_barcode(filepath: str) -> bool:
     """Verify barcode readability"""
     try:
         import cv2
-        from pyzbar import pyzbar
         
         # Read image
         img = cv2.imread(filepath)
-        # Detect barcodes
-        barcodes = pyzbar.decode(img)
+        # Detect barcodes (the symbologies we generate)
+        barcodes = _default_decoder().decode(img)
         
         if barcodes:
             for barcode in barcodes:
@@ -200,5 +271,394 @@ def verify_barcode(filepath: str) -> bool:
         print(f"❌ Verification error: {filepath} - {e}")
         return False
 
+_decoder = None
+
+def _default_decoder():
+    """Shared decoder for the symbologies we generate"""
+    global _decoder
+    if _decoder is None:
+        from barcode_decoder import BarcodeDecoder
+        _decoder = BarcodeDecoder('cards')
+    return _decoder
+
+def verify_image(image, expected: str, symbology: str = 'CODE128',
+                 decoder=None) -> Optional[bool]:
+    """Whether an image decodes to ``expected``, straight from memory
+
+    ``image`` is a PIL image, a numpy array or PNG bytes. Returns None when
+    no decoder backend available here can read ``symbology`` (e.g. CODE128
+    without zbar installed).
+    """
+    decoder = decoder or _default_decoder()
+    if not any(b.wanted is None or symbology in b.wanted for b in decoder.backends):
+        return None
+    if isinstance(image, bytes):
+        image = Image.open(io.BytesIO(image))
+    if isinstance(image, Image.Image):
+        image = np.asarray(image.convert('L'))
+    return any(b.data.decode('utf-8', 'replace') == expected for b in decoder.decode(image))
+
+def _flag(value) -> bool:
+    return str(value).strip().lower() in ('1', 'true', 'yes')
+
+def code_data(info: dict) -> str:
+    """What the codes encode: the signed payload if there is one, else the bare ID"""
+    return info.get('payload') or info['barcode_id']
+
+def sign_card(info: dict, expires: date) -> dict:
+    """Card fields with a signed payload (user ID, tier, expiry) for the codes"""
+    from signed_payload import sign_payload, tier_code
+    payload = sign_payload(info['barcode_id'], tier_code(info['type']), expires)
+    return dict(info, payload=payload)
+
+def card_info(record: dict) -> dict:
+    """Card fields for one record of a user export (users.json or CSV)"""
+    info = {k: v for k, v in record.items() if k not in PRIVATE_FIELDS}
+    barcode_id = info.get('barcode_id') or info.get('barcodeId') or info.get('id')
+    if not info.get('username') or not barcode_id:
+        raise ValueError("record needs a username and an id or barcode_id")
+    user_type = info.get('type') or ('Administrator' if _flag(info.get('isAdmin')) else 'Regular User')
+    return {'type': user_type, 'username': str(info['username']), 'barcode_id': str(barcode_id)}
+
+def load_users(path: str) -> Iterator[dict]:
+    """User records from a JSON export (list, or {"users": [...]}) or a CSV file"""
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+        return
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    yield from data['users'] if isinstance(data, dict) else data
+
+def render_hash(info: dict) -> str:
+    """Hash of everything a user's files depend on: card fields and rendering options"""
+    payload = json.dumps({
+        'info': info,
+        'version': RENDER_VERSION,
+        'barcode': BARCODE_WRITER_OPTIONS,
+        'qr': [QR_BOX_SIZE, QR_BORDER],
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class CardManifest:
+    """Hash and file names of what was rendered for each user
+
+    A user whose hash is unchanged and whose files are all still on disk
+    does not need rendering again.
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries: Dict[str, Dict] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Ignoring unreadable manifest {self.path}: {e}")
+
+    def current(self, username: str, digest: str) -> bool:
+        entry = self.entries.get(username)
+        return (entry is not None and entry['hash'] == digest and
+                all(os.path.exists(os.path.join(self.output_dir, name)) for name in entry['files']))
+
+    def store(self, username: str, digest: str, files: List[str]):
+        self.entries[username] = {'hash': digest, 'files': sorted(files)}
+
+    def prune(self, keep: set) -> int:
+        """Delete the files of users not in ``keep``; returns how many users were removed"""
+        removed = [name for name in self.entries if name not in keep]
+        kept_files = {f for name in keep if name in self.entries for f in self.entries[name]['files']}
+        for username in removed:
+            for name in self.entries.pop(username)['files']:
+                if name in kept_files:
+                    continue
+                try:
+                    os.remove(os.path.join(self.output_dir, name))
+                except FileNotFoundError:
+                    pass
+        return len(removed)
+
+    def save(self):
+        temp = f"{self.path}.tmp"
+        with open(temp, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(temp, self.path)
+
+# Whether bulk workers verify, set by the pool initializer
+_verify_cards = True
+
+def _init_bulk_worker(verify: bool):
+    global _verify_cards
+    _verify_cards = verify
+
+def _check(result: Dict, image, data: str, symbology: str) -> bool:
+    """Verify one image for ``result``; False (with 'error' set) if it misreads"""
+    if not _verify_cards:
+        return True
+    ok = verify_image(image, data, symbology)
+    if ok is None:
+        result['unverified'].append(symbology)
+    elif not ok:
+        result['error'] = f"{symbology} does not decode to '{data}'"
+        return False
+    return True
+
+def render_user_cards(info: dict) -> Dict:
+    """Render and verify one user's barcode, card and QR code (worker process)
+
+    Returns {'username', 'files': {name: PNG bytes}, 'unverified': [...]},
+    or 'error' instead of files when rendering or verification failed.
+    """
+    username, data = info['username'], code_data(info)
+    result = {'username': username, 'files': {}, 'unverified': []}
+    try:
+        images = render_user_codes(info)
+        stem = _file_stem(username)
+        # The printed card rather than the bare barcode
+        if (_check(result, images[f"{stem}_barcode_card.png"], data, 'CODE128') and
+                _check(result, images[f"{stem}_qrcode.png"], data, 'QRCODE')):
+            result['files'] = {name: to_png(image) for name, image in images.items()}
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def render_sheet(number: int, infos: List[dict], grid: Tuple[int, int] = SHEET_GRID) -> Dict:
+    """One print sheet with up to a grid's worth of cards (worker process)
+
+    Cards are placed at full size, exactly as verified; a card too large for
+    its cell fails instead of being shrunk past what scanners can read.
+    Returns {'files': {sheet name: PNG bytes}, 'cards': [per-user results]};
+    users whose card failed are left off the sheet.
+    """
+    cols, rows = grid
+    cell_width = (SHEET_SIZE[0] - 2 * SHEET_MARGIN) // cols
+    cell_height = (SHEET_SIZE[1] - 2 * SHEET_MARGIN) // rows
+    sheet = Image.new('RGB', SHEET_SIZE, 'white')
+    draw = ImageDraw.Draw(sheet)
+    cards = []
+    slot = 0
+    for info in infos:
+        result = {'username': info['username'], 'files': {}, 'unverified': []}
+        cards.append(result)
+        try:
+            card = render_info_card(render_barcode(code_data(info)), info)
+            if (card.width > cell_width - 2 * SHEET_PADDING or
+                    card.height > cell_height - 2 * SHEET_PADDING):
+                result['error'] = (f"card is {card.width}x{card.height} px, too large for "
+                                   f"a {cols}x{rows} sheet cell ({cell_width}x{cell_height} px)")
+                continue
+            if not _check(result, card, code_data(info), 'CODE128'):
+                continue
+        except Exception as e:
+            result['error'] = str(e)
+            continue
+        x = SHEET_MARGIN + (slot % cols) * cell_width
+        y = SHEET_MARGIN + (slot // cols) * cell_height
+        # Cut guides, then the card centred in its cell
+        draw.rectangle((x, y, x + cell_width - 1, y + cell_height - 1), outline=(200, 200, 200))
+        sheet.paste(card, (x + (cell_width - card.width) // 2, y + (cell_height - card.height) // 2))
+        slot += 1
+    files = {f"sheet_{number:04d}.png": to_png(sheet, dpi=SHEET_DPI)} if slot else {}
+    return {'files': files, 'cards': cards}
+
+def _chunks(items, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class CardOutput:
+    """Destination for bulk output: a directory, or a zip archive for a .zip path
+
+    The archive is written under a temporary name and only replaces
+    ``path`` once complete.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.archive = None
+        if path.lower().endswith('.zip'):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.temp = f"{path}.tmp"
+            # PNGs are compressed already
+            self.archive = zipfile.ZipFile(self.temp, 'w', zipfile.ZIP_STORED)
+        else:
+            os.makedirs(path, exist_ok=True)
+
+    def write(self, name: str, content: bytes):
+        if self.archive is not None:
+            self.archive.writestr(name, content)
+            return
+        with open(os.path.join(self.path, name), 'wb') as f:
+            f.write(content)
+
+    def close(self, complete: bool = True):
+        if self.archive is None:
+            return
+        self.archive.close()
+        if complete:
+            os.replace(self.temp, self.path)
+        else:
+            os.remove(self.temp)
+
+def generate_bulk(users_path: str, output: str, workers: Optional[int] = None,
+                  verify: bool = True, full: bool = False, prune: bool = True,
+                  sheets: bool = False, signed_until: Optional[date] = None) -> Dict:
+    """Cards for every user in an export, rendered in a process pool
+
+    ``output`` is a directory, or a .zip archive the files are streamed into.
+    With ``sheets``, cards are packed onto print-ready sheets instead of one
+    file per user. Files are written as they finish; only a bounded amount
+    of work is in flight, so memory stays flat for large exports.
+
+    Per-user files in a directory are incremental: users unchanged since the
+    last run are skipped unless ``full``, and with ``prune`` files of users
+    no longer in the export are deleted. Archives and sheets are complete
+    each run. With ``signed_until``, codes carry signed payloads valid until
+    that date (signed_payload.py) instead of the bare ID.
+    """
+    workers = workers or os.cpu_count() or 1
+    target = CardOutput(output)
+    manifest = CardManifest(output) if target.archive is None and not sheets else None
+    stats = {'users': 0, 'written': 0, 'unchanged': 0, 'failed': 0, 'unverified': 0,
+             'pruned': 0, 'sheets': 0}
+    seen = set()
+    start = time.perf_counter()
+
+    def finish_user(result: Dict, digest: Optional[str] = None):
+        stats['users'] += 1
+        if 'error' in result:
+            # A failed user keeps its old manifest entry, so the next run retries it
+            stats['failed'] += 1
+            print(f"❌ {result['username']}: {result['error']}")
+        elif result.get('unchanged'):
+            stats['unchanged'] += 1
+        else:
+            for name, content in result['files'].items():
+                target.write(name, content)
+            if manifest is not None:
+                manifest.store(result['username'], digest, list(result['files']))
+            stats['written'] += 1
+            if result['unverified']:
+                stats['unverified'] += 1
+        if stats['users'] % BULK_PROGRESS_EVERY == 0:
+            rate = stats['users'] / (time.perf_counter() - start)
+            print(f"  {stats['users']} users ({rate:.0f}/s), {stats['failed']} failed")
+
+    def finish_sheet(result: Dict, _):
+        for name, content in result['files'].items():
+            target.write(name, content)
+            stats['sheets'] += 1
+        for card in result['cards']:
+            finish_user(card)
+
+    def users() -> Iterator[Tuple[dict, str]]:
+        for number, record in enumerate(load_users(users_path), 1):
+            try:
+                info = card_info(record)
+                if signed_until is not None:
+                    info = sign_card(info, signed_until)
+            except ValueError as e:
+                finish_user({'username': f"record {number}", 'error': str(e)})
+                continue
+            username = info['username']
+            if username in seen:
+                finish_user({'username': username, 'error': "duplicate username, skipped"})
+                continue
+            seen.add(username)
+            digest = render_hash(info)
+            if manifest is not None and not full and manifest.current(username, digest):
+                finish_user({'username': username, 'unchanged': True})
+                continue
+            yield info, digest
+
+    if sheets:
+        grid = SIGNED_SHEET_GRID if signed_until is not None else SHEET_GRID
+        cols, rows = grid
+        jobs = ((render_sheet, (number, [info for info, _ in chunk], grid), None)
+                for number, chunk in enumerate(_chunks(users(), cols * rows), 1))
+        finish, window = finish_sheet, workers * 2
+    else:
+        jobs = ((render_user_cards, (info,), digest) for info, digest in users())
+        finish, window = finish_user, workers * 4
+
+    complete = False
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_bulk_worker,
+                                 initargs=(verify,)) as pool:
+            pending = {}
+            for fn, args, digest in jobs:
+                pending[pool.submit(fn, *args)] = digest
+                if len(pending) >= window:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(future.result(), pending.pop(future))
+            for future in list(pending):
+                finish(future.result(), pending.pop(future))
+        if manifest is not None and prune:
+            stats['pruned'] = manifest.prune(seen)
+        complete = True
+    finally:
+        target.close(complete)
+        # Also on interruption: cards written so far are not rendered again
+        if manifest is not None:
+            manifest.save()
+
+    stats['seconds'] = round(time.perf_counter() - start, 2)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate barcodes and info cards")
+    parser.add_argument('--users', help="User export (JSON or CSV); without it the demo users are generated")
+    parser.add_argument('-o', '--output', default='cards',
+                        help="Output directory, or a .zip archive, for --users")
+    parser.add_argument('--sheets', action='store_true',
+                        help=f"Pack cards onto A4 print sheets ({SHEET_GRID[0]}x{SHEET_GRID[1]}, "
+                             f"{SIGNED_SHEET_GRID[0]}x{SIGNED_SHEET_GRID[1]} with --signed)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--no-verify', action='store_true', help="Skip decoding each card before writing")
+    parser.add_argument('--signed', action='store_true',
+                        help="Encode signed payloads (ID, tier, expiry); key from BARCODE_SIGNING_KEY")
+    parser.add_argument('--expires', type=date.fromisoformat,
+                        default=date(date.today().year + 2, 1, 1),
+                        help="Expiry of signed cards, YYYY-MM-DD (default: 1 January in two years)")
+    parser.add_argument('--full', action='store_true', help="Render every user, even if unchanged")
+    parser.add_argument('--no-prune', action='store_true',
+                        help="Keep the files of users no longer in the export")
+    args = parser.parse_args()
+
+    if not args.users:
+        generate_test_barcodes()
+        return
+
+    if args.signed:
+        from signed_payload import KEY_ENV, signing_key
+        if not signing_key():
+            print(f"❌ --signed needs a signing key in {KEY_ENV}")
+            sys.exit(1)
+
+    print(f"🔧 Generating cards for {args.users}...")
+    stats = generate_bulk(args.users, args.output, args.workers, not args.no_verify,
+                          args.full, not args.no_prune, args.sheets,
+                          args.expires if args.signed else None)
+    print("=" * 50)
+    print(f"✅ {stats['written']} users written, {stats['unchanged']} unchanged, "
+          f"{stats['failed']} failed, {stats['pruned']} removed "
+          f"({stats['users']} in {stats['seconds']} s)")
+    if stats['sheets']:
+        print(f"🖨️  {stats['sheets']} print sheets")
+    if stats['unverified']:
+        print(f"⚠️  {stats['unverified']} users only partly verified: "
+              f"no decoder here for every symbology (install zbar)")
+    print(f"📁 Saved to: {os.path.abspath(args.output)}")
+    if stats['failed']:
+        sys.exit(1)
+
 if __name__ == "__main__":
-    generate_test_barcodes() 
\ No newline at end of file
+    main()
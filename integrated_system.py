@@ -10,7 +10,6 @@ import json
 import time
 import threading
 import subprocess
-import requests
 from datetime import datetime
 from typing import Dict, List, Optional
 
@@ -25,49 +24,105 @@ try:
                                 QHBoxLayout, QWidget, QPushButton, QLabel, 
                                 QTextEdit, QTabWidget, QGroupBox, QGridLayout,
                                 QMessageBox, QComboBox, QSpinBox, QCheckBox)
-    from PyQt5.QtCore import QTimer, QThread, pyqtSignal, Qt
+    from PyQt5.QtCore import QTimer, QThread, QObject, pyqtSignal, Qt
     from PyQt5.QtGui import QPixmap, QImage, QFont
-    from pyzbar import pyzbar
 except ImportError as e:
     print(f"Missing required dependencies: {e}")
     print("Please run: pip install PyQt5 opencv-python pyzbar numpy")
     sys.exit(1)
 
+from camera_bus import acquire_camera_bus, release_camera_bus
+from frame_sources import normalize_source
+from frame_pacing import FramePacer
+from analyzers import create_analyzer, draw_faces, draw_barcodes
+from shared_frames import AnalyzerProcess
+from scan_session import BarcodeUserResolver, MISSING
+from signed_payload import PayloadError, is_signed, signing_key, verify_payload
+from order_api import OrderSystemAPI
+from pipeline_metrics import get_metrics, dump_all, install_dump_signal
+from detection_service import DetectionServiceClient
+
+# Camera assignment; point both at the same index to share one device.
+# Either can also be a video file, image folder or synthetic stream (see
+# frame_sources.py), e.g. BARCODE_CAMERA_SOURCE=synthetic:qr
+PERSON_CAMERA_INDEX = normalize_source(os.environ.get('PERSON_CAMERA_SOURCE', 0))
+BARCODE_CAMERA_INDEX = normalize_source(os.environ.get('BARCODE_CAMERA_SOURCE', 1))
+
+# Analyser frame rates: normal, full (while busy) and idle (static scene)
+PERSON_FPS = (10.0, 15.0, 2.0)
+BARCODE_FPS = (10.0, 30.0, 2.0)
+
+# Only look for the symbologies printed on our cards (see barcode_decoder.PROFILES)
+BARCODE_PROFILE = 'cards'
+
+# Repeated reads of one code within this window count as a single scan (seconds)
+SCAN_DEBOUNCE_WINDOW = 3.0
+# How long resolved users / unknown codes are remembered (seconds)
+USER_CACHE_TTL = 300.0
+UNKNOWN_USER_TTL = 15.0
+
+# Where analysers run: 'threads' (inside the GUI process) or 'processes'
+# (worker processes fed through shared memory, off the GUI's GIL)
+ANALYZER_MODE = os.environ.get('ANALYZER_MODE', 'threads')
+
+# Attach to a running detection_service.py (e.g. http://127.0.0.1:8765)
+# instead of opening the cameras in this window
+DETECTION_SERVICE_URL = os.environ.get('DETECTION_SERVICE_URL')
+
+def create_frame_analyzer(kind: str, **options):
+    """Person/barcode analyser for the configured execution mode"""
+    if ANALYZER_MODE == 'processes':
+        return AnalyzerProcess(kind, **options)
+    return create_analyzer(kind, **options)
+
 class PersonDetectionThread(QThread):
     """Person detection thread"""
     person_detected = pyqtSignal()
     frame_ready = pyqtSignal(np.ndarray)
     
-    def __init__(self):
+    def __init__(self, camera_index=PERSON_CAMERA_INDEX):
         super().__init__()
         self.running = False
+        self.camera_index = camera_index
         self.camera = None
-        self.face_cascade = None
+        self.analyzer = None
         self.last_detection_time = 0
         self.detection_cooldown = 3.0
+        target_fps, max_fps, idle_fps = PERSON_FPS
+        self.pacer = FramePacer(target_fps, max_fps, idle_fps)
+        self.metrics = get_metrics('person')
         
     def run(self):
         self.running = True
-        self.camera = cv2.VideoCapture(0)
-        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        bus = acquire_camera_bus(self.camera_index)
+        if bus is None:
+            self.running = False
+            return
+        self.camera = bus.subscribe()
         
-        # Load face detection model
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
+        # Load face detection model (backend from welcome_system/config.py)
+        self.analyzer = create_frame_analyzer('person')
         
         while self.running:
+            lap = time.perf_counter()
             ret, frame = self.camera.read()
+            if not ret and not self.camera.active:
+                print(f"Camera {self.camera_index} stopped delivering frames")
+                break
             if ret:
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = self.face_cascade.detectMultiScale(
-                    gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)
-                )
+                lap = self.metrics.lap('capture', lap)
+                result = self.analyzer.analyze(frame)
+                faces = result.get('faces', [])
+                self.pacer.report_activity(result.get('active', False))
+                lap = self.metrics.lap('analyze', lap)
+                self.metrics.record_timings(result.get('timings'))
+                
+                # Bus frames are shared read-only; draw on a private copy
+                frame = frame.copy()
                 
                 # Draw detection boxes
-                for (x, y, w, h) in faces:
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
+                draw_faces(frame, faces)
+                lap = self.metrics.lap('draw', lap)
                 
                 # Person detected and cooldown time exceeded
                 current_time = time.time()
@@ -76,102 +131,179 @@ class PersonDetectionThread(QThread):
                     self.person_detected.emit()
                 
                 self.frame_ready.emit(frame)
+                self.metrics.lap('emit', lap)
+                self.metrics.frame_done(self.camera.frames_dropped)
             
-            time.sleep(0.1)
+            self.pacer.pace()
+        
+        self.analyzer.close()
+        self.camera.close()
+        self.camera = None
+        release_camera_bus(bus)
     
     def stop(self):
         self.running = False
-        if self.camera:
-            self.camera.release()
 
 class BarcodeDetectionThread(QThread):
     """Barcode detection thread"""
     barcode_detected = pyqtSignal(str, str)
     frame_ready = pyqtSignal(np.ndarray)
     
-    def __init__(self):
+    def __init__(self, camera_index=BARCODE_CAMERA_INDEX):
         super().__init__()
         self.running = False
+        self.camera_index = camera_index
         self.camera = None
+        self.analyzer = None
+        target_fps, max_fps, idle_fps = BARCODE_FPS
+        self.pacer = FramePacer(target_fps, max_fps, idle_fps)
+        self.metrics = get_metrics('barcode')
         
     def run(self):
         self.running = True
-        self.camera = cv2.VideoCapture(1)  # Use second camera
-        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        bus = acquire_camera_bus(self.camera_index)
+        if bus is None:
+            self.running = False
+            return
+        self.camera = bus.subscribe()
+        # Region tracking: cards are usually held in one spot
+        self.analyzer = create_frame_analyzer('barcode', profile=BARCODE_PROFILE,
+                                              full_sweep_every=10)
         
         while self.running:
+            lap = time.perf_counter()
             ret, frame = self.camera.read()
+            if not ret and not self.camera.active:
+                print(f"Camera {self.camera_index} stopped delivering frames")
+                break
             if ret:
+                lap = self.metrics.lap('capture', lap)
                 # Detect barcodes
-                barcodes = pyzbar.decode(frame)
+                result = self.analyzer.analyze(frame)
+                barcodes = result.get('barcodes', [])
+                lap = self.metrics.lap('analyze', lap)
+                self.metrics.record_timings(result.get('timings'))
+                
+                # Scan at full rate while a code is (even partly) in view
+                if result.get('boost'):
+                    self.pacer.boost()
+                else:
+                    self.pacer.report_activity(result.get('active', False))
+                
+                # Bus frames are shared read-only; draw on a private copy
+                frame = frame.copy()
+                
+                # Draw barcode info on image
+                draw_barcodes(frame, barcodes)
+                lap = self.metrics.lap('draw', lap)
                 
                 for barcode in barcodes:
-                    # Extract barcode data
-                    barcode_data = barcode.data.decode('utf-8')
-                    barcode_type = barcode.type
-                    
-                    # Draw barcode info on image
-                    (x, y, w, h) = barcode.rect
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                    cv2.putText(frame, f"{barcode_type}: {barcode_data}", 
-                              (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                    
                     # Send detection signal
-                    self.barcode_detected.emit(barcode_data, barcode_type)
+                    self.barcode_detected.emit(barcode['data'], barcode['type'])
                 
                 self.frame_ready.emit(frame)
+                self.metrics.lap('emit', lap)
+                self.metrics.frame_done(self.camera.frames_dropped)
             
-            time.sleep(0.1)
+            self.pacer.pace()
+        
+        self.analyzer.close()
+        self.camera.close()
+        self.camera = None
+        release_camera_bus(bus)
     
     def stop(self):
         self.running = False
-        if self.camera:
-            self.camera.release()
 
-class OrderSystemAPI:
-    """Order system API interface"""
+class PreviewRenderThread(QThread):
+    """Prepares preview frames for one view off the GUI thread
     
-    def __init__(self, base_url="http://localhost:3001"):
-        self.base_url = base_url
-        
-    def check_user_by_barcode(self, barcode_data: str) -> Optional[Dict]:
-        """Find user by barcode"""
-        try:
-            response = requests.get(f"{self.base_url}/api/user/barcode/{barcode_data}")
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            print(f"API call error: {e}")
-            return None
+    Frames are converted to RGB and resized to the view in this thread, so
+    the GUI only has to paint. At most one image per view is ever waiting on
+    the GUI; newer frames replace an unpainted one instead of queueing.
+    """
+    image_ready = pyqtSignal(QImage)
     
-    def create_order(self, user_id: str, items: List[Dict]) -> Optional[Dict]:
-        """Create an order"""
-        try:
-            data = {
-                "userId": user_id,
-                "items": items,
-                "timestamp": datetime.now().isoformat()
-            }
-            response = requests.post(f"{self.base_url}/api/orders", json=data)
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            print(f"Create order error: {e}")
-            return None
+    def __init__(self, width=640, height=480, metrics=None):
+        super().__init__()
+        self.running = False
+        self.metrics = metrics
+        self.target_size = (width, height)
+        self.pending_frame = None
+        self.awaiting_paint = False
+        self.frames_coalesced = 0
+        self.condition = threading.Condition()
     
-    def get_menu(self) -> Optional[Dict]:
-        """Get menu data"""
-        try:
-            response = requests.get(f"{self.base_url}/api/menu")
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            print(f"Get menu error: {e}")
-            return None
+    def submit(self, frame: np.ndarray):
+        """Queue a frame for rendering; safe to call from any thread"""
+        with self.condition:
+            if self.pending_frame is not None:
+                self.frames_coalesced += 1
+            self.pending_frame = frame
+            self.condition.notify()
+    
+    def frame_painted(self, width: int, height: int):
+        """Called by the GUI once the last image is on screen"""
+        with self.condition:
+            self.awaiting_paint = False
+            self.target_size = (max(1, width), max(1, height))
+            self.condition.notify()
+    
+    def run(self):
+        self.running = True
+        while self.running:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: not self.running or (
+                        self.pending_frame is not None and not self.awaiting_paint
+                    ),
+                    timeout=0.5
+                )
+                if not self.running:
+                    break
+                if self.pending_frame is None or self.awaiting_paint:
+                    continue
+                frame = self.pending_frame
+                self.pending_frame = None
+                target_w, target_h = self.target_size
+                self.awaiting_paint = True
+            
+            start = time.perf_counter()
+            # Fit inside the view, keeping the aspect ratio
+            h, w = frame.shape[:2]
+            scale = min(target_w / w, target_h / h)
+            size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+            resized = cv2.resize(frame, size, interpolation=interpolation)
+            rgb_frame = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+            
+            h, w, ch = rgb_frame.shape
+            bytes_per_line = ch * w
+            qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
+            # Detach from the numpy buffer before handing over to the GUI
+            self.image_ready.emit(qt_image.copy())
+            if self.metrics is not None:
+                self.metrics.lap('render', start)
+    
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+class CallbackBridge(QObject):
+    """Delivers worker-thread results to callbacks on the GUI thread"""
+    result_ready = pyqtSignal(object, object)
+    
+    def __init__(self):
+        super().__init__()
+        self.result_ready.connect(self._dispatch)
+    
+    def wrap(self, callback):
+        """Return a callable that can be invoked from any thread"""
+        return lambda *args: self.result_ready.emit(callback, args)
+    
+    def _dispatch(self, callback, args):
+        callback(*args)
 
 class IntegratedSystem(QMainWindow):
     """Integrated system main window"""
@@ -179,6 +311,14 @@ class IntegratedSystem(QMainWindow):
     def __init__(self):
         super().__init__()
         self.order_api = OrderSystemAPI()
+        # HTTP calls run on the API worker pool; results come back through here
+        self.callbacks = CallbackBridge()
+        self.user_resolver = BarcodeUserResolver(
+            lambda data: self.order_api.check_user_by_barcode(data, raise_errors=True),
+            window=SCAN_DEBOUNCE_WINDOW, ttl=USER_CACHE_TTL, negative_ttl=UNKNOWN_USER_TTL
+        )
+        # Cards with signed payloads are checked locally when a key is set
+        self.signing_key = signing_key()
         self.current_user = None
         self.menu_data = None
         self.init_ui()
@@ -228,6 +368,15 @@ class IntegratedSystem(QMainWindow):
         self.barcode_status = QLabel("Barcode Scanning: Not started")
         status_layout.addWidget(self.barcode_status)
         
+        # Per-stage timings, refreshed once a second
+        self.metrics_label = QLabel("")
+        self.metrics_label.setWordWrap(True)
+        self.metrics_label.setStyleSheet("font-family: monospace; font-size: 10px;")
+        status_layout.addWidget(self.metrics_label)
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.update_metrics_panel)
+        self.metrics_timer.start(1000)
+        
         layout.addWidget(status_group)
         
         # Control buttons
@@ -254,6 +403,11 @@ class IntegratedSystem(QMainWindow):
         self.test_api_btn.clicked.connect(self.test_api_connection)
         control_layout.addWidget(self.test_api_btn, 1, 1)
         
+        # Write pipeline timings to JSON
+        self.metrics_btn = QPushButton("Dump Metrics")
+        self.metrics_btn.clicked.connect(self.dump_metrics)
+        control_layout.addWidget(self.metrics_btn, 2, 0)
+        
         layout.addWidget(control_group)
         
         # User info
@@ -314,17 +468,60 @@ class IntegratedSystem(QMainWindow):
         """Initialise detection threads"""
         self.person_thread = None
         self.barcode_thread = None
+        self.service_client = None
+        
+        # Preview rendering runs off the GUI thread, one worker per view
+        self.person_preview = PreviewRenderThread(metrics=get_metrics('person'))
+        self.person_preview.image_ready.connect(self.update_person_video)
+        self.person_preview.start()
+        self.barcode_preview = PreviewRenderThread(metrics=get_metrics('barcode'))
+        self.barcode_preview.image_ready.connect(self.update_barcode_video)
+        self.barcode_preview.start()
+        
+        if DETECTION_SERVICE_URL:
+            self.connect_detection_service(DETECTION_SERVICE_URL)
+
+    def connect_detection_service(self, url: str):
+        """Take detection events from a headless service; cameras stay there"""
+        self.service_client = DetectionServiceClient(
+            url, self.callbacks.wrap(self.on_service_event)
+        )
+        self.service_client.start()
+        for button in (self.person_btn, self.barcode_btn):
+            button.setEnabled(False)
+        self.person_status.setText(f"Person Detection: Service ({url})")
+        self.barcode_status.setText(f"Barcode Scanning: Service ({url})")
+        self.log_message(f"Using detection service at {url}")
+
+    def on_service_event(self, event: Dict):
+        """Detection service event (GUI thread)"""
+        kind = event.get('type')
+        if kind == 'person':
+            self.on_person_detected()
+        elif kind == 'barcode':
+            self.log_message(f"[{event['lane']}] Detected {event['symbology']} barcode: {event['data']}")
+        elif kind in ('login', 'unknown_user'):
+            # The service has already debounced and looked the code up
+            self.on_user_resolved(event['data'], event.get('user'))
+        elif kind == 'lookup_failed':
+            self.log_message(f"User lookup failed: {event.get('error')}")
+            QMessageBox.warning(self, "User Search", f"User lookup failed: {event.get('error')}")
+        elif kind == 'rejected_card':
+            self.reject_card(event['error'])
+        elif kind in ('login_confirmed', 'login_revoked'):
+            self.on_login_checked(event['user_id'], event.get('user'))
 
     def create_person_thread(self):
         thread = PersonDetectionThread()
         thread.person_detected.connect(self.on_person_detected)
-        thread.frame_ready.connect(self.update_person_video)
+        # Direct: hand frames to the renderer without touching the GUI thread
+        thread.frame_ready.connect(self.person_preview.submit, Qt.DirectConnection)
         return thread
 
     def create_barcode_thread(self):
         thread = BarcodeDetectionThread()
         thread.barcode_detected.connect(self.on_barcode_detected)
-        thread.frame_ready.connect(self.update_barcode_video)
+        thread.frame_ready.connect(self.barcode_preview.submit, Qt.DirectConnection)
         return thread
         
     def toggle_person_detection(self):
@@ -354,6 +551,12 @@ class IntegratedSystem(QMainWindow):
         else:
             self.barcode_thread.stop()
             self.barcode_thread.wait()
+            if self.barcode_thread.analyzer:
+                self.log_message("Decoder stats:\n" + self.barcode_thread.analyzer.report())
+            stats = self.user_resolver.stats()
+            self.log_message(f"Scans: {stats['scans']}, duplicates suppressed: "
+                             f"{stats['duplicates_suppressed']}, user cache hits: "
+                             f"{stats['cache_hits']}")
             self.barcode_thread = None
             self.barcode_btn.setText("Start Barcode Scanning")
             self.barcode_status.setText("Barcode Scanning: Stopped")
@@ -379,18 +582,26 @@ class IntegratedSystem(QMainWindow):
     
     def test_api_connection(self):
         """Test API connection"""
-        try:
-            menu_data = self.order_api.get_menu()
-            if menu_data:
-                self.menu_data = menu_data
-                self.log_message("API connection successful, menu data loaded")
-                QMessageBox.information(self, "Connection Successful", "API connection successful!")
-            else:
-                self.log_message("API connection failed")
-                QMessageBox.warning(self, "Connection Failed", "Unable to connect to order system API")
-        except Exception as e:
-            self.log_message(f"API connection error: {e}")
-            QMessageBox.warning(self, "Connection Error", f"API connection error: {e}")
+        self.test_api_btn.setEnabled(False)
+        self.log_message("Testing API connection...")
+        self.order_api.get_menu_async(callback=self.callbacks.wrap(self.on_menu_loaded))
+    
+    def on_menu_loaded(self, menu_data: Optional[Dict], error: Optional[BaseException]):
+        """API connection test result (GUI thread)"""
+        self.test_api_btn.setEnabled(True)
+        if error is not None:
+            self.log_message(f"API connection test failed: {error}")
+        latency = self.order_api.latency_stats().get('get_menu')
+        if latency:
+            self.log_message(f"API latency: {latency['mean_ms']} ms avg, "
+                             f"{latency['p95_ms']} ms p95, {latency['errors']} errors")
+        if menu_data:
+            self.menu_data = menu_data
+            self.log_message("API connection successful, menu data loaded")
+            QMessageBox.information(self, "Connection Successful", "API connection successful!")
+        else:
+            self.log_message("API connection failed")
+            QMessageBox.warning(self, "Connection Failed", "Unable to connect to order system API")
     
     def on_person_detected(self):
         """Person detection callback"""
@@ -406,10 +617,45 @@ class IntegratedSystem(QMainWindow):
     
     def on_barcode_detected(self, data: str, barcode_type: str):
         """Barcode detection callback"""
+        # The same card is decoded on every frame while it is held up
+        if not self.user_resolver.accept(data):
+            return
         self.log_message(f"Detected {barcode_type} barcode: {data}")
         
-        # Find user
-        user = self.order_api.check_user_by_barcode(data)
+        if self.signing_key and is_signed(data):
+            self.on_signed_card(data)
+            return
+        
+        # Find user: cached answers are immediate, otherwise ask the backend
+        # without blocking the GUI
+        user = self.user_resolver.cached(data)
+        if user is not MISSING:
+            self.on_user_resolved(data, user)
+            return
+        start = time.perf_counter()
+        self.order_api.check_user_by_barcode_async(
+            data, callback=self.callbacks.wrap(
+                lambda result, error: self.on_user_resolved(data, result, start, error)
+            )
+        )
+    
+    def on_user_resolved(self, data: str, user: Optional[Dict],
+                         start: Optional[float] = None,
+                         error: Optional[BaseException] = None):
+        """User lookup result for a scanned code (GUI thread)
+        
+        ``start`` is set when the answer came from the backend rather than
+        the cache.
+        """
+        if error is not None:
+            # Not cached: the next scan of this card asks again
+            self.log_message(f"User lookup failed: {error}")
+            QMessageBox.warning(self, "User Search", f"User lookup failed: {error}")
+            return
+        if start is not None:
+            self.user_resolver.store(data, user)
+            elapsed = (time.perf_counter() - start) * 1000.0
+            self.log_message(f"User lookup took {elapsed:.0f} ms")
         if user:
             self.current_user = user
             self.user_info_label.setText(f"User: {user.get('username', 'Unknown')}")
@@ -421,6 +667,66 @@ class IntegratedSystem(QMainWindow):
             self.log_message("No matching user found")
             QMessageBox.information(self, "User Search", f"No user found for barcode {data}")
     
+    def on_signed_card(self, data: str):
+        """Signed card: verify locally and log in now, confirm with the backend later"""
+        try:
+            signed = verify_payload(data, self.signing_key)
+        except PayloadError as e:
+            self.reject_card(str(e))
+            return
+        user = self.user_resolver.cached(data)
+        if user is not MISSING:
+            self.on_user_resolved(data, user)
+            return
+        
+        self.log_message(f"Card verified locally: user {signed.user_id} ({signed.tier})")
+        self.current_user = {'id': signed.user_id, 'type': signed.tier, 'confirmed': False}
+        self.user_info_label.setText(f"Welcome! {signed.tier} {signed.user_id} (confirming...)")
+        self.open_order_system_for_user(self.current_user)
+        
+        start = time.perf_counter()
+        # raise_errors: an unreachable backend must not look like an unknown user
+        self.order_api.submit(
+            self.order_api.check_user_by_barcode, signed.user_id, True,
+            callback=self.callbacks.wrap(
+                lambda result, error: self.on_signed_card_confirmed(data, signed, result,
+                                                                    error, start)
+            )
+        )
+    
+    def on_signed_card_confirmed(self, data: str, signed, user: Optional[Dict],
+                                 error: Optional[BaseException], start: float):
+        """Backend answer for a locally verified card (GUI thread)"""
+        if error is not None:
+            # The signature is proof enough to carry on offline
+            self.log_message(f"Backend unreachable; continuing with verified card {signed.user_id}")
+            if self.current_user and self.current_user.get('id') == signed.user_id:
+                self.user_info_label.setText(f"User: {signed.user_id} ({signed.tier}, offline)")
+            return
+        self.user_resolver.store(data, user)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        self.log_message(f"Backend answered for user {signed.user_id} ({elapsed:.0f} ms)")
+        self.on_login_checked(signed.user_id, user)
+
+    def on_login_checked(self, user_id: str, user: Optional[Dict]):
+        """Backend verdict on a locally verified card (GUI thread)"""
+        current = self.current_user and self.current_user.get('id') == user_id
+        if user:
+            self.log_message(f"User {user.get('username', user_id)} confirmed")
+            if current:
+                self.current_user = user
+                self.user_info_label.setText(f"User: {user.get('username', 'Unknown')}")
+            return
+        # Valid signature, but the backend no longer knows the user (e.g. deleted)
+        self.log_message(f"Backend did not confirm user {user_id}; session ended")
+        if current:
+            self.current_user = None
+            self.user_info_label.setText("No user logged in")
+
+    def reject_card(self, reason: str):
+        self.log_message(f"Rejected card: {reason}")
+        QMessageBox.warning(self, "Card Check", f"This card is not valid: {reason}")
+    
     def play_welcome_sound(self):
         """Play welcome sound"""
         try:
@@ -447,25 +753,33 @@ class IntegratedSystem(QMainWindow):
         except Exception as e:
             self.log_message(f"Failed to open order system: {e}")
     
-    def update_person_video(self, frame: np.ndarray):
+    def update_person_video(self, image: QImage):
         """Update person detection video display"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_frame.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(qt_image)
-        scaled_pixmap = pixmap.scaled(self.person_video_label.size(), Qt.KeepAspectRatio)
-        self.person_video_label.setPixmap(scaled_pixmap)
-    
-    def update_barcode_video(self, frame: np.ndarray):
+        self.person_video_label.setPixmap(QPixmap.fromImage(image))
+        label = self.person_video_label
+        self.person_preview.frame_painted(label.width(), label.height())
+    
+    def update_barcode_video(self, image: QImage):
         """Update barcode scanning video display"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_frame.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(qt_image)
-        scaled_pixmap = pixmap.scaled(self.barcode_video_label.size(), Qt.KeepAspectRatio)
-        self.barcode_video_label.setPixmap(scaled_pixmap)
+        self.barcode_video_label.setPixmap(QPixmap.fromImage(image))
+        label = self.barcode_video_label
+        self.barcode_preview.frame_painted(label.width(), label.height())
+    
+    def update_metrics_panel(self):
+        """Show stage timings for the pipelines that are running"""
+        lines = []
+        for thread in (self.person_thread, self.barcode_thread):
+            if thread and thread.isRunning():
+                lines.append(thread.metrics.summary())
+        self.metrics_label.setText("\n".join(lines))
+    
+    def dump_metrics(self):
+        """Write all pipeline timings to a JSON file"""
+        try:
+            path = dump_all()
+            self.log_message(f"Pipeline metrics written to {os.path.abspath(path)}")
+        except OSError as e:
+            self.log_message(f"Failed to write metrics: {e}")
     
     def reset_status(self):
         """Reset status"""
@@ -488,12 +802,20 @@ class IntegratedSystem(QMainWindow):
             self.barcode_thread.stop()
             self.barcode_thread.wait()
             self.barcode_thread = None
+        if self.service_client:
+            self.service_client.stop()
+        for preview in (self.person_preview, self.barcode_preview):
+            preview.stop()
+            preview.wait()
+        self.order_api.close()
         
         event.accept()
 
 def main():
     """Main function"""
     app = QApplication(sys.argv)
+    # kill -USR1 <pid> writes pipeline_metrics.json
+    install_dump_signal()
     
     # Set app style
     app.setStyle('Fusion')
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lane Manager - One supervised pipeline per camera for multi-entrance sites
+
+Each lane is a camera source with a role: 'person' for entrances (welcome
+detection) or 'barcode' for scan stations. Lanes share one analysis worker
+pool and one overall frame budget, so adding lanes lowers everyone's frame
+rate evenly instead of starving a camera. A supervisor restarts lanes whose
+camera stops delivering frames; a file, folder or synthetic source that plays
+to its end is finished, not failed, and is left alone.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'welcome_system'))
+
+from camera_bus import acquire_camera_bus, release_camera_bus
+from frame_pacing import FramePacer
+from analyzers import create_analyzer
+from shared_frames import AnalyzerProcess
+from pipeline_metrics import get_metrics, install_dump_signal
+
+# Per-role frame rates: normal, full (while busy) and idle (static scene)
+ROLE_FPS = {
+    'person': (10.0, 15.0, 2.0),
+    'barcode': (10.0, 30.0, 2.0),
+}
+
+
+class Lane:
+    """A single camera pipeline: capture, analyze, pace, report events"""
+
+    def __init__(self, name: str, source, role: str, manager: 'LaneManager',
+                 options: Optional[Dict] = None):
+        if role not in ROLE_FPS:
+            raise ValueError(f"Unknown lane role '{role}'")
+        self.name = name
+        self.source = source
+        self.role = role
+        self.manager = manager
+        self.options = options or {}
+        # Configured rates; the budget only ever lowers the pacer below these
+        self.base_fps = ROLE_FPS[role]
+        self.pacer = FramePacer(*self.base_fps)
+        # Each run gets its own stop event, so a run that is slow to exit
+        # cannot be revived by the next start()
+        self.stop_event: Optional[threading.Event] = None
+        self.thread = None
+        self.subscription = None
+        # Set when the source ran out of frames (not restarted)
+        self.finished = False
+        self.last_frame_time = 0.0
+        self.started_at = 0.0
+        self.restarts = 0
+        self.next_restart = 0.0
+        self.last_person_time = 0.0
+        self.frame_times = deque(maxlen=120)
+        self.latencies = deque(maxlen=120)
+        self.metrics = get_metrics(f"lane:{name}")
+
+    def apply_budget(self, fps_cap: float):
+        """Limit this lane to its fair share of the site frame budget"""
+        target_fps, max_fps, idle_fps = self.base_fps
+        self.pacer.target_fps = min(target_fps, fps_cap)
+        self.pacer.max_fps = min(max_fps, max(fps_cap, self.pacer.target_fps))
+        self.pacer.idle_fps = min(idle_fps, self.pacer.target_fps)
+
+    @property
+    def running(self) -> bool:
+        """Started and not yet asked to stop (or finished on its own)"""
+        return self.stop_event is not None and not self.stop_event.is_set()
+
+    @property
+    def alive(self) -> bool:
+        """Whether a lane thread, current or stopping, is still executing"""
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self) -> bool:
+        """Start a new run; False while the previous run is still exiting"""
+        if self.alive:
+            return False
+        self.stop_event = threading.Event()
+        self.finished = False
+        self.started_at = time.monotonic()
+        self.last_frame_time = self.started_at
+        self.frame_times.clear()
+        self.thread = threading.Thread(target=self._run, args=(self.stop_event,),
+                                       name=f"lane-{self.name}", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        if self.stop_event is not None:
+            self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=timeout)
+        if not self.alive:
+            self.thread = None
+
+    def _run(self, stop: threading.Event):
+        bus = acquire_camera_bus(self.source)
+        if bus is None:
+            stop.set()
+            return
+        subscription = self.subscription = bus.subscribe()
+        analyzer = None
+        try:
+            analyzer = self.manager.create_lane_analyzer(self.role, **self.options)
+            while not stop.is_set():
+                lap = time.perf_counter()
+                ret, frame = subscription.read()
+                if not ret:
+                    if not subscription.active:
+                        if bus.ended:
+                            self.finished = True
+                            print(f"Lane {self.name}: source {self.source} ended")
+                        break
+                    continue
+                now = time.monotonic()
+                self.last_frame_time = now
+                # The shared pool bounds total analysis concurrency across lanes
+                start = self.metrics.lap('capture', lap)
+                result = self.manager.pool.submit(analyzer.analyze, frame).result()
+                self.latencies.append((self.metrics.lap('analyze', start) - start) * 1000.0)
+                self.metrics.record_timings(result.get('timings'))
+                self.frame_times.append(now)
+                self._handle(result)
+                self.metrics.frame_done(subscription.frames_dropped)
+                self.pacer.pace()
+        except Exception as e:
+            print(f"Lane {self.name} error: {e}")
+        finally:
+            if analyzer is not None:
+                analyzer.close()
+            subscription.close()
+            release_camera_bus(bus)
+            stop.set()
+
+    def _handle(self, result: Dict):
+        if self.role == 'person':
+            self.pacer.report_activity(result.get('active', False))
+            faces = result.get('faces', [])
+            now = time.time()
+            if faces and now - self.last_person_time > self.manager.person_cooldown:
+                self.last_person_time = now
+                self.manager.emit({'lane': self.name, 'type': 'person',
+                                   'faces': len(faces), 'time': now})
+        else:
+            if result.get('boost'):
+                self.pacer.boost()
+            else:
+                self.pacer.report_activity(result.get('active', False))
+            for barcode in result.get('barcodes', []):
+                self.manager.emit({'lane': self.name, 'type': 'barcode',
+                                   'data': barcode['data'], 'symbology': barcode['type'],
+                                   'time': time.time()})
+
+    def stats(self) -> Dict:
+        """Recent FPS, analysis latency and drops for this lane"""
+        fps = 0.0
+        if len(self.frame_times) > 1:
+            span = self.frame_times[-1] - self.frame_times[0]
+            fps = (len(self.frame_times) - 1) / span if span > 0 else 0.0
+        latencies = sorted(self.latencies)
+        return {
+            'role': self.role,
+            'source': self.source,
+            'running': self.running,
+            'finished': self.finished,
+            'fps': round(fps, 1),
+            'target_fps': round(self.pacer.current_fps, 1),
+            'latency_ms': round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+            'latency_p95_ms': round(latencies[int(len(latencies) * 0.95)], 1) if latencies else 0.0,
+            'dropped': self.subscription.frames_dropped if self.subscription else 0,
+            'restarts': self.restarts,
+        }
+
+
+class LaneManager:
+    """Starts, throttles and supervises one pipeline per camera lane"""
+
+    def __init__(self, lanes: List[Dict], max_total_fps: float = 40.0,
+                 workers: Optional[int] = None, analyzer_mode: str = 'threads',
+                 person_cooldown: float = 3.0, stall_timeout: float = 5.0):
+        self.max_total_fps = max_total_fps
+        self.analyzer_mode = analyzer_mode
+        self.person_cooldown = person_cooldown
+        self.stall_timeout = stall_timeout
+        self.pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 2,
+                                       thread_name_prefix='lane-analyzer')
+        self.listeners: List[Callable[[Dict], None]] = []
+        self.lanes: Dict[str, Lane] = {}
+        for spec in lanes:
+            self.add_lane(spec)
+        self.running = False
+        self.supervisor = None
+
+    def create_lane_analyzer(self, role: str, **options):
+        if self.analyzer_mode == 'processes':
+            return AnalyzerProcess(role, **options)
+        return create_analyzer(role, **options)
+
+    def add_lane(self, spec: Dict) -> Lane:
+        """Add a lane from {'name', 'source', 'role', 'options'}"""
+        name = spec.get('name') or f"{spec['role']}-{spec['source']}"
+        lane = Lane(name, spec['source'], spec['role'], self, spec.get('options'))
+        self.lanes[name] = lane
+        self.rebalance()
+        if getattr(self, 'running', False):
+            lane.start()
+        return lane
+
+    def rebalance(self):
+        """Split the site frame budget evenly across lanes"""
+        if not self.lanes:
+            return
+        share = self.max_total_fps / len(self.lanes)
+        for lane in self.lanes.values():
+            lane.apply_budget(share)
+
+    def subscribe(self, listener: Callable[[Dict], None]):
+        """Receive detection events (called from lane threads)"""
+        self.listeners.append(listener)
+
+    def emit(self, event: Dict):
+        for listener in list(self.listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"Lane event listener error: {e}")
+
+    def start(self):
+        self.running = True
+        for lane in self.lanes.values():
+            lane.start()
+        self.supervisor = threading.Thread(target=self._supervise, name='lane-supervisor',
+                                           daemon=True)
+        self.supervisor.start()
+
+    def stop(self):
+        self.running = False
+        for lane in self.lanes.values():
+            lane.stop()
+        if self.supervisor:
+            self.supervisor.join(timeout=2.0)
+        self.pool.shutdown(wait=False)
+
+    def _supervise(self):
+        while self.running:
+            time.sleep(1.0)
+            now = time.monotonic()
+            for lane in list(self.lanes.values()):
+                if not self.running:
+                    break
+                if lane.finished:
+                    continue
+                stalled = lane.running and now - lane.last_frame_time > self.stall_timeout
+                if (stalled or not lane.running) and now >= lane.next_restart:
+                    # Don't wait for a hung run: start() refuses until it has exited
+                    lane.stop(timeout=0)
+                    lane.restarts += 1
+                    # Back off on a camera that keeps failing: 2s, 4s, ... 30s
+                    lane.next_restart = now + min(30.0, 2.0 ** min(lane.restarts, 5))
+                    if lane.start():
+                        print(f"Restarting lane {lane.name}")
+                    else:
+                        # Never run two threads on one lane; try again after the back-off
+                        print(f"Lane {lane.name} is still shutting down, not restarting yet")
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+
+def load_lanes(path: Optional[str] = None) -> List[Dict]:
+    """Lane list from a JSON file, or CAMERA_LANES in welcome_system/config.py"""
+    if path:
+        with open(path) as f:
+            return json.load(f)
+    import config
+    return list(getattr(config, 'CAMERA_LANES', [
+        {'name': 'entrance', 'source': config.CAMERA_INDEX, 'role': 'person'},
+    ]))
+
+
+def default_frame_budget() -> float:
+    """LANE_MAX_TOTAL_FPS from welcome_system/config.py"""
+    import config
+    return float(getattr(config, 'LANE_MAX_TOTAL_FPS', 40.0))
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Run detection on several camera lanes")
+    parser.add_argument('--lanes', help="JSON file: [{\"name\", \"source\", \"role\"}, ...]")
+    parser.add_argument('--max-fps', type=float, help="Total frame budget (default: config)")
+    parser.add_argument('--processes', action='store_true', help="Analyze in worker processes")
+    args = parser.parse_args()
+
+    manager = LaneManager(load_lanes(args.lanes),
+                          max_total_fps=args.max_fps or default_frame_budget(),
+                          analyzer_mode='processes' if args.processes else 'threads')
+    manager.subscribe(lambda event: print(json.dumps(event)))
+    install_dump_signal()
+    manager.start()
+    try:
+        while True:
+            time.sleep(10)
+            for name, s in manager.stats().items():
+                print(f"[{name}] {s['role']}: {s['fps']} fps (target {s['target_fps']}), "
+                      f"{s['latency_ms']} ms avg, {s['latency_p95_ms']} ms p95, "
+                      f"{s['dropped']} dropped, {s['restarts']} restarts")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Order System API - Client for the restaurant-ordering Node backend
+
+All calls share one keep-alive connection pool and have timeouts, so a busy
+backend can slow a lookup down but never hang it. Every call can also run on
+a small thread pool and report back through a callback, which keeps it off
+the GUI thread; latency is recorded per endpoint either way. Callbacks get
+``(result, error)``, so a call that raises is still answered.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def _deliver(future: Future, callback: Callable):
+    """Hand a finished call's result, or its exception, to the callback"""
+    if future.cancelled():
+        callback(None, CancelledError())
+        return
+    error = future.exception()
+    callback(None if error is not None else future.result(), error)
+
+
+class OrderSystemAPI:
+    """Order system API interface"""
+
+    def __init__(self, base_url="http://localhost:3001", timeout=(2.0, 5.0),
+                 max_workers: int = 4, pool_size: int = 8):
+        self.base_url = base_url
+        # (connect, read) seconds
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='order-api')
+        self.latencies: Dict[str, deque] = {}
+        self.errors: Dict[str, int] = {}
+        self.stats_lock = threading.Lock()
+
+    def _record(self, endpoint: str, elapsed: float, failed: bool):
+        with self.stats_lock:
+            self.latencies.setdefault(endpoint, deque(maxlen=200)).append(elapsed * 1000.0)
+            if failed:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def _request(self, endpoint: str, method: str, path: str, **kwargs) -> Optional[Dict]:
+        """Timed request; returns the JSON body on HTTP 200, else None
+
+        Server errors (5xx) raise like connection problems do: they say
+        nothing about the thing asked for.
+        """
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}",
+                                            timeout=self.timeout, **kwargs)
+            if response.status_code >= 500:
+                response.raise_for_status()
+            failed = False
+            if response.status_code == 200:
+                return response.json()
+            return None
+        finally:
+            self._record(endpoint, time.perf_counter() - start, failed)
+
+    def check_user_by_barcode(self, barcode_data: str, raise_errors: bool = False) -> Optional[Dict]:
+        """Find user by barcode
+
+        Connection problems and server errors give None too, unless
+        ``raise_errors`` is set (callers that must tell "unknown user" from
+        "backend down").
+        """
+        try:
+            return self._request('check_user', 'GET', f"/api/user/barcode/{barcode_data}")
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"API call error: {e}")
+            return None
+
+    def create_order(self, user_id: str, items: List[Dict]) -> Optional[Dict]:
+        """Create an order"""
+        try:
+            data = {
+                "userId": user_id,
+                "items": items,
+                "timestamp": datetime.now().isoformat()
+            }
+            return self._request('create_order', 'POST', "/api/orders", json=data)
+        except Exception as e:
+            print(f"Create order error: {e}")
+            return None
+
+    def get_menu(self) -> Optional[Dict]:
+        """Get menu data"""
+        try:
+            return self._request('get_menu', 'GET', "/api/menu")
+        except Exception as e:
+            print(f"Get menu error: {e}")
+            return None
+
+    def submit(self, func: Callable, *args,
+               callback: Optional[Callable[[Any, Optional[BaseException]], None]] = None) -> Future:
+        """Run a call on the worker pool; ``callback`` gets ``(result, error)``
+
+        ``error`` is the exception the call raised (``result`` is then None),
+        or None on success. The callback runs on the worker thread; GUI code
+        should wrap it so it is delivered on the GUI thread.
+        """
+        future = self.executor.submit(func, *args)
+        if callback is not None:
+            future.add_done_callback(lambda f: _deliver(f, callback))
+        return future
+
+    def check_user_by_barcode_async(self, barcode_data: str, callback=None) -> Future:
+        # A failed lookup reaches the callback as an error, never as "no such user"
+        return self.submit(self.check_user_by_barcode, barcode_data, True, callback=callback)
+
+    def create_order_async(self, user_id: str, items: List[Dict], callback=None) -> Future:
+        return self.submit(self.create_order, user_id, items, callback=callback)
+
+    def get_menu_async(self, callback=None) -> Future:
+        return self.submit(self.get_menu, callback=callback)
+
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """Recent latency (ms, last 200 calls) and error count per endpoint"""
+        with self.stats_lock:
+            snapshot = {name: sorted(values) for name, values in self.latencies.items()}
+            errors = dict(self.errors)
+        stats = {}
+        for name, values in snapshot.items():
+            stats[name] = {
+                'samples': len(values),
+                'errors': errors.get(name, 0),
+                'mean_ms': round(sum(values) / len(values), 1),
+                'p95_ms': round(values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+                'max_ms': round(values[-1], 1),
+            }
+        return stats
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline Metrics - Per-stage latency for the vision pipelines
+
+Every pipeline (person thread, barcode thread, welcome loop, lanes) records
+how long each stage of a frame took: capture wait, colour conversion,
+detect/decode, drawing, signal emit and render. Samples go into rolling
+bucketed histograms, so recording is a bisect and an increment, and
+percentiles are only worked out when someone asks for them.
+
+Dump everything to JSON with ``dump_all()``, or send SIGUSR1 to a process
+that called ``install_dump_signal()``.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Optional
+
+# Bucket upper bounds in ms: 0.05 ms to ~14 s, 25% apart (about 12% error)
+BUCKET_BOUNDS_MS = []
+_bound = 0.05
+while _bound < 15000.0:
+    BUCKET_BOUNDS_MS.append(round(_bound, 4))
+    _bound *= 1.25
+del _bound
+
+DEFAULT_DUMP_PATH = os.environ.get('METRICS_DUMP_PATH', 'pipeline_metrics.json')
+
+
+class RollingHistogram:
+    """Latency histogram over roughly the last ``window`` seconds
+
+    Two half-window histograms are kept; when the current one is
+    ``window / 2`` old it becomes the previous one and a fresh one starts.
+    """
+
+    def __init__(self, window: float = 10.0):
+        self.half_window = window / 2.0
+        self.current = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.previous = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.current_sum = self.previous_sum = 0.0
+        self.current_max = self.previous_max = 0.0
+        self.rotated_at = time.monotonic()
+        self.total = 0
+
+    def _rotate(self, now: float):
+        elapsed = now - self.rotated_at
+        if elapsed < self.half_window:
+            return
+        if elapsed < 2 * self.half_window:
+            self.previous, self.previous_sum, self.previous_max = (
+                self.current, self.current_sum, self.current_max)
+        else:
+            # Idle for a whole window; nothing recent to keep
+            self.previous = [0] * len(self.current)
+            self.previous_sum = self.previous_max = 0.0
+        self.current = [0] * len(self.previous)
+        self.current_sum = self.current_max = 0.0
+        self.rotated_at = now
+
+    def add(self, ms: float):
+        self._rotate(time.monotonic())
+        self.current[bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.current_sum += ms
+        if ms > self.current_max:
+            self.current_max = ms
+        self.total += 1
+
+    def summary(self) -> Dict[str, float]:
+        self._rotate(time.monotonic())
+        counts = [a + b for a, b in zip(self.current, self.previous)]
+        count = sum(counts)
+        if count == 0:
+            return {'count': 0, 'total': self.total}
+        peak = max(self.current_max, self.previous_max)
+
+        def percentile(q: float) -> float:
+            rank = q * count
+            seen = 0
+            for index, n in enumerate(counts):
+                seen += n
+                if seen >= rank:
+                    bound = BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else peak
+                    return round(min(bound, peak), 2)
+            return round(peak, 2)
+
+        return {
+            'count': count,
+            'total': self.total,
+            'mean_ms': round((self.current_sum + self.previous_sum) / count, 2),
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(peak, 2),
+        }
+
+
+class PipelineMetrics:
+    """Stage timings, frame rate and dropped frames for one pipeline"""
+
+    def __init__(self, name: str, window: float = 10.0):
+        self.name = name
+        self.window = window
+        self.stages: Dict[str, RollingHistogram] = {}
+        self.frame_times = deque(maxlen=600)
+        self.frames = 0
+        self.dropped = 0
+
+    def record(self, stage: str, ms: float):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages.setdefault(stage, RollingHistogram(self.window))
+        histogram.add(ms)
+
+    def lap(self, stage: str, since: float) -> float:
+        """Record the time since ``since`` (perf_counter) and return now"""
+        now = time.perf_counter()
+        self.record(stage, (now - since) * 1000.0)
+        return now
+
+    def record_timings(self, timings: Optional[Dict[str, float]]):
+        """Stage timings (ms) reported by an analyzer result"""
+        if timings:
+            for stage, ms in timings.items():
+                self.record(stage, ms)
+
+    def frame_done(self, dropped: Optional[int] = None):
+        """Count a finished frame; ``dropped`` is the source's running total"""
+        self.frames += 1
+        self.frame_times.append(time.monotonic())
+        if dropped is not None:
+            self.dropped = dropped
+
+    def fps(self) -> float:
+        now = time.monotonic()
+        recent = [t for t in self.frame_times if now - t <= self.window]
+        if len(recent) < 2 or recent[-1] <= recent[0]:
+            return 0.0
+        return (len(recent) - 1) / (recent[-1] - recent[0])
+
+    def snapshot(self) -> Dict:
+        return {
+            'name': self.name,
+            'fps': round(self.fps(), 1),
+            'frames': self.frames,
+            'dropped': self.dropped,
+            'stages': {stage: h.summary() for stage, h in list(self.stages.items())},
+        }
+
+    def summary(self) -> str:
+        """One line for a status panel or overlay: fps and p95 per stage"""
+        parts = [f"{self.name}: {self.fps():.1f} fps, {self.dropped} dropped"]
+        for stage, histogram in list(self.stages.items()):
+            stats = histogram.summary()
+            if stats['count']:
+                parts.append(f"{stage} {stats['p50_ms']:.1f}/{stats['p95_ms']:.1f}")
+        return " | ".join(parts) + " (p50/p95 ms)"
+
+
+_registry: Dict[str, PipelineMetrics] = {}
+_registry_lock = threading.Lock()
+
+
+def get_metrics(name: str) -> PipelineMetrics:
+    """The metrics for a named pipeline, created on first use"""
+    with _registry_lock:
+        metrics = _registry.get(name)
+        if metrics is None:
+            metrics = _registry[name] = PipelineMetrics(name)
+        return metrics
+
+
+def snapshot_all() -> Dict[str, Dict]:
+    with _registry_lock:
+        pipelines = list(_registry.values())
+    return {metrics.name: metrics.snapshot() for metrics in pipelines}
+
+
+def dump_all(path: str = DEFAULT_DUMP_PATH) -> str:
+    """Write every pipeline's snapshot to a JSON file; returns the path"""
+    with open(path, 'w') as f:
+        json.dump({'time': time.time(), 'pipelines': snapshot_all()}, f, indent=2)
+    return path
+
+
+def install_dump_signal(path: str = DEFAULT_DUMP_PATH) -> bool:
+    """Dump metrics on SIGUSR1 (POSIX only; call from the main thread)"""
+    import signal
+    if not hasattr(signal, 'SIGUSR1'):
+        return False
+    signal.signal(signal.SIGUSR1, lambda signum, frame: dump_all(path))
+    return True
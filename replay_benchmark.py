@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Replay Benchmark - Detection and decoding throughput on recorded footage
+
+Replays video files, image folders or synthetic streams (frame_sources.py)
+through the same per-frame logic the live pipelines run:
+
+    person    PersonDetectionThread: analyze, copy, draw faces
+    barcode   BarcodeDetectionThread: analyze, copy, draw barcodes
+    welcome   WelcomeSystem.detect_person
+    *-proc    person/barcode with the analyzer in a worker process
+
+Every frame is processed (no dropping), and results go to a JSON baseline:
+
+    python3 replay_benchmark.py run test_barcodes "synthetic:qr?count=200" -o baseline.json
+    python3 replay_benchmark.py compare baseline.json current.json
+
+``compare`` exits with status 1 when a configuration got slower or decodes
+less than the baseline allows.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'welcome_system'))
+
+from frame_sources import open_frame_source, parse_source
+from analyzers import create_analyzer, draw_faces, draw_barcodes
+from shared_frames import AnalyzerProcess
+from pipeline_metrics import get_metrics
+import config as welcome_config
+
+DEFAULT_SOURCES = ['test_barcodes', 'synthetic:qr?count=150', 'synthetic:pattern?count=150']
+DEFAULT_CONFIGS = ['person', 'barcode', 'welcome']
+
+# Regression thresholds for compare (relative, except decode rate)
+FPS_TOLERANCE = 0.10
+LATENCY_TOLERANCE = 0.15
+DECODE_RATE_TOLERANCE = 0.02
+
+
+def load_frames(source, max_frames: int = 300) -> List[np.ndarray]:
+    """Read up to ``max_frames`` frames into memory, so I/O isn't timed"""
+    capture = open_frame_source(source, realtime=False)
+    frames = []
+    try:
+        while len(frames) < max_frames:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            frames.append(frame.copy())
+    finally:
+        capture.release()
+    return frames
+
+
+def _person_step(analyzer) -> Callable[[np.ndarray], Dict]:
+    def step(frame):
+        result = analyzer.analyze(frame)
+        frame = frame.copy()
+        draw_faces(frame, result.get('faces', []))
+        return result
+    return step
+
+
+def _barcode_step(analyzer) -> Callable[[np.ndarray], Dict]:
+    def step(frame):
+        result = analyzer.analyze(frame)
+        frame = frame.copy()
+        draw_barcodes(frame, result.get('barcodes', []))
+        return result
+    return step
+
+
+def _load_welcome_system():
+    """welcome_system/welcome_system.py, loaded by path (the folder shares its name)"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        'welcome_system', 'welcome_system.py')
+    spec = importlib.util.spec_from_file_location('welcome_app', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _welcome_step():
+    from face_detector import create_face_detector
+    WelcomeSystem = _load_welcome_system().WelcomeSystem
+
+    # detect_person without the camera and audio set-up of __init__
+    class Harness:
+        detect_person = WelcomeSystem.detect_person
+
+    harness = Harness()
+    harness.face_detector = create_face_detector(welcome_config)
+    harness.metrics = get_metrics('benchmark-welcome')
+
+    def step(frame):
+        found = harness.detect_person(frame.copy())
+        return {'faces': [None] if found else []}
+    return step, None
+
+
+def build_config(name: str, profile: str = 'cards'):
+    """(step, closeable) for a configuration name"""
+    if name == 'welcome':
+        return _welcome_step()
+    kind, _, mode = name.partition('-')
+    options = {'profile': profile, 'full_sweep_every': 10} if kind == 'barcode' else {}
+    if mode == 'proc':
+        analyzer = AnalyzerProcess(kind, **options)
+    elif not mode:
+        analyzer = create_analyzer(kind, **options)
+    else:
+        raise ValueError(f"Unknown configuration '{name}'")
+    step = _person_step(analyzer) if kind == 'person' else _barcode_step(analyzer)
+    return step, analyzer
+
+
+def run_config(name: str, frames: List[np.ndarray], expect: Optional[str] = None,
+               warmup: int = 3, profile: str = 'cards') -> Dict:
+    """Per-frame latency, throughput, CPU time and hit rate for one configuration"""
+    step, analyzer = build_config(name, profile)
+    try:
+        for frame in frames[:warmup]:
+            step(frame)
+        latencies = []
+        hits = correct = 0
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        for frame in frames:
+            start = time.perf_counter()
+            result = step(frame)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            found = result.get('barcodes', result.get('faces', []))
+            if found:
+                hits += 1
+                if expect is not None and any(b.get('data') == expect for b in found
+                                              if isinstance(b, dict)):
+                    correct += 1
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+    finally:
+        if analyzer is not None:
+            analyzer.close()
+
+    count = len(frames)
+    stats = {
+        'frames': count,
+        'fps': round(count / wall, 1) if wall > 0 else 0.0,
+        'mean_ms': round(float(np.mean(latencies)), 2),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+        # This process only; worker processes of *-proc configs are not included
+        'cpu_ms_per_frame': round(cpu * 1000.0 / count, 2),
+        'hit_rate': round(hits / count, 3),
+    }
+    if expect is not None:
+        stats['decode_rate'] = round(correct / count, 3)
+    return stats
+
+
+def _expected_text(source) -> Optional[str]:
+    """The payload a synthetic QR stream carries, if that's what the source is"""
+    kind, target, options = parse_source(source)
+    if kind == 'synthetic' and target == 'qr':
+        return options.get('text', 'USER001')
+    return None
+
+
+def _version() -> str:
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              timeout=5).stdout.strip() or 'unknown'
+    except (OSError, subprocess.SubprocessError):
+        return 'unknown'
+
+
+def run_suite(sources: List[str], configs: List[str], max_frames: int = 300,
+              profile: str = 'cards', label: Optional[str] = None) -> Dict:
+    results = {}
+    for source in sources:
+        frames = load_frames(source, max_frames)
+        if not frames:
+            print(f"No frames in {source}, skipped")
+            continue
+        expect = _expected_text(source)
+        for name in configs:
+            try:
+                stats = run_config(name, frames, expect if name.startswith('barcode') else None,
+                                   profile=profile)
+            except ImportError as e:
+                print(f"{name}: skipped ({e})")
+                continue
+            key = f"{name}@{source}"
+            results[key] = stats
+            rate = f", decoded {stats['decode_rate']:.0%}" if 'decode_rate' in stats else ''
+            print(f"{key}: {stats['fps']} fps, p50 {stats['p50_ms']} ms, "
+                  f"p95 {stats['p95_ms']} ms, {stats['cpu_ms_per_frame']} ms CPU/frame, "
+                  f"hits {stats['hit_rate']:.0%}{rate}")
+    return {
+        'version': label or _version(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                    'cpus': os.cpu_count()},
+        'results': results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, fps_tolerance: float = FPS_TOLERANCE,
+            latency_tolerance: float = LATENCY_TOLERANCE,
+            rate_tolerance: float = DECODE_RATE_TOLERANCE) -> List[str]:
+    """Regressions of ``current`` against ``baseline``, one message each"""
+    regressions = []
+    for key, old in baseline['results'].items():
+        new = current['results'].get(key)
+        if new is None:
+            continue
+        if new['fps'] < old['fps'] * (1 - fps_tolerance):
+            regressions.append(f"{key}: fps {old['fps']} -> {new['fps']}")
+        if new['p95_ms'] > old['p95_ms'] * (1 + latency_tolerance):
+            regressions.append(f"{key}: p95 {old['p95_ms']} ms -> {new['p95_ms']} ms")
+        for rate in ('decode_rate', 'hit_rate'):
+            if rate in old and rate in new and new[rate] < old[rate] - rate_tolerance:
+                regressions.append(f"{key}: {rate} {old[rate]:.1%} -> {new[rate]:.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay benchmark for the vision pipelines")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Benchmark and write a results file")
+    run.add_argument('sources', nargs='*', default=DEFAULT_SOURCES,
+                     help="Video files, image folders or synthetic:... specs")
+    run.add_argument('--configs', default=','.join(DEFAULT_CONFIGS),
+                     help="Comma-separated: person, barcode, welcome, person-proc, barcode-proc")
+    run.add_argument('--max-frames', type=int, default=300)
+    run.add_argument('--profile', default='cards', help="Barcode symbology profile")
+    run.add_argument('--label', help="Version label (default: git describe)")
+    run.add_argument('-o', '--output', default='benchmark_results.json')
+
+    cmp = commands.add_parser('compare', help="Flag regressions against a baseline")
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--fps-tolerance', type=float, default=FPS_TOLERANCE)
+    cmp.add_argument('--latency-tolerance', type=float, default=LATENCY_TOLERANCE)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        report = run_suite(args.sources, args.configs.split(','), args.max_frames,
+                           args.profile, args.label)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.fps_tolerance, args.latency_tolerance)
+    print(f"{baseline['version']} -> {current['version']}")
+    for message in regressions:
+        print(f"  REGRESSION {message}")
+    if regressions:
+        sys.exit(1)
+    print("  No regressions")
+
+
+if __name__ == "__main__":
+    main()
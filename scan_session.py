@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Scan Session - Debounced, cached barcode-to-user resolution
+
+A card held in front of the scanner is decoded on every frame. The scan
+session collapses those repeated reads into one event, and resolved users
+(and "no such user" answers) are cached for a while so a returning customer
+does not cost another HTTP lookup.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Marks a cache miss, since None is a valid cached answer ("no user")
+MISSING = object()
+
+
+class TTLCache:
+    """Small LRU cache whose entries expire after a time-to-live"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: 'OrderedDict[Any, Tuple[float, Any]]' = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, key, default=MISSING):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires, value = entry
+            if time.monotonic() >= expires:
+                del self.entries[key]
+                self.expired += 1
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, ttl: Optional[float] = None):
+        with self.lock:
+            expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self.entries[key] = (expires, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class ScanSession:
+    """Collapses repeated reads of the same code within a time window
+
+    The window slides: as long as the code keeps being read (card still held
+    up), further reads are suppressed. Once it has been out of view for
+    ``window`` seconds, the next read counts as a new scan.
+    """
+
+    def __init__(self, window: float = 3.0):
+        self.window = window
+        self.last_seen: Dict[str, float] = {}
+        self.accepted = 0
+        self.suppressed = 0
+
+    def accept(self, data: str) -> bool:
+        """True if this read starts a new scan, False for a duplicate"""
+        now = time.monotonic()
+        last = self.last_seen.get(data)
+        self.last_seen[data] = now
+        if last is not None and now - last < self.window:
+            self.suppressed += 1
+            return False
+        self.accepted += 1
+        # Forget codes that have long left the scanner
+        if len(self.last_seen) > 64:
+            self.last_seen = {k: t for k, t in self.last_seen.items()
+                              if now - t < self.window}
+        return True
+
+
+class BarcodeUserResolver:
+    """Debounce scans and resolve codes to users through a TTL cache"""
+
+    def __init__(self, lookup: Callable[[str], Optional[Dict]], window: float = 3.0,
+                 maxsize: int = 256, ttl: float = 300.0, negative_ttl: float = 15.0):
+        self.lookup = lookup
+        self.session = ScanSession(window)
+        self.cache = TTLCache(maxsize, ttl)
+        self.negative_ttl = negative_ttl
+
+    def accept(self, data: str) -> bool:
+        """True if the read should be processed at all"""
+        return self.session.accept(data)
+
+    def cached(self, data: str):
+        """Cached answer for a code, or MISSING"""
+        return self.cache.get(data)
+
+    def store(self, data: str, user: Optional[Dict]):
+        """Remember a lookup result; misses expire sooner than hits"""
+        self.cache.put(data, user, None if user else self.negative_ttl)
+
+    def resolve(self, data: str) -> Optional[Dict]:
+        """Cached user for a code, looking it up on a miss"""
+        user = self.cached(data)
+        if user is MISSING:
+            user = self.lookup(data)
+            self.store(data, user)
+        return user
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'scans': self.session.accepted,
+            'duplicates_suppressed': self.session.suppressed,
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+        }
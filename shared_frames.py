@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared Frames - Run analyzers in worker processes
+
+Frames are handed to the worker through ``multiprocessing.shared_memory``
+slots rather than being pickled, and only the analyzer's small result record
+comes back over a queue. Each worker owns one analyzer, so stateful ones
+(motion gate, barcode region tracking) keep seeing consecutive frames.
+"""
+
+import multiprocessing as mp
+import queue
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+class SharedFrameSlots:
+    """A fixed number of equally sized uint8 frames in one shared memory block"""
+
+    def __init__(self, shape: Tuple[int, ...], slots: int = 2, name: Optional[str] = None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        size = int(np.prod(self.shape)) * slots
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self):
+        # Views into the buffer must be gone before the mapping can close
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker_main(kind: str, options: Dict, tasks, results):
+    """Worker process loop: attach to the caller's slots and analyze frames"""
+    # Imported here so the parent never pays for the analyzer models
+    from analyzers import create_analyzer
+
+    analyzer = create_analyzer(kind, **options)
+    results.put(('ready',))
+    slots = None
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        seq, name, shape, count, index = task
+        try:
+            if slots is None or slots.name != name:
+                if slots is not None:
+                    slots.close()
+                slots = SharedFrameSlots(shape, count, name=name)
+            result = analyzer.analyze(slots.array[index])
+        except Exception as e:
+            result = {'error': str(e)}
+        results.put(('result', seq, result))
+
+    results.put(('report', analyzer.report()))
+    if slots is not None:
+        slots.close()
+
+
+class AnalyzerProcess:
+    """Drop-in for an in-process analyzer that runs it in a worker process"""
+
+    def __init__(self, kind: str, slots: int = 2, timeout: float = 5.0,
+                 startup_timeout: float = 30.0, **options):
+        self.kind = kind
+        self.slot_count = slots
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        # Spawn, not fork: the parent has camera and GUI threads running
+        context = mp.get_context('spawn')
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        self.process = context.Process(
+            target=_worker_main, args=(kind, options, self.tasks, self.results),
+            daemon=True
+        )
+        self.process.start()
+        self.ready = False
+        self.frames: Optional[SharedFrameSlots] = None
+        self.next_slot = 0
+        self.seq = 0
+        self.final_report = ''
+        self.timeouts = 0
+
+    def _wait_ready(self) -> bool:
+        try:
+            while True:
+                message = self.results.get(timeout=self.startup_timeout)
+                if message[0] == 'ready':
+                    self.ready = True
+                    return True
+        except queue.Empty:
+            return False
+
+    def analyze(self, frame: np.ndarray) -> Dict:
+        """Copy the frame into shared memory and wait for the worker's result"""
+        if not self.ready and not self._wait_ready():
+            return {'error': f"{self.kind} worker did not start"}
+        if self.frames is None or self.frames.shape != frame.shape:
+            # First frame or resolution change; the worker reattaches by name
+            if self.frames is not None:
+                self.frames.close()
+            self.frames = SharedFrameSlots(frame.shape, self.slot_count)
+
+        index = self.next_slot
+        self.next_slot = (index + 1) % self.slot_count
+        self.frames.array[index] = frame
+        self.seq += 1
+        self.tasks.put((self.seq, self.frames.name, frame.shape, self.slot_count, index))
+
+        try:
+            while True:
+                message = self.results.get(timeout=self.timeout)
+                # Late answers to requests that already timed out are skipped
+                if message[0] == 'result' and message[1] == self.seq:
+                    return message[2]
+        except queue.Empty:
+            self.timeouts += 1
+            return {'error': f"{self.kind} worker timed out"}
+
+    def report(self) -> str:
+        """Analyzer report, available once the worker has been closed"""
+        return self.final_report
+
+    def close(self):
+        """Stop the worker and free the shared memory"""
+        if self.process.is_alive():
+            self.tasks.put(None)
+            try:
+                while True:
+                    message = self.results.get(timeout=self.timeout)
+                    if message[0] == 'report':
+                        self.final_report = message[1]
+                        break
+            except queue.Empty:
+                pass
+            self.process.join(timeout=2.0)
+            if self.process.is_alive():
+                self.process.terminate()
+        if self.frames is not None:
+            self.frames.close()
+            self.frames = None
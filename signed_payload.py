@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Signed Payload - Self-verifying barcode contents
+
+A signed card carries the user ID, membership tier and expiry date together
+with a truncated HMAC-SHA256, so a scanner holding the key can trust it
+without asking the backend first:
+
+    S1.<user id>.<tier>.<expiry>.<signature>
+    S1.1700000000123.V.k3f.Qm9x8Kz1aPL0cN2w
+
+The expiry is in days since the epoch (base 36), and the signature is 12
+bytes in URL-safe base64, which keeps the payload short enough for CODE128.
+The key comes from the BARCODE_SIGNING_KEY environment variable.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from typing import Optional
+
+PREFIX = 'S1'
+KEY_ENV = 'BARCODE_SIGNING_KEY'
+SIGNATURE_BYTES = 12
+
+# Tier codes on the card, and the user types they stand for
+TIERS = {
+    'R': 'Regular User',
+    'A': 'Administrator',
+    'V': 'VIP User',
+}
+
+SignedUser = namedtuple('SignedUser', ['user_id', 'tier', 'expires'])
+
+EPOCH = date(1970, 1, 1)
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+class PayloadError(ValueError):
+    """A signed payload that is malformed, forged or expired"""
+
+
+def signing_key() -> Optional[bytes]:
+    """Key from the environment, or None when signing is not set up"""
+    key = os.environ.get(KEY_ENV)
+    return key.encode('utf-8') if key else None
+
+
+def tier_code(user_type: str) -> str:
+    """Tier code for a user type such as 'VIP User' (unknown types are regular)"""
+    for code, name in TIERS.items():
+        if name == user_type:
+            return code
+    return 'R'
+
+
+def _base36(number: int) -> str:
+    text = ''
+    while True:
+        number, digit = divmod(number, 36)
+        text = DIGITS[digit] + text
+        if not number:
+            return text
+
+
+def _signature(key: bytes, message: str) -> str:
+    digest = hmac.new(key, message.encode('utf-8'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:SIGNATURE_BYTES]).decode('ascii')
+
+
+def sign_payload(user_id: str, tier: str, expires: date, key: Optional[bytes] = None) -> str:
+    """Barcode contents for a user, valid until the end of ``expires``"""
+    key = key or signing_key()
+    if not key:
+        raise PayloadError(f"No signing key: set {KEY_ENV}")
+    if tier not in TIERS:
+        raise PayloadError(f"Unknown tier '{tier}'")
+    user_id = str(user_id)
+    if not user_id or not user_id.isprintable() or user_id.isspace():
+        raise PayloadError(f"User ID '{user_id}' cannot go on a card")
+    message = f"{PREFIX}.{user_id}.{tier}.{_base36((expires - EPOCH).days)}"
+    return f"{message}.{_signature(key, message)}"
+
+
+def is_signed(data: str) -> bool:
+    """Whether scanned contents look like a signed payload (not that they verify)"""
+    return data.startswith(PREFIX + '.') and data.count('.') >= 4
+
+
+def verify_payload(data: str, key: Optional[bytes] = None,
+                   today: Optional[date] = None) -> SignedUser:
+    """Check signature and expiry; raises PayloadError if either fails"""
+    key = key or signing_key()
+    if not key:
+        raise PayloadError(f"No signing key: set {KEY_ENV}")
+    if not is_signed(data):
+        raise PayloadError("Not a signed payload")
+    message, _, signature = data.rpartition('.')
+    if not hmac.compare_digest(_signature(key, message), signature):
+        raise PayloadError("Bad signature")
+    # User IDs may contain dots; tier and expiry are always the last fields
+    _, rest = message.split('.', 1)
+    user_id, tier, expiry = rest.rsplit('.', 2)
+    try:
+        expires = EPOCH + timedelta(days=int(expiry, 36))
+    except ValueError:
+        raise PayloadError("Bad expiry") from None
+    if expires < (today or date.fromtimestamp(time.time())):
+        raise PayloadError(f"Expired on {expires.isoformat()}")
+    return SignedUser(user_id, TIERS.get(tier, TIERS['R']), expires)
+
+
+def main():
+    """Sign or check a payload: python signed_payload.py sign ID [--tier V] | verify DATA"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Signed barcode payloads")
+    commands = parser.add_subparsers(dest='command', required=True)
+    sign = commands.add_parser('sign')
+    sign.add_argument('user_id')
+    sign.add_argument('--tier', default='R', choices=sorted(TIERS))
+    sign.add_argument('--days', type=int, default=365, help="Valid for this many days")
+    check = commands.add_parser('verify')
+    check.add_argument('data')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'sign':
+            print(sign_payload(args.user_id, args.tier, date.today() + timedelta(days=args.days)))
+        else:
+            user = verify_payload(args.data)
+            print(f"Valid: user {user.user_id}, {user.tier}, expires {user.expires.isoformat()}")
+    except PayloadError as e:
+        print(f"Invalid: {e}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
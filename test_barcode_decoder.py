@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Barcode Decoder Tests
+Backend cascade, region tracking and tiled decoding, and mapping decoded
+codes back to full-frame coordinates
+"""
+
+from unittest import mock
+
+import cv2
+import numpy as np
+
+import barcode_decoder
+from barcode_decoder import (BarcodeDecoder, DecodedBarcode, DecoderBackend, Point, Rect,
+                             RoiBarcodeDecoder, TiledBarcodeDecoder)
+
+
+def _code(data: bytes, left: int, top: int, size: int = 40,
+          symbology: str = 'QRCODE', backend: str = 'fake') -> DecodedBarcode:
+    polygon = [Point(left, top), Point(left + size, top),
+               Point(left + size, top + size), Point(left, top + size)]
+    return DecodedBarcode(data, symbology, Rect(left, top, size, size), polygon, backend)
+
+
+# What is "in view" for the fake backends
+FAKE_SCENE = ('QRCODE', 'CODE128', 'EAN13')
+
+
+def _fake_backend(name: str, symbologies, scene=FAKE_SCENE):
+    """Backend class that finds every code in ``scene`` it can read"""
+    class Fake(DecoderBackend):
+        def _decode(self, image):
+            return [_code(kind.encode(), 0, 0, symbology=kind, backend=self.name)
+                    for kind in scene
+                    if self.symbologies is None or kind in self.symbologies]
+    Fake.name = name
+    Fake.symbologies = symbologies
+    return Fake
+
+
+FAKE_BACKENDS = {
+    'zbar': _fake_backend('zbar', None),
+    'qr': _fake_backend('qr', ('QRCODE',)),
+    'ean': _fake_backend('ean', ('EAN13', 'EAN8', 'UPCA', 'UPCE')),
+    # Reads everything but misses every code in this scene
+    'blind': _fake_backend('blind', None, scene=()),
+}
+
+IMAGE = np.zeros((10, 10), np.uint8)
+
+
+def _plan(profile: str, names=None, strategy: str = 'cascade', warmup: int = 0):
+    with mock.patch.dict(barcode_decoder.BACKENDS, FAKE_BACKENDS, clear=True):
+        return BarcodeDecoder(profile, names, strategy, warmup)
+
+
+def _found(decoder):
+    return sorted((b.type, b.backend) for b in decoder.decode(IMAGE))
+
+
+def test_backends_that_read_nothing_in_profile_are_left_out():
+    decoder = _plan('cards', ['qr', 'ean', 'zbar'])
+    assert [(b.name, b.wanted) for b in decoder.backends] == [('qr', ('QRCODE',)),
+                                                              ('zbar', ('CODE128', 'QRCODE'))]
+
+
+def test_hit_skips_the_fallback():
+    decoder = _plan('cards', ['zbar', 'qr'])
+    assert _found(decoder) == [('CODE128', 'zbar'), ('QRCODE', 'zbar')]
+    # zbar found every symbology the QR backend reads
+    assert [b.attempts for b in decoder.backends] == [1, 0]
+
+
+def test_miss_falls_back_to_next_backend():
+    decoder = _plan('cards', ['blind', 'qr'])
+    assert _found(decoder) == [('QRCODE', 'qr')]
+    assert [b.attempts for b in decoder.backends] == [1, 1]
+
+
+def test_fallback_only_for_missed_symbologies():
+    # qr finds the QR code; zbar still runs for CODE128 and EAN13, not for QR again
+    decoder = _plan('all', ['qr', 'zbar'])
+    assert _found(decoder) == [('CODE128', 'zbar'), ('EAN13', 'zbar'), ('QRCODE', 'qr')]
+    decoder = _plan('all', ['qr', 'ean'])
+    assert _found(decoder) == [('EAN13', 'ean'), ('QRCODE', 'qr')]
+    assert [b.attempts for b in decoder.backends] == [1, 1]
+
+
+def test_cheapest_backend_first_after_warmup():
+    decoder = _plan('cards', ['zbar', 'qr'], warmup=1)
+    # Warming up: every backend runs, zbar's QR hit wins in configured order
+    assert _found(decoder) == [('CODE128', 'zbar'), ('QRCODE', 'zbar')]
+    assert [b.attempts for b in decoder.backends] == [1, 1]
+
+    zbar, qr = decoder.backends
+    zbar.total_time, qr.total_time = 1.0, 0.001
+    assert decoder.ordered_backends() == [qr, zbar]
+    # qr first; zbar still runs, for the CODE128 that qr cannot read
+    assert _found(decoder) == [('CODE128', 'zbar'), ('QRCODE', 'qr')]
+    assert [b.attempts for b in decoder.backends] == [2, 2]
+
+
+def test_parallel_runs_every_backend():
+    decoder = _plan('cards', ['zbar', 'qr'], 'parallel')
+    assert _found(decoder) == [('CODE128', 'zbar'), ('QRCODE', 'zbar')]
+    assert [b.attempts for b in decoder.backends] == [1, 1]
+
+
+def test_unknown_strategy_rejected():
+    try:
+        _plan('cards', strategy='race')
+    except ValueError:
+        return
+    raise AssertionError("strategy 'race' was accepted")
+
+
+class FakeDecode:
+    """Finds one code at a fixed frame position, if it lies inside the image given
+
+    Regions are views into the frame, so their offset tells where they start.
+    """
+
+    def __init__(self, frame: np.ndarray, left: int, top: int, size: int = 40):
+        self.frame = frame
+        self.left, self.top, self.size = left, top, size
+        self.shapes = []
+
+    def _origin(self, image: np.ndarray):
+        offset = image.__array_interface__['data'][0] - self.frame.__array_interface__['data'][0]
+        y0, rest = divmod(offset, self.frame.strides[0])
+        return rest // self.frame.strides[1], y0
+
+    def __call__(self, image):
+        self.shapes.append(image.shape[:2])
+        x0, y0 = self._origin(image)
+        height, width = image.shape[:2]
+        left, top = self.left - x0, self.top - y0
+        if left < 0 or top < 0 or left + self.size > width or top + self.size > height:
+            return []
+        return [_code(b'card', left, top, self.size)]
+
+
+def test_roi_hits_map_to_frame_coordinates():
+    frame = np.zeros((480, 640), np.uint8)
+    fake = FakeDecode(frame, 300, 200)
+    decoder = RoiBarcodeDecoder(fake, padding=0.5, min_padding=24, full_sweep_every=10)
+
+    first = decoder.decode(frame)
+    assert first[0].rect == Rect(300, 200, 40, 40)
+    assert decoder.last_rect == (300, 200, 40, 40)
+
+    second = decoder.decode(frame)
+    # Decoded in the padded region only, reported in frame coordinates
+    assert fake.shapes[-1] == (40 + 2 * 24, 40 + 2 * 24)
+    assert second[0].rect == Rect(300, 200, 40, 40)
+    assert second[0].polygon[0] == Point(300, 200)
+    assert (decoder.roi_hits, decoder.full_sweeps) == (1, 1)
+
+
+def test_roi_is_clipped_to_frame():
+    decoder = RoiBarcodeDecoder(lambda image: [])
+    decoder.last_rect = (5, 450, 40, 40)
+    assert decoder.roi_bounds((480, 640)) == (0, 426, 69, 480)
+
+
+def test_roi_miss_falls_back_to_full_sweep():
+    frame = np.zeros((480, 640), np.uint8)
+    fake = FakeDecode(frame, 300, 200)
+    decoder = RoiBarcodeDecoder(fake)
+    decoder.decode(frame)
+    # The card moves out of the tracked region
+    fake.left, fake.top = 20, 20
+    found = decoder.decode(frame)
+    assert found[0].rect == Rect(20, 20, 40, 40)
+    assert (decoder.roi_misses, decoder.full_sweeps) == (1, 2)
+    assert fake.shapes[-1] == (480, 640)
+
+
+def test_periodic_full_sweep():
+    frame = np.zeros((480, 640), np.uint8)
+    fake = FakeDecode(frame, 300, 200)
+    decoder = RoiBarcodeDecoder(fake, full_sweep_every=3)
+    for _ in range(8):
+        decoder.decode(frame)
+    # Sweep, 3 region frames, sweep, 3 region frames
+    assert (decoder.full_sweeps, decoder.roi_hits) == (2, 6)
+
+
+def _qr(data: str, module: int) -> np.ndarray:
+    """QR code in BGR, ``module`` pixels per module (whole pixels decode reliably)"""
+    code = cv2.QRCodeEncoder.create().encode(data)
+    code = cv2.resize(code, None, fx=module, fy=module, interpolation=cv2.INTER_NEAREST)
+    return cv2.cvtColor(code, cv2.COLOR_GRAY2BGR)
+
+
+def _sheet(codes, shape=(1500, 2000)) -> np.ndarray:
+    sheet = np.full(shape + (3,), 255, np.uint8)
+    for image, (x, y) in codes:
+        sheet[y:y + image.shape[0], x:x + image.shape[1]] = image
+    return sheet
+
+
+def test_tiles_cover_image_with_overlap():
+    decoder = TiledBarcodeDecoder('cards', tile_size=800, overlap=300, min_size=1000)
+    tiles = decoder.tiles((1500, 2000))
+    assert tiles[0] == (0, 0, 800, 800)
+    # Last row and column end exactly at the image edge
+    assert max(x1 for _, _, x1, _ in tiles) == 2000
+    assert max(y1 for _, _, _, y1 in tiles) == 1500
+    xs = sorted({x0 for x0, _, _, _ in tiles})
+    assert all(b - a <= 800 - 300 for a, b in zip(xs, xs[1:]))
+
+
+def test_merge_drops_seam_duplicates():
+    whole = _code(b'card', 480, 700, 60)
+    # The same code seen by a neighbouring tile, a pixel off
+    again = _code(b'card', 481, 700, 58)
+    other = _code(b'other', 480, 700, 60)
+    elsewhere = _code(b'card', 100, 100, 60)
+    merged = TiledBarcodeDecoder.merge([again, whole, other, elsewhere])
+    assert [(b.data, b.rect.left) for b in merged] == [(b'card', 100), (b'card', 480), (b'other', 480)]
+    assert whole in merged and again not in merged
+
+
+def test_tiled_decode_maps_codes_to_sheet_coordinates():
+    codes = [(_qr('card-1', 6), (100, 100)),
+             # Across a tile seam (x 500, y 500 and 700)
+             (_qr('card-2', 6), (420, 700)),
+             (_qr('card-3', 6), (1700, 1200))]
+    decoder = TiledBarcodeDecoder('cards', tile_size=800, overlap=300, min_size=1000,
+                                  overview=0, workers=2)
+    try:
+        found = decoder.decode(_sheet(codes))
+    finally:
+        decoder.close()
+    assert decoder.last_tiles == 12
+    assert [b.data for b in found] == [b'card-1', b'card-2', b'card-3']
+    for barcode, (image, (x, y)) in zip(found, codes):
+        size = image.shape[0]
+        assert x <= barcode.rect.left and barcode.rect.left + barcode.rect.width <= x + size
+        assert y <= barcode.rect.top and barcode.rect.top + barcode.rect.height <= y + size
+
+
+def test_overview_finds_code_larger_than_a_tile():
+    big = _qr('big', 40)
+    assert big.shape[0] > 800
+    decoder = TiledBarcodeDecoder('cards', tile_size=800, overlap=300, min_size=1000,
+                                  overview=1000, workers=1)
+    found = decoder.decode(_sheet([(big, (300, 200))]))
+    assert [b.data for b in found] == [b'big']
+    # Scaled back up from the half-size overview
+    rect = found[0].rect
+    assert 300 <= rect.left and rect.left + rect.width <= 300 + big.shape[1] + 2
+    assert rect.width > 800
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
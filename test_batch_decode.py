@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch Decode Tests
+Decode cache keying and invalidation, and per-file failure reporting (including
+worker processes that die)
+"""
+
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+from unittest import mock
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'barcode-reader'))
+import batch_decode
+from batch_decode import DecodeCache, decode_file, decode_settings, run_batch
+
+
+def _write_qr(path: str, data: str):
+    canvas = np.full((300, 300), 255, np.uint8)
+    code = cv2.QRCodeEncoder.create().encode(data)
+    canvas[50:250, 50:250] = cv2.resize(code, (200, 200), interpolation=cv2.INTER_NEAREST)
+    cv2.imwrite(path, canvas)
+
+
+def _result(path: str, barcodes):
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {'path': path, 'sha256': digest, 'barcodes': barcodes}
+
+
+def test_settings_name_profile_and_tiling():
+    assert decode_settings('cards') != decode_settings('all')
+    assert decode_settings('cards') != decode_settings('cards', tiles=True)
+    assert decode_settings('cards') == decode_settings('cards')
+
+
+def test_cache_hit_for_untouched_file():
+    with tempfile.TemporaryDirectory() as folder:
+        image = os.path.join(folder, 'a.png')
+        _write_qr(image, 'abc')
+        cache_path = os.path.join(folder, 'cache.json')
+        cache = DecodeCache(cache_path, 'cards; pyzbar; whole image')
+        cache.store(image, _result(image, [{'data': 'abc'}]))
+        cache.save()
+
+        reloaded = DecodeCache(cache_path, 'cards; pyzbar; whole image')
+        entry, known_hash = reloaded.lookup(image)
+        assert entry['barcodes'] == [{'data': 'abc'}]
+        assert known_hash == entry['sha256']
+
+
+def test_cache_ignores_other_settings():
+    with tempfile.TemporaryDirectory() as folder:
+        image = os.path.join(folder, 'a.png')
+        _write_qr(image, 'abc')
+        cache_path = os.path.join(folder, 'cache.json')
+        cache = DecodeCache(cache_path, 'cards; pyzbar; whole image')
+        cache.store(image, _result(image, []))
+        cache.save()
+
+        for settings in ('all; pyzbar; whole image', 'cards; opencv-qr; whole image',
+                         'cards; pyzbar; tiles 1600/400 above 2400, overview 1600'):
+            # Not even the hash is reused: the old result belongs to other settings
+            assert DecodeCache(cache_path, settings).lookup(image) == (None, None)
+
+
+def test_cache_rehashes_touched_file():
+    with tempfile.TemporaryDirectory() as folder:
+        image = os.path.join(folder, 'a.png')
+        _write_qr(image, 'abc')
+        cache = DecodeCache(None, 'cards')
+        result = _result(image, [])
+        cache.store(image, result)
+        stat = os.stat(image)
+        os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        # Touched but not changed: no entry, but the hash lets the worker skip decoding
+        assert cache.lookup(image) == (None, result['sha256'])
+        assert decode_file(image, result['sha256'])['unchanged']
+
+
+def test_decoder_exception_fails_only_that_file():
+    class Broken:
+        def decode(self, image):
+            raise RuntimeError("decoder crashed")
+
+    with tempfile.TemporaryDirectory() as folder:
+        image = os.path.join(folder, 'a.png')
+        _write_qr(image, 'abc')
+        saved = batch_decode._decoder
+        batch_decode._decoder = Broken()
+        try:
+            result = decode_file(image)
+        finally:
+            batch_decode._decoder = saved
+        assert 'decode failed' in result['error'] and 'decoder crashed' in result['error']
+
+
+def test_run_batch_reuses_and_invalidates_cache():
+    with tempfile.TemporaryDirectory() as folder:
+        images = os.path.join(folder, 'images')
+        os.mkdir(images)
+        _write_qr(os.path.join(images, 'a.png'), 'abc')
+        with open(os.path.join(images, 'b.png'), 'w') as f:
+            f.write("not an image")
+        cache_path = os.path.join(folder, 'cache.json')
+
+        def run(profile):
+            output = io.StringIO()
+            stats = run_batch([images], output, profile, workers=1, cache_path=cache_path)
+            return stats, [json.loads(line) for line in output.getvalue().splitlines()]
+
+        stats, lines = run('cards')
+        assert (stats['files'], stats['decoded'], stats['cached'], stats['failed']) == (2, 1, 0, 1)
+        assert stats['errors'] == [(os.path.join(images, 'b.png'), 'not a readable image')]
+        decoded = [line for line in lines if 'barcodes' in line]
+        assert [b['data'] for b in decoded[0]['barcodes']] == ['abc']
+
+        stats, _ = run('cards')
+        assert (stats['decoded'], stats['cached']) == (0, 1)
+
+        # Other settings: decoded again rather than answered from the cache
+        stats, _ = run('all')
+        assert (stats['decoded'], stats['cached']) == (1, 0)
+
+
+class Crashing:
+    """Decoder that kills its worker process on 7x7 images"""
+
+    def decode(self, image):
+        if image.shape[:2] == (7, 7):
+            os._exit(1)
+        return []
+
+
+def test_dead_worker_fails_only_its_file():
+    # The patched decoder reaches the workers by forking
+    if multiprocessing.get_start_method() != 'fork':
+        return
+    with tempfile.TemporaryDirectory() as folder:
+        for name in ('a.png', 'c.png', 'd.png', 'e.png'):
+            _write_qr(os.path.join(folder, name), name)
+        cv2.imwrite(os.path.join(folder, 'b.png'), np.zeros((7, 7), np.uint8))
+        output = io.StringIO()
+        with mock.patch.object(batch_decode, '_make_decoder', lambda profile, tiles: Crashing()):
+            stats = run_batch([folder], output, 'cards', workers=2, cache_path=None)
+        assert (stats['files'], stats['decoded'], stats['failed']) == (5, 4, 1)
+        [(path, error)] = stats['errors']
+        assert path == os.path.join(folder, 'b.png') and 'died' in error
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert sorted(os.path.basename(line['path']) for line in lines) == [
+            'a.png', 'b.png', 'c.png', 'd.png', 'e.png']
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Card Manifest Tests
+Incremental bulk generation: unchanged users are skipped, changed ones re-rendered
+"""
+
+import json
+import os
+import tempfile
+
+from generate_barcodes import MANIFEST_NAME, CardManifest, generate_bulk, render_hash
+
+USERS = [
+    {'id': '1700000000001', 'username': 'alice', 'type': 'VIP User', 'password': 'secret'},
+    {'id': '1700000000002', 'username': 'bob'},
+]
+
+
+def _write_users(folder: str, users) -> str:
+    path = os.path.join(folder, 'users.json')
+    with open(path, 'w') as f:
+        json.dump(users, f)
+    return path
+
+
+def _run(users_path: str, output: str, **options):
+    # One worker and no verification keep the test quick and independent of zbar
+    return generate_bulk(users_path, output, workers=1, verify=False, **options)
+
+
+def test_render_hash_follows_card_fields():
+    info = {'type': 'Regular User', 'username': 'bob', 'barcode_id': '1'}
+    assert render_hash(info) == render_hash(dict(info))
+    assert render_hash(info) != render_hash(dict(info, type='VIP User'))
+
+
+def test_manifest_needs_hash_and_files():
+    with tempfile.TemporaryDirectory() as folder:
+        manifest = CardManifest(folder)
+        manifest.store('bob', 'h1', ['bob_qrcode.png'])
+        assert not manifest.current('bob', 'h1')
+        open(os.path.join(folder, 'bob_qrcode.png'), 'wb').close()
+        assert manifest.current('bob', 'h1')
+        assert not manifest.current('bob', 'h2')
+        manifest.save()
+        assert CardManifest(folder).current('bob', 'h1')
+
+
+def test_bulk_skips_unchanged_and_rerenders_changed():
+    with tempfile.TemporaryDirectory() as folder:
+        output = os.path.join(folder, 'cards')
+        users_path = _write_users(folder, USERS)
+
+        stats = _run(users_path, output)
+        assert (stats['written'], stats['unchanged'], stats['failed']) == (2, 0, 0)
+        assert os.path.exists(os.path.join(output, MANIFEST_NAME))
+        assert os.path.exists(os.path.join(output, 'alice_barcode_card.png'))
+
+        stats = _run(users_path, output)
+        assert (stats['written'], stats['unchanged']) == (0, 2)
+
+        # A changed user, and a card deleted by hand, are both rendered again
+        _write_users(folder, [dict(USERS[0], type='Administrator'), USERS[1]])
+        os.remove(os.path.join(output, 'bob_qrcode.png'))
+        stats = _run(users_path, output)
+        assert (stats['written'], stats['unchanged']) == (2, 0)
+        assert os.path.exists(os.path.join(output, 'bob_qrcode.png'))
+
+        stats = _run(users_path, output, full=True)
+        assert (stats['written'], stats['unchanged']) == (2, 0)
+
+
+def test_bulk_prunes_removed_users():
+    with tempfile.TemporaryDirectory() as folder:
+        output = os.path.join(folder, 'cards')
+        users_path = _write_users(folder, USERS)
+        _run(users_path, output)
+
+        _write_users(folder, USERS[:1])
+        stats = _run(users_path, output)
+        assert (stats['unchanged'], stats['pruned']) == (1, 1)
+        assert not any(name.startswith('bob_') for name in os.listdir(output))
+        assert os.path.exists(os.path.join(output, 'alice_barcode.png'))
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Detection Service Tests
+Scan events to published login events: signed cards, unknown users and lookups
+the backend could not answer
+"""
+
+import os
+import threading
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+from detection_service import DetectionService
+from signed_payload import KEY_ENV, sign_payload
+from test_order_api import FakeBackend
+
+KEY = 'test-signing-key'
+
+
+def _scan(api_url: str, *codes, key: str = KEY):
+    """Published event types and events after scanning ``codes`` on one lane"""
+    with mock.patch.dict(os.environ, {KEY_ENV: key}):
+        service = DetectionService([], port=0, api_url=api_url)
+    service.start()
+    try:
+        for code in codes:
+            service.on_lane_event({'type': 'barcode', 'lane': 'door', 'data': code,
+                                   'symbology': 'CODE128'})
+        # Let background lookups deliver their answers
+        service.order_api.executor.shutdown(wait=True)
+    finally:
+        service.stop()
+    events = [e for e in service.hub.recent if e['type'] != 'barcode']
+    return [e['type'] for e in events], events
+
+
+def _with_backend(test):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeBackend)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        test(f"http://127.0.0.1:{server.server_address[1]}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _card(user_id: str, key: str = KEY, days: int = 30) -> str:
+    return sign_payload(user_id, 'V', date.today() + timedelta(days=days), key.encode())
+
+
+def test_signed_card_logs_in_before_backend_confirms():
+    def test(url):
+        kinds, events = _scan(url, _card('known'))
+        assert kinds == ['login', 'login_confirmed']
+        assert events[0]['user'] == {'id': 'known', 'type': 'VIP User', 'confirmed': False}
+        assert events[1]['user']['username'] == 'alice'
+    _with_backend(test)
+
+
+def test_signed_card_for_deleted_user_is_revoked():
+    def test(url):
+        kinds, events = _scan(url, _card('gone'))
+        assert kinds == ['login', 'login_revoked']
+        assert events[1]['user_id'] == 'gone'
+    _with_backend(test)
+
+
+def test_signed_card_works_offline():
+    kinds, _ = _scan("http://127.0.0.1:1", _card('known'))
+    assert kinds == ['login']
+
+
+def test_forged_and_expired_cards_rejected():
+    def test(url):
+        kinds, events = _scan(url, _card('known', key='other-key'), _card('known', days=-1))
+        assert kinds == ['rejected_card', 'rejected_card']
+        assert events[0]['error'] == "Bad signature"
+        assert events[1]['error'].startswith("Expired on")
+    _with_backend(test)
+
+
+def test_unknown_user_and_failed_lookup_differ():
+    def test(url):
+        kinds, _ = _scan(url, 'nobody', '500')
+        assert kinds == ['unknown_user', 'lookup_failed']
+    _with_backend(test)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
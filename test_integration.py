@@ -80,15 +80,17 @@ def test_camera_access():
     print("\n🔍 Testing camera access...")
     
     try:
-        import cv2
+        from frame_sources import open_frame_source, default_source
         
-        # Try main camera
-        cap = cv2.VideoCapture(0)
-        if cap.isOpened():
-            print("  ✅ Main camera accessible")
-            cap.release()
+        # Try main camera (CAMERA_SOURCE=synthetic:pattern on machines without one)
+        source = default_source(0)
+        cap = open_frame_source(source, realtime=False)
+        ret = cap.isOpened() and cap.read()[0]
+        cap.release()
+        if ret:
+            print(f"  ✅ Main camera accessible ({source})")
         else:
-            print("  ❌ Main camera not accessible")
+            print(f"  ❌ Main camera not accessible ({source})")
             return False
             
     except Exception as e:
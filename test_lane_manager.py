@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lane Manager Tests
+Supervision: a finite source that plays to its end is finished, not restarted
+"""
+
+import time
+from unittest import mock
+
+from lane_manager import LaneManager
+
+
+class NullAnalyzer:
+    def analyze(self, frame):
+        return {}
+
+    def close(self):
+        pass
+
+
+def _wait(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_finished_source_is_not_restarted():
+    lanes = [{'name': 'clip', 'source': 'synthetic:blank?count=5&realtime=0', 'role': 'person'}]
+    manager = LaneManager(lanes)
+    lane = manager.lanes['clip']
+    with mock.patch.object(manager, 'create_lane_analyzer', lambda role, **options: NullAnalyzer()):
+        manager.start()
+        try:
+            assert _wait(lambda: lane.finished and not lane.alive)
+            # Two supervisor rounds
+            time.sleep(2.5)
+            assert lane.restarts == 0 and lane.finished
+            assert manager.stats()['clip']['finished']
+        finally:
+            manager.stop()
+
+
+def test_restart_clears_finished():
+    lanes = [{'name': 'clip', 'source': 'synthetic:blank?count=5&realtime=0', 'role': 'person'}]
+    manager = LaneManager(lanes)
+    lane = manager.lanes['clip']
+    with mock.patch.object(manager, 'create_lane_analyzer', lambda role, **options: NullAnalyzer()):
+        assert lane.start()
+        assert _wait(lambda: lane.finished and not lane.alive)
+        assert lane.start() and not lane.finished
+        assert _wait(lambda: lane.finished and not lane.alive)
+    manager.stop()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Order API Tests
+Async callbacks tell "no such user" apart from a backend that could not answer
+"""
+
+import json
+import threading
+from concurrent.futures import wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from order_api import OrderSystemAPI
+
+
+class FakeBackend(BaseHTTPRequestHandler):
+    """/api/user/barcode/<code>: 'known' is a user, '500' a server error, anything else 404"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        code = self.path.rsplit('/', 1)[-1]
+        status = {'known': 200, '500': 500}.get(code, 404)
+        body = json.dumps({'id': code, 'username': 'alice'} if status == 200 else {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _lookup(api: OrderSystemAPI, code: str):
+    answers = []
+    future = api.check_user_by_barcode_async(code, callback=lambda *args: answers.append(args))
+    wait([future])
+    # The done callback may still be running on the worker thread
+    api.executor.shutdown(wait=True)
+    return answers
+
+
+def _with_backend(test):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeBackend)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        test(f"http://127.0.0.1:{server.server_address[1]}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_found_and_unknown_users():
+    def test(url):
+        for code, user in (('known', {'id': 'known', 'username': 'alice'}), ('nobody', None)):
+            api = OrderSystemAPI(url)
+            assert _lookup(api, code) == [(user, None)]
+            api.close()
+    _with_backend(test)
+
+
+def test_server_error_reaches_callback():
+    def test(url):
+        api = OrderSystemAPI(url)
+        [(user, error)] = _lookup(api, '500')
+        assert user is None and error is not None
+        assert api.latency_stats()['check_user']['errors'] == 1
+        # Synchronous callers that did not ask for errors still get None
+        assert OrderSystemAPI(url).check_user_by_barcode('500') is None
+        api.close()
+    _with_backend(test)
+
+
+def test_refused_connection_reaches_callback():
+    api = OrderSystemAPI("http://127.0.0.1:1", timeout=(0.5, 0.5))
+    [(user, error)] = _lookup(api, 'known')
+    assert user is None and error is not None
+    api.close()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Scan Session Tests
+Scan debouncing, the TTL/LRU cache and barcode-to-user resolution, on a fake clock
+"""
+
+from unittest import mock
+
+import scan_session
+from scan_session import MISSING, BarcodeUserResolver, ScanSession, TTLCache
+
+
+class FakeClock:
+    """Stands in for the time module inside scan_session"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+def _clock():
+    clock = FakeClock()
+    return clock, mock.patch.object(scan_session, 'time', clock)
+
+
+def test_debounce_within_window():
+    clock, patch = _clock()
+    with patch:
+        session = ScanSession(window=3.0)
+        assert session.accept('card-1')
+        clock.advance(1.0)
+        assert not session.accept('card-1')
+        # Another code is a separate scan
+        assert session.accept('card-2')
+        assert (session.accepted, session.suppressed) == (2, 1)
+
+
+def test_window_slides_while_card_is_held():
+    clock, patch = _clock()
+    with patch:
+        session = ScanSession(window=3.0)
+        assert session.accept('card-1')
+        # Read every 2 s for 10 s: never 3 s since the last read
+        for _ in range(5):
+            clock.advance(2.0)
+            assert not session.accept('card-1')
+        assert session.suppressed == 5
+
+
+def test_new_scan_after_window():
+    clock, patch = _clock()
+    with patch:
+        session = ScanSession(window=3.0)
+        assert session.accept('card-1')
+        clock.advance(3.0)
+        assert session.accept('card-1')
+        assert (session.accepted, session.suppressed) == (2, 0)
+
+
+def test_cache_expires_after_ttl():
+    clock, patch = _clock()
+    with patch:
+        cache = TTLCache(maxsize=4, ttl=10.0)
+        cache.put('a', 1)
+        clock.advance(9.9)
+        assert cache.get('a') == 1
+        clock.advance(0.1)
+        assert cache.get('a') is MISSING
+        assert (cache.hits, cache.misses, cache.expired) == (1, 1, 1)
+        assert 'a' not in cache.entries
+
+
+def test_cache_per_entry_ttl():
+    clock, patch = _clock()
+    with patch:
+        cache = TTLCache(maxsize=4, ttl=10.0)
+        cache.put('short', 1, ttl=1.0)
+        cache.put('long', 2)
+        clock.advance(2.0)
+        assert cache.get('short') is MISSING
+        assert cache.get('long') == 2
+
+
+def test_cache_evicts_least_recently_used():
+    clock, patch = _clock()
+    with patch:
+        cache = TTLCache(maxsize=2, ttl=10.0)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1
+        cache.put('c', 3)
+        assert cache.get('b') is MISSING
+        assert cache.get('a') == 1 and cache.get('c') == 3
+
+
+def test_cache_caches_none():
+    cache = TTLCache()
+    cache.put('unknown', None)
+    assert cache.get('unknown') is None
+    cache.invalidate('unknown')
+    assert cache.get('unknown') is MISSING
+
+
+def test_resolver_looks_up_once():
+    clock, patch = _clock()
+    calls = []
+
+    def lookup(data):
+        calls.append(data)
+        return {'id': data, 'username': 'alice'}
+
+    with patch:
+        resolver = BarcodeUserResolver(lookup, window=3.0, ttl=60.0)
+        assert resolver.resolve('card-1')['username'] == 'alice'
+        clock.advance(30.0)
+        assert resolver.resolve('card-1')['username'] == 'alice'
+        assert calls == ['card-1']
+        clock.advance(30.0)
+        resolver.resolve('card-1')
+        assert calls == ['card-1', 'card-1']
+        stats = resolver.stats()
+        assert (stats['cache_hits'], stats['cache_misses']) == (1, 2)
+
+
+def test_resolver_forgets_unknown_users_sooner():
+    clock, patch = _clock()
+    answers = [None, {'id': 'card-1'}]
+    with patch:
+        resolver = BarcodeUserResolver(lambda data: answers.pop(0), ttl=300.0, negative_ttl=15.0)
+        assert resolver.resolve('card-1') is None
+        clock.advance(10.0)
+        assert resolver.resolve('card-1') is None
+        clock.advance(5.0)
+        # A card registered in the meantime is found on the next scan
+        assert resolver.resolve('card-1') == {'id': 'card-1'}
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Signed Payload Tests
+Signing round trip, and rejection of forged, expired and malformed cards
+"""
+
+import os
+from datetime import date, timedelta
+from unittest import mock
+
+from signed_payload import (KEY_ENV, PayloadError, TIERS, is_signed, sign_payload,
+                            tier_code, verify_payload)
+
+KEY = b'test-signing-key'
+TODAY = date(2026, 1, 15)
+
+
+def _rejected(data: str, key: bytes = KEY, today: date = TODAY) -> str:
+    try:
+        verify_payload(data, key, today)
+    except PayloadError as e:
+        return str(e)
+    raise AssertionError(f"{data!r} was accepted")
+
+
+def test_round_trip():
+    data = sign_payload('1700000000123', 'V', TODAY + timedelta(days=30), KEY)
+    assert is_signed(data)
+    user = verify_payload(data, KEY, TODAY)
+    assert user.user_id == '1700000000123'
+    assert user.tier == TIERS['V']
+    assert user.expires == TODAY + timedelta(days=30)
+
+
+def test_user_id_with_dots():
+    data = sign_payload('team.a.42', 'R', TODAY, KEY)
+    assert verify_payload(data, KEY, TODAY).user_id == 'team.a.42'
+
+
+def test_forged_fields_rejected():
+    data = sign_payload('1700000000123', 'R', TODAY + timedelta(days=30), KEY)
+    prefix, user_id, tier, expiry, signature = data.split('.')
+    forgeries = [
+        # Someone else's ID, a better tier, a later expiry, all with the old signature
+        '.'.join([prefix, '1700000000999', tier, expiry, signature]),
+        '.'.join([prefix, user_id, 'A', expiry, signature]),
+        '.'.join([prefix, user_id, tier, 'zzzz', signature]),
+    ]
+    for forged in forgeries:
+        assert _rejected(forged) == "Bad signature"
+
+
+def test_forged_signature_rejected():
+    data = sign_payload('1700000000123', 'R', TODAY + timedelta(days=30), KEY)
+    message, _, signature = data.rpartition('.')
+    flipped = ('A' if signature[0] != 'A' else 'B') + signature[1:]
+    assert _rejected(f"{message}.{flipped}") == "Bad signature"
+    assert _rejected(f"{message}.") == "Bad signature"
+
+
+def test_other_key_rejected():
+    data = sign_payload('1700000000123', 'R', TODAY + timedelta(days=30), b'another-key')
+    assert _rejected(data) == "Bad signature"
+
+
+def test_expired_rejected():
+    data = sign_payload('1700000000123', 'V', TODAY - timedelta(days=1), KEY)
+    assert _rejected(data).startswith("Expired on")
+
+
+def test_valid_through_expiry_day():
+    data = sign_payload('1700000000123', 'V', TODAY, KEY)
+    assert verify_payload(data, KEY, TODAY).expires == TODAY
+    assert _rejected(data, today=TODAY + timedelta(days=1)).startswith("Expired on")
+
+
+def test_not_signed_rejected():
+    assert not is_signed('1700000000123')
+    assert _rejected('1700000000123') == "Not a signed payload"
+    assert _rejected('S1.1700000000123.R') == "Not a signed payload"
+
+
+def test_bad_signing_input_rejected():
+    for args in [('1', 'X', TODAY, KEY), ('', 'R', TODAY, KEY), (' ', 'R', TODAY, KEY)]:
+        try:
+            sign_payload(*args)
+        except PayloadError:
+            continue
+        raise AssertionError(f"sign_payload{args} did not fail")
+
+
+def test_no_key_rejected():
+    with mock.patch.dict(os.environ, clear=True):
+        for call in (lambda: sign_payload('1', 'R', TODAY),
+                     lambda: verify_payload('S1.1.R.0.AAAA', today=TODAY)):
+            try:
+                call()
+            except PayloadError as e:
+                assert KEY_ENV in str(e)
+                continue
+            raise AssertionError("worked without a signing key")
+
+
+def test_tier_code():
+    assert tier_code('VIP User') == 'V'
+    assert tier_code('Administrator') == 'A'
+    assert tier_code('Somebody') == 'R'
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith('test_'):
+            test()
+            print(f"✅ {name}")
@@ -4,15 +4,42 @@
 Welcome System Configuration
 """
 
+import os
+
 # Camera settings
 CAMERA_INDEX = 0  # Default camera index
+# Replaces the camera: video file, image folder or e.g. "synthetic:pattern"
+# (see frame_sources.py); set CAMERA_SOURCE in the environment to override
+CAMERA_SOURCE = os.environ.get('CAMERA_SOURCE')
 CAMERA_WIDTH = 640
 CAMERA_HEIGHT = 480
 
-# Face detection parameters
+# Camera lanes for lane_manager.py: one pipeline per camera
+# role: 'person' (entrance) or 'barcode' (scan station); source: index or URL
+CAMERA_LANES = [
+    {'name': 'entrance', 'source': CAMERA_INDEX, 'role': 'person'},
+    {'name': 'scanner', 'source': 1, 'role': 'barcode'},
+]
+LANE_MAX_TOTAL_FPS = 40  # Frame budget shared by all lanes
+
+# Face detector backend: 'haar' (default) or 'dnn' (CPU cv2.dnn SSD model)
+FACE_DETECTOR = 'haar'
+FACE_TRACK_EVERY = 1     # Run the detector every Nth frame, track in between (1 = always detect)
+
+# DNN face model (download into welcome_system/models, see README)
+FACE_DNN_PROTOTXT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'deploy.prototxt')
+FACE_DNN_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'res10_300x300_ssd_iter_140000.caffemodel')
+FACE_DNN_CONFIDENCE = 0.6
+
+# Face detection parameters (Haar)
 FACE_SCALE_FACTOR = 1.1  # Image pyramid scaling factor
 FACE_MIN_NEIGHBORS = 5   # Minimum neighbours for detection
 FACE_MIN_SIZE = (30, 30) # Minimum face size
+DETECTION_WIDTH = 320    # Frame width the cascade runs at (boxes are scaled back)
+
+# Motion gate: the cascade only runs when the scene changes
+MOTION_THRESHOLD = 4.0   # Mean pixel difference on a thumbnail that counts as motion
+MOTION_HOLD_TIME = 1.0   # Keep detecting this long after motion stops (seconds)
 
 # System settings
 DETECTION_COOLDOWN = 3.0  # Cooldown time between detections (seconds)
@@ -21,6 +48,7 @@ WINDOW_TITLE = "Welcome System - Real-time Detection"
 # Display settings
 SHOW_DETECTION_BOX = True  # Show bounding box around detected faces
 SHOW_STATUS_TEXT = True    # Show status text on video
+SHOW_METRICS = False       # Overlay per-stage timings; press 'm' to dump them to JSON
 
 # Audio settings
 AUDIO_ENABLED = True       # Enable/disable audio playback
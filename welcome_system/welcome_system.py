@@ -10,18 +10,27 @@ import numpy as np
 import pygame
 import time
 import os
+import sys
 from datetime import datetime
 import config
 
+# Shared modules live in the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from camera_bus import acquire_camera_bus, release_camera_bus
+from face_detector import create_face_detector
+from pipeline_metrics import get_metrics, dump_all
+
 class WelcomeSystem:
     def __init__(self):
         """Initialise welcome system"""
         self.camera = None
-        self.face_cascade = None
+        self.camera_bus = None
+        self.face_detector = None
         self.person_detected = False
         self.last_detection_time = 0
         self.detection_cooldown = config.DETECTION_COOLDOWN
         self.audio_played = False
+        self.metrics = get_metrics('welcome')
         
         # Initialise audio system
         self.init_audio()
@@ -43,16 +52,20 @@ class WelcomeSystem:
     def init_camera(self):
         """Initialise camera"""
         try:
-            self.camera = cv2.VideoCapture(config.CAMERA_INDEX)
-            if not self.camera.isOpened():
+            # Capture runs in its own thread; we only ever see the newest frame
+            source = config.CAMERA_SOURCE or config.CAMERA_INDEX
+            self.camera_bus = acquire_camera_bus(
+                source, config.CAMERA_WIDTH, config.CAMERA_HEIGHT
+            )
+            if self.camera_bus is None and not config.CAMERA_SOURCE:
                 print(f"Cannot open camera {config.CAMERA_INDEX}, trying other devices...")
-                self.camera = cv2.VideoCapture(1)
+                self.camera_bus = acquire_camera_bus(
+                    1, config.CAMERA_WIDTH, config.CAMERA_HEIGHT
+                )
             
-            if self.camera.isOpened():
+            if self.camera_bus is not None:
                 print("Camera initialised successfully")
-                # Set camera resolution
-                self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, config.CAMERA_WIDTH)
-                self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, config.CAMERA_HEIGHT)
+                self.camera = self.camera_bus.subscribe()
             else:
                 print("Cannot open camera")
         except Exception as e:
@@ -61,9 +74,9 @@ class WelcomeSystem:
     def init_face_detection(self):
         """Initialise face detection"""
         try:
-            # Use OpenCV's built-in face detector
-            self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            if self.face_cascade.empty():
+            # Detector backend is selected in config, gated on motion
+            self.face_detector = create_face_detector(config)
+            if self.face_detector.empty():
                 print("Cannot load face detection model")
             else:
                 print("Face detection model loaded successfully")
@@ -93,43 +106,64 @@ class WelcomeSystem:
             
     def detect_person(self, frame):
         """Detect person"""
-        if self.face_cascade is None:
+        if self.face_detector is None:
             return False
             
+        lap = time.perf_counter()
         # Convert to greyscale image
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        lap = self.metrics.lap('convert', lap)
         
-        # Detect faces
-        faces = self.face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=config.FACE_SCALE_FACTOR,
-            minNeighbors=config.FACE_MIN_NEIGHBORS,
-            minSize=config.FACE_MIN_SIZE
-        )
+        # Detect faces (skipped when the scene hasn't changed)
+        faces = self.face_detector.detect(gray, frame)
+        lap = self.metrics.lap('detect', lap)
         
         # If face detected, draw bounding box
         if config.SHOW_DETECTION_BOX:
             for (x, y, w, h) in faces:
                 cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
                 cv2.putText(frame, 'Person', (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+        self.metrics.lap('draw', lap)
             
         return len(faces) > 0
         
+    def draw_metrics(self, frame):
+        """Overlay fps and per-stage p50/p95 timings"""
+        snapshot = self.metrics.snapshot()
+        lines = [f"{snapshot['fps']} fps, {snapshot['dropped']} dropped"]
+        for stage, stats in snapshot['stages'].items():
+            if stats['count']:
+                lines.append(f"{stage}: {stats['p50_ms']:.1f} / {stats['p95_ms']:.1f} ms")
+        y = frame.shape[0] - 10 - 18 * (len(lines) - 1)
+        for line in lines:
+            cv2.putText(frame, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
+            y += 18
+        
     def run(self):
         """Run welcome system"""
-        if self.camera is None or not self.camera.isOpened():
+        if self.camera is None:
             print("Camera not initialised, cannot run system")
             return
             
         print("Welcome system starting...")
-        print("Press 'q' to quit system")
+        print("Press 'q' to quit system, 'm' to save pipeline timings")
         
         while True:
             # Read camera frame
+            lap = time.perf_counter()
             ret, frame = self.camera.read()
             if not ret:
+                # A timeout just means no new frame yet; keep pumping window
+                # events so the window stays responsive and 'q' still works
+                if self.camera.active:
+                    if self.handle_key(cv2.waitKey(1) & 0xFF):
+                        break
+                    continue
                 print("Cannot read camera frame")
                 break
+            self.metrics.lap('capture', lap)
+            # Bus frames are shared read-only; draw on a private copy
+            frame = frame.copy()
                 
             # Detect person
             person_detected = self.detect_person(frame)
@@ -157,22 +191,41 @@ class WelcomeSystem:
             if config.SHOW_STATUS_TEXT:
                 status_text = "Person detected" if person_detected else "Waiting..."
                 cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0) if person_detected else (0, 0, 255), 2)
+            if config.SHOW_METRICS:
+                self.draw_metrics(frame)
             
             # Display frame
+            lap = time.perf_counter()
             cv2.imshow(config.WINDOW_TITLE, frame)
             
             # Check for key press
             key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
+            self.metrics.lap('render', lap)
+            self.metrics.frame_done(self.camera.frames_dropped)
+            if self.handle_key(key):
                 break
                 
         # Clean up resources
         self.cleanup()
         
+    def handle_key(self, key: int) -> bool:
+        """Act on a key press; True means quit"""
+        if key == ord('m'):
+            print(f"Pipeline metrics written to {dump_all()}")
+        return key == ord('q')
+        
     def cleanup(self):
         """Clean up resources"""
         if self.camera:
-            self.camera.release()
+            if config.DEBUG_MODE:
+                print(f"Stale frames skipped: {self.camera.frames_dropped}")
+                if self.face_detector:
+                    print(f"Cascade skipped on {self.face_detector.skip_rate:.0%} of frames")
+            self.camera.close()
+            self.camera = None
+        if self.camera_bus:
+            release_camera_bus(self.camera_bus)
+            self.camera_bus = None
         cv2.destroyAllWindows()
         pygame.mixer.quit()
         print("System closed")